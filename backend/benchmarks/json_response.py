@@ -0,0 +1,100 @@
+"""
+Micro-benchmark of the JSON encoding of the largest responses of the API.
+Compares the default response class of FastAPI with the FastJSONResponse of the API,
+both after the serialization of the response model by FastAPI.
+
+Run from the backend directory: python -m benchmarks.json_response
+"""
+
+import timeit
+from datetime import datetime, timedelta
+from typing import Any, Callable, Coroutine
+from uuid import uuid4
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import BaseModel
+
+from src.api import FastJSONResponse
+from src.models.groups import Group, Meet
+from src.models.users import Gender, UserCard
+from src.schemas import GroupFullSchema, MeetInfoSchema, MyMeetsSchema
+
+SIZES = [10, 100, 1000]
+REPEAT = 5
+
+
+def _create_meet(group_id: Any, i: int) -> Meet:
+    return Meet(uuid4(), group_id, 20, str(datetime(2024, 1, 1, 18) + timedelta(days=i)), 90, "Tel Aviv", "Dizengoff 100")
+
+
+def _create_member(i: int) -> UserCard:
+    return UserCard(uuid4(), f"Trainer {i}", f"trainer{i}@solutrain.com", "0500000000", Gender.male, "2000-01-01", "")
+
+
+def create_my_meets(size: int) -> MyMeetsSchema:
+    group_id = uuid4()
+
+    return MyMeetsSchema(
+        meets=[MeetInfoSchema.from_model(_create_meet(group_id, i), "Running group", False, True) for i in range(size)],
+    )
+
+
+def create_group_full(size: int) -> GroupFullSchema:
+    group = Group(uuid4(), uuid4(), "Running group", "Running in the park", uuid4())
+
+    return GroupFullSchema.from_model(
+        group,
+        "Coach",
+        [_create_meet(group.group_id, i) for i in range(size)],
+        [_create_member(i) for i in range(size)],
+    )
+
+
+def _run(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    # serialize_response never awaits (is_coroutine=True), so run it without the overhead of an event loop
+    try:
+        coroutine.send(None)
+    except StopIteration as e:
+        return e.value
+    raise RuntimeError("The coroutine awaited")
+
+
+def encode(response_class: type[JSONResponse], schema: type[BaseModel]) -> Callable[[BaseModel], bytes]:
+    field = create_response_field(name="Response", type_=schema)
+
+    def _encode(content: BaseModel) -> bytes:
+        serialized = _run(serialize_response(field=field, response_content=content))
+        return response_class(serialized).body
+
+    return _encode
+
+
+def main() -> None:
+    print(f"{'schema':<16}{'size':>6}{'JSONResponse':>16}{'FastJSONResponse':>20}{'speedup':>10}")
+
+    benchmarks: list[tuple[type[BaseModel], Callable[[int], BaseModel]]] = [
+        (MyMeetsSchema, create_my_meets),
+        (GroupFullSchema, create_group_full),
+    ]
+
+    for schema, create in benchmarks:
+        for size in SIZES:
+            content = create(size)
+            number = max(1, 10000 // size)
+
+            results: list[float] = []
+            response_classes: list[type[JSONResponse]] = [JSONResponse, FastJSONResponse]
+            for response_class in response_classes:
+                func = encode(response_class, schema)
+                assert func(content) == encode(JSONResponse, schema)(content)
+
+                seconds = min(timeit.repeat(lambda: func(content), number=number, repeat=REPEAT)) / number
+                results.append(seconds)
+
+            print(f"{schema.__name__:<16}{size:>6}{results[0] * 1e6:>14.1f}us{results[1] * 1e6:>18.1f}us{results[0] / results[1]:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
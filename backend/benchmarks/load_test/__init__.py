@@ -0,0 +1,8 @@
+"""
+End-to-end HTTP load test of the API.
+Virtual trainers run sessions like the mobile app (login, my groups, group view, register and unregister to a meet,
+notifications polling and picture fetches) against a running server, and the latency of every route is reported.
+
+Run from the backend directory, against a running server with a migrated database:
+    python -m benchmarks.load_test --concurrency 20 --duration 60
+"""
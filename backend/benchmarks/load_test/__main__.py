@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+import json
+import os
+from datetime import datetime
+
+from benchmarks.load_test.runner import LoadTestSettings, run_load_test
+from benchmarks.load_test.stats import print_comparison, print_report
+
+RESULTS_DIR = "load_test_results"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_test", description="End-to-end HTTP load test of the API")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="URL of the running server")
+    parser.add_argument("--concurrency", type=int, default=10, help="Number of virtual trainers running sessions concurrently")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of the measured period")
+    parser.add_argument("--warm-up", type=float, default=5, help="Seconds of load before the measured period")
+    parser.add_argument("--think", type=float, default=0, help="Mean seconds between the steps of a session (0 for maximum load)")
+    parser.add_argument("--meets", type=int, default=5, help="Number of meets the trainers register to")
+    parser.add_argument("--polls", type=int, default=3, help="Number of notifications polls in a session")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random choices of the virtual trainers")
+    parser.add_argument("--output", help=f"Path of the JSON results (default: {RESULTS_DIR}/<time>.json)")
+    parser.add_argument("--compare", help="Path of the JSON results of a previous run to compare with")
+    args = parser.parse_args()
+
+    if args.concurrency < 1 or args.meets < 1:
+        parser.error("--concurrency and --meets must be at least 1")
+
+    settings = LoadTestSettings(
+        base_url=args.base_url,
+        concurrency=args.concurrency,
+        duration_seconds=args.duration,
+        warm_up_seconds=args.warm_up,
+        think_seconds=args.think,
+        meets=args.meets,
+        polls=args.polls,
+        seed=args.seed,
+    )
+
+    results = asyncio.run(run_load_test(settings))
+
+    print_report(results)
+
+    if args.compare:
+        print_comparison(results, args.compare)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=4)
+
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
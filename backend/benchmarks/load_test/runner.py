@@ -0,0 +1,94 @@
+import asyncio
+import random
+import time
+from datetime import datetime
+from typing import Any
+
+import httpx
+
+from benchmarks.load_test.scenarios import Fixture, LoadTestClient, LoadTestError, prepare, trainer_session
+from benchmarks.load_test.stats import LoadTestStats
+
+# pause of a virtual user after an aborted session, so a failing server is not flooded
+ERROR_PAUSE_SECONDS = 1
+
+REQUEST_TIMEOUT_SECONDS = 30
+
+
+class LoadTestSettings:
+    base_url: str
+    concurrency: int
+    duration_seconds: float
+    warm_up_seconds: float
+    think_seconds: float
+    meets: int
+    polls: int
+    seed: int
+
+    def __init__(
+        self,
+        base_url: str,
+        concurrency: int,
+        duration_seconds: float,
+        warm_up_seconds: float,
+        think_seconds: float,
+        meets: int,
+        polls: int,
+        seed: int,
+    ) -> None:
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.duration_seconds = duration_seconds
+        self.warm_up_seconds = warm_up_seconds
+        self.think_seconds = think_seconds
+        self.meets = meets
+        self.polls = polls
+        self.seed = seed
+
+    def to_dict(self) -> dict[str, Any]:
+        return dict(vars(self))
+
+
+async def _virtual_user(client: LoadTestClient, fixture: Fixture, email: str, settings: LoadTestSettings, rng: random.Random) -> None:
+    while True:
+        try:
+            await trainer_session(client, fixture, email, settings.polls, settings.think_seconds, rng)
+        except LoadTestError as e:
+            if client.stats.recording:
+                print(f"Session aborted: {e}")
+            await asyncio.sleep(ERROR_PAUSE_SECONDS)
+
+
+async def run_load_test(settings: LoadTestSettings) -> dict[str, Any]:
+    """Run the load test, one virtual trainer for each concurrent session, and return the results"""
+
+    stats = LoadTestStats()
+    limits = httpx.Limits(max_connections=settings.concurrency, max_keepalive_connections=settings.concurrency)
+
+    async with httpx.AsyncClient(base_url=settings.base_url, limits=limits, timeout=REQUEST_TIMEOUT_SECONDS) as http_client:
+        client = LoadTestClient(http_client, stats)
+
+        run_id = f"{int(time.time())}-{random.randrange(1 << 16):04x}"
+        print(f"Preparing the load test {run_id}: {settings.concurrency} trainers, {settings.meets} meets")
+        fixture = await prepare(client, run_id, settings.concurrency, settings.meets, settings.concurrency)
+
+        tasks = [
+            asyncio.create_task(_virtual_user(client, fixture, email, settings, random.Random(settings.seed + i)))
+            for i, email in enumerate(fixture.trainer_emails)
+        ]
+
+        try:
+            print(f"Warming up for {settings.warm_up_seconds}s")
+            await asyncio.sleep(settings.warm_up_seconds)
+
+            print(f"Measuring for {settings.duration_seconds}s")
+            started_at = datetime.now()
+            stats.start()
+            await asyncio.sleep(settings.duration_seconds)
+            stats.stop()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {"settings": settings.to_dict(), "started_at": started_at.isoformat(timespec="seconds"), **stats.to_dict()}
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+import httpx
+
+from benchmarks.load_test.stats import LoadTestStats
+
+PASSWORD = "load-test-password"
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "assets")
+
+
+class LoadTestError(Exception):
+    """Unexpected response in a scenario, the session of the virtual user is aborted"""
+
+
+class LoadTestClient:
+    """HTTP client of the load test, records the latency of every request by route"""
+
+    def __init__(self, client: httpx.AsyncClient, stats: LoadTestStats) -> None:
+        self.client = client
+        self.stats = stats
+
+    async def call(
+        self, method: str, route: str, params: dict[str, Any] | None = None, files: dict[str, Any] | None = None
+    ) -> httpx.Response:
+        started_at = time.perf_counter()
+
+        try:
+            response = await self.client.request(method, route, params=params, files=files)
+        except httpx.HTTPError as e:
+            self.stats.record(route, time.perf_counter() - started_at, None)
+            raise LoadTestError(f"{method} {route} failed: {e!r}") from e
+
+        # the body is read by the request, so the latency includes the download of the body
+        self.stats.record(route, time.perf_counter() - started_at, response.status_code)
+
+        if response.status_code >= 400:
+            raise LoadTestError(f"{method} {route} returned {response.status_code}: {response.text[:200]}")
+
+        return response
+
+    async def post(self, route: str, **params: Any) -> Any:
+        response = await self.call("POST", route, params=params)
+        return response.json()
+
+    async def get(self, route: str, **params: Any) -> bytes:
+        response = await self.call("GET", route, params=params)
+        return response.content
+
+
+class Fixture:
+    """The data of the load test, created before the measured period"""
+
+    coach_id: str
+    group_id: str
+    meet_ids: list[str]
+    trainer_emails: list[str]
+
+    def __init__(self, coach_id: str, group_id: str, meet_ids: list[str], trainer_emails: list[str]) -> None:
+        self.coach_id = coach_id
+        self.group_id = group_id
+        self.meet_ids = meet_ids
+        self.trainer_emails = trainer_emails
+
+
+def _read_asset(name: str) -> bytes:
+    with open(os.path.join(ASSETS_DIR, name), "rb") as f:
+        return f.read()
+
+
+async def _signup_and_login(client: LoadTestClient, name: str, email: str) -> dict[str, Any]:
+    await client.post(
+        "/auth/signup", name=name, email=email, password=PASSWORD, phone="0500000000", gender="male", date_of_birth="2000-01-01"
+    )
+    return await client.post("/auth/login", email=email, password=PASSWORD)
+
+
+async def _prepare_trainer(client: LoadTestClient, email: str, group_id: str, semaphore: asyncio.Semaphore) -> None:
+    async with semaphore:
+        login = await _signup_and_login(client, "Load Test Trainer", email)
+        await client.post("/group/register-to-group", auth_token=login["auth_token"], group_id=group_id)
+
+
+async def prepare(client: LoadTestClient, run_id: str, trainers_count: int, meets_count: int, concurrency: int) -> Fixture:
+    """Create a coach with a profile picture, a group with meets and the trainers of the group"""
+
+    coach_login = await _signup_and_login(client, "Load Test Coach", f"load-test-{run_id}-coach@solutrain.com")
+    coach_token = coach_login["auth_token"]
+    picture = _read_asset("avatar_man_image.png")
+
+    await client.call(
+        "POST", "/profile/upload-first-certificate", params={"auth_token": coach_token}, files={"file": ("certificate.png", picture)}
+    )
+    await client.call(
+        "POST", "/profile/upload-profile-picture", params={"auth_token": coach_token}, files={"file": ("picture.png", picture)}
+    )
+
+    group = await client.post(
+        "/create-group/create",
+        auth_token=coach_token,
+        name=f"Load Test {run_id}",
+        description="Group of the load test",
+        area_id=coach_login["areas"][0]["area_id"],
+    )
+
+    meet_ids: list[str] = []
+    for i in range(meets_count):
+        meet_date = datetime.now().replace(hour=18, minute=0, second=0, microsecond=0) + timedelta(days=i + 1)
+        meet = await client.post(
+            "/create-meet/create",
+            auth_token=coach_token,
+            group_id=group["group_id"],
+            max_members=trainers_count + 1,
+            meet_date=meet_date.strftime("%Y-%m-%d %H:%M:%S"),
+            duration=60,
+            city="Tel Aviv",
+            street="Dizengoff 100",
+        )
+        meet_ids.append(meet["meet_id"])
+
+    trainer_emails = [f"load-test-{run_id}-trainer-{i}@solutrain.com" for i in range(trainers_count)]
+    semaphore = asyncio.Semaphore(concurrency)
+    await asyncio.gather(*[_prepare_trainer(client, email, group["group_id"], semaphore) for email in trainer_emails])
+
+    return Fixture(coach_login["user"]["user_id"], group["group_id"], meet_ids, trainer_emails)
+
+
+async def trainer_session(
+    client: LoadTestClient, fixture: Fixture, email: str, polls: int, think_seconds: float, rng: random.Random
+) -> None:
+    """A session of a trainer in the app, from the login to the logout"""
+
+    async def think() -> None:
+        if think_seconds:
+            await asyncio.sleep(rng.uniform(0, 2 * think_seconds))
+
+    login = await client.post("/auth/login", email=email, password=PASSWORD)
+    auth_token = login["auth_token"]
+    await think()
+
+    await client.post("/my-groups/get", auth_token=auth_token)
+    await client.get("/profile/get-profile-picture", auth_token=auth_token)
+    await think()
+
+    await client.post("/group/get", auth_token=auth_token, group_id=fixture.group_id)
+    await client.get("/view-coach/get-profile-picture", auth_token=auth_token, coach_id=fixture.coach_id)
+    await think()
+
+    meet_id = rng.choice(fixture.meet_ids)
+    await client.post("/group/register-to-meet", auth_token=auth_token, meet_id=meet_id)
+    await client.post("/my-meets/get", auth_token=auth_token)
+    await think()
+
+    notifications = await client.post("/notifications/get", auth_token=auth_token)
+    cursor = notifications["cursor"]
+    for _ in range(polls):
+        await think()
+        notifications = await client.post("/notifications/get", auth_token=auth_token, since=cursor)
+        cursor = notifications["cursor"]
+        await client.post("/notifications/get-unread-count", auth_token=auth_token)
+
+    await client.post("/group/unregister-to-meet", auth_token=auth_token, meet_id=meet_id)
+    await client.post("/auth/logout", auth_token=auth_token)
@@ -0,0 +1,134 @@
+import json
+import math
+import time
+from typing import Any
+
+PERCENTILES = [50, 95, 99]
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Return the nearest-rank percentile of sorted values"""
+
+    if not sorted_values:
+        return 0.0
+
+    rank = math.ceil(p / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+class RouteStats:
+    latencies: list[float]
+    errors: int
+    status_codes: dict[str, int]
+
+    def __init__(self) -> None:
+        self.latencies = []
+        self.errors = 0
+        self.status_codes = {}
+
+    def to_dict(self, duration_seconds: float) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+
+        result: dict[str, Any] = {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "throughput": len(latencies) / duration_seconds if duration_seconds else 0.0,
+            "status_codes": self.status_codes,
+        }
+
+        for p in PERCENTILES:
+            result[f"p{p}_ms"] = percentile(latencies, p) * 1000
+
+        result["max_ms"] = latencies[-1] * 1000 if latencies else 0.0
+
+        return result
+
+
+class LoadTestStats:
+    """Latencies of the requests by route, recorded only in the measured period of the load test (after the warm up)"""
+
+    def __init__(self) -> None:
+        self.routes: dict[str, RouteStats] = {}
+        self.total = RouteStats()
+        self.recording = False
+        self._started_at = 0.0
+        self._stopped_at = 0.0
+
+    def start(self) -> None:
+        self.recording = True
+        self._started_at = time.perf_counter()
+
+    def stop(self) -> None:
+        self.recording = False
+        self._stopped_at = time.perf_counter()
+
+    @property
+    def duration_seconds(self) -> float:
+        return self._stopped_at - self._started_at
+
+    def record(self, route: str, seconds: float, status_code: int | None) -> None:
+        """Record a request of the route, status code None for a request failed without response"""
+
+        if not self.recording:
+            return
+
+        status_name = "failed" if status_code is None else str(status_code)
+        is_error = status_code is None or status_code >= 400
+
+        for stats in (self.routes.setdefault(route, RouteStats()), self.total):
+            stats.latencies.append(seconds)
+            stats.status_codes[status_name] = stats.status_codes.get(status_name, 0) + 1
+            if is_error:
+                stats.errors += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        duration_seconds = self.duration_seconds
+
+        return {
+            "duration_seconds": duration_seconds,
+            "total": self.total.to_dict(duration_seconds),
+            "routes": {route: self.routes[route].to_dict(duration_seconds) for route in sorted(self.routes)},
+        }
+
+
+def _format_row(name: str, values: dict[str, Any]) -> str:
+    percentiles = "".join(f"{values[f'p{p}_ms']:>10.1f}" for p in PERCENTILES)
+    return f"{name:<40}{values['requests']:>10}{values['errors']:>8}{values['throughput']:>10.1f}{percentiles}{values['max_ms']:>10.1f}"
+
+
+def print_report(results: dict[str, Any]) -> None:
+    percentiles = "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+    print(f"{'route':<40}{'requests':>10}{'errors':>8}{'req/s':>10}{percentiles}{'max ms':>10}")
+
+    for route, values in results["routes"].items():
+        print(_format_row(route, values))
+
+    print(_format_row("total", results["total"]))
+
+
+def _format_change(current: float, baseline: float) -> str:
+    if not baseline:
+        return f"{'-':>10}"
+    return f"{(current - baseline) / baseline * 100:>+9.1f}%"
+
+
+def print_comparison(results: dict[str, Any], baseline_path: str) -> None:
+    """Print the change of the throughput and the tail latencies of every route from the results of a previous run"""
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"Compared to {baseline_path} ({baseline['settings']['concurrency']} concurrency):")
+    print(f"{'route':<40}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+
+    rows = [(route, values, baseline["routes"].get(route)) for route, values in results["routes"].items()]
+    rows.append(("total", results["total"], baseline["total"]))
+
+    for route, values, baseline_values in rows:
+        if baseline_values is None:
+            print(f"{route:<40}{'new route':>10}")
+            continue
+
+        changes = _format_change(values["throughput"], baseline_values["throughput"])
+        changes += "".join(_format_change(values[f"p{p}_ms"], baseline_values[f"p{p}_ms"]) for p in PERCENTILES)
+        print(f"{route:<40}{changes}")
@@ -0,0 +1,4 @@
+import time
+
+# start of the import of the API, for the startup timings
+IMPORT_STARTED_AT = time.perf_counter()
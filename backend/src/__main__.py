@@ -2,25 +2,53 @@ import sys
 
 import uvicorn
 
-from src.app import app
+from src.maintenance import archive_meets, repair_counters
 from src.migrations import migrate_db
+from src.seed import seed
+from src.serve import serve
+from src.startup import check_import_time
 
 
 def main() -> None:
     if len(sys.argv) > 1:
+        if sys.argv[1] == "serve":
+            serve()
+            return
+
         if sys.argv[1] == "migrate":
             migrate_db()
             return
 
+        if sys.argv[1] == "seed":
+            seed()
+            return
+
+        if sys.argv[1] == "repair-counters":
+            repair_counters()
+            return
+
+        if sys.argv[1] == "archive-meets":
+            archive_meets()
+            return
+
+        if sys.argv[1] == "check-import-time":
+            check_import_time()
+            return
+
         if sys.argv[1] != "help":
             print("Unknown command ", sys.argv[1])
             print("")
 
-        print("Usage: python -m src [migrate]")
+        print("Usage: python -m src [serve|migrate|seed|repair-counters|archive-meets|check-import-time]")
+        print("  serve: Run the server in production, with multiple workers")
         print("  migrate: Create the database DDL")
+        print("  seed: Fill the database with large scale synthetic data, for performance testing")
+        print("  repair-counters: Check the maintained counters and repair drift")
+        print("  archive-meets: Move the past meets to the history tables")
+        print("  check-import-time: Check the import time of the app (cold start) against the budget")
         return
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run("src.app:app", host="0.0.0.0", port=8000)
 
 
 if __name__ == "__main__":
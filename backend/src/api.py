@@ -1,3 +1,23 @@
+from datetime import datetime
+from typing import Any
+
+import pydantic_core
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+from src.tracing import start_span
+
+API_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded by pydantic-core (Rust) instead of the json module, the default response class of the API"""
+
+    def render(self, content: Any) -> bytes:
+        with start_span("serialize response"):
+            return pydantic_core.to_json(content)
+
+
 def get_api_media_type(name: str) -> str:
     if name.endswith(".pdf"):
         return "application/pdf"
@@ -7,3 +27,12 @@ def get_api_media_type(name: str) -> str:
         return "image/png"
 
     return "application/octet-stream"
+
+
+def normalize_api_date(date: str, name: str) -> str:
+    """Return the date in the format of the dates in the database, raise 400 if the date is invalid"""
+
+    try:
+        return datetime.strptime(date, API_DATE_FORMAT).strftime(API_DATE_FORMAT)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {name}, the format is YYYY-MM-DD HH:MM:SS") from e
@@ -1,51 +1,159 @@
 from contextlib import asynccontextmanager
 from typing import AsyncIterator
 
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
-
-from src.config import init_config
-from src.logger import get_logger, init_loggers
+from fastapi import FastAPI, Request, status
+from fastapi.responses import PlainTextResponse, RedirectResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.api import FastJSONResponse
+from src.autocomplete import start_autocomplete_listener, stop_autocomplete_listener
+from src.compression import CompressionMiddleware
+from src.config import config, init_config
+from src.deadlines import DeadlineMiddleware
+from src.exceptions import DBTimeoutException, DBUnavailableException
+from src.jobs import start_jobs, stop_jobs
+from src.logger import RequestContextMiddleware, close_loggers, get_logger, init_loggers
+from src.metrics import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, render_metrics
 from src.models import close_db, init_db
+from src.notifications_stream import start_notifications_listener, stop_notifications_listener
+from src.rate_limit import RateLimitMiddleware
+from src.readiness import AdmissionMiddleware, get_readiness, start_readiness_checks, stop_readiness_checks
 from src.routers.auth import router as auth_router
+from src.routers.autocomplete import router as autocomplete_router
+from src.routers.batch import router as batch_router
 from src.routers.create_group import router as create_group_router
 from src.routers.create_meet import router as create_meet_router
-from src.routers.debug import router as debug_router
 from src.routers.group import router as group_router
 from src.routers.meet import router as meet_router
 from src.routers.my_groups import router as my_groups_router
 from src.routers.my_meets import router as my_meets_router
 from src.routers.notifications import router as notifications_router
+from src.routers.notifications_stream import router as notifications_stream_router
 from src.routers.profile import router as profile_router
 from src.routers.search_groups import router as search_groups_router
+from src.routers.search_meets import router as search_meets_router
 from src.routers.view_coach import router as view_coach_router
 from src.routers.view_trainer import router as view_trainer_router
+from src.schemas import ReadinessSchema
+from src.startup import StartupTimings, get_import_seconds, mark_import_done, start_warm_up, stop_warm_up
+from src.tracing import TracingMiddleware, close_tracing, init_tracing
+
+DEBUG_ROUTES_PREFIX = "/debug"
+
+g_debug_routes_included = False
+
+
+def include_debug_router(app: FastAPI) -> None:
+    """Include the debug routes once, imported only when they are included"""
+
+    global g_debug_routes_included
+    if g_debug_routes_included:
+        return
+
+    from src.routers.debug import router as debug_router
+
+    app.include_router(debug_router, prefix=DEBUG_ROUTES_PREFIX)
+    g_debug_routes_included = True
+
+
+class LazyDebugRoutesMiddleware:
+    """Include the debug routes on the first request of their prefix, so the startup does not import them (when they are enabled)"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            not g_debug_routes_included
+            and config.debug_routes
+            and scope["type"] == "http"
+            and (scope["path"] == DEBUG_ROUTES_PREFIX or scope["path"].startswith(f"{DEBUG_ROUTES_PREFIX}/"))
+        ):
+            include_debug_router(scope["app"])
+
+        await self.app(scope, receive, send)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     """Initialize and close the server"""
 
-    init_config()
-    init_loggers()
+    timings = StartupTimings()
+    timings.add("import", get_import_seconds())
+
+    with timings.measure("config"):
+        init_config()
+        init_loggers()
+        init_tracing()
 
     get_logger().info("The server started.")
 
-    init_db()
+    # the pool fills in the background, the initialization that needs the database runs in the warm up
+    with timings.measure("database"):
+        init_db(wait=False)
+
+    start_warm_up()
+    start_readiness_checks()
+    start_jobs()
+    start_notifications_listener()
+    start_autocomplete_listener()
+
+    timings.report("Startup done")
 
     yield None
 
+    await stop_autocomplete_listener()
+    await stop_notifications_listener()
+    await stop_jobs()
+    await stop_readiness_checks()
+    await stop_warm_up()
+
     close_db()
 
     get_logger().info("The server closed.")
 
+    close_tracing()
+    close_loggers()
+
 
 app = FastAPI(
     title="SoluTrain",
     description="SoluTrain API",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
+# innermost, the debug routes are included before the routing of their first request
+app.add_middleware(LazyDebugRoutesMiddleware)
+app.add_middleware(CompressionMiddleware)
+# inside the metrics, so the rejected requests are in the metrics
+app.add_middleware(AdmissionMiddleware)
+# before the admission control, the rate limited clients do not count in the load
+app.add_middleware(RateLimitMiddleware)
+# outermost, so the duration includes the compression
+app.add_middleware(MetricsMiddleware)
+# the span of the request includes the whole response
+app.add_middleware(TracingMiddleware)
+# the request id is in all the log records of the request
+app.add_middleware(RequestContextMiddleware)
+# the deadline is from the start of the request
+app.add_middleware(DeadlineMiddleware)
+
+
+@app.exception_handler(DBUnavailableException)
+async def db_unavailable_handler(request: Request, e: DBUnavailableException) -> FastJSONResponse:
+    return FastJSONResponse(
+        {"detail": "The database is unavailable, retry later"},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(config.admission_retry_after_seconds)},
+    )
+
+
+@app.exception_handler(DBTimeoutException)
+async def db_timeout_handler(request: Request, e: DBTimeoutException) -> FastJSONResponse:
+    return FastJSONResponse({"detail": "The request timed out"}, status_code=status.HTTP_504_GATEWAY_TIMEOUT)
+
+
 # Include routers
 app.include_router(auth_router, prefix="/auth")
 app.include_router(create_group_router, prefix="/create-group")
@@ -56,10 +164,13 @@ app.include_router(my_groups_router, prefix="/my-groups")
 app.include_router(my_meets_router, prefix="/my-meets")
 app.include_router(profile_router, prefix="/profile")
 app.include_router(search_groups_router, prefix="/search-groups")
+app.include_router(search_meets_router, prefix="/search-meets")
+app.include_router(autocomplete_router, prefix="/autocomplete")
 app.include_router(view_coach_router, prefix="/view-coach")
 app.include_router(view_trainer_router, prefix="/view-trainer")
 app.include_router(notifications_router, prefix="/notifications")
-app.include_router(debug_router, prefix="/debug")
+app.include_router(notifications_stream_router, prefix="/notifications-stream")
+app.include_router(batch_router, prefix="/batch")
 
 
 @app.get("/", include_in_schema=False)
@@ -71,3 +182,22 @@ def root() -> RedirectResponse:
 @app.post("/health-check")
 def health_check() -> dict:
     return {"status": "ok"}
+
+
+# async, so the probe is answered on the event loop while the thread pool is busy
+@app.get("/ready")
+async def ready() -> FastJSONResponse:
+    """Readiness probe of the load balancer, 503 while the server should not get traffic (the health check is the liveness probe)"""
+
+    readiness = get_readiness()
+    return FastJSONResponse(
+        ReadinessSchema.from_model(readiness).model_dump(), status_code=200 if readiness.ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+mark_import_done()
@@ -0,0 +1,272 @@
+import asyncio
+import json
+import threading
+from bisect import bisect_left, insort
+from enum import StrEnum
+from typing import Any
+from uuid import UUID
+
+import psycopg
+from psycopg import sql
+from starlette.concurrency import run_in_threadpool
+
+from src.logger import get_logger
+from src.models import get_conninfo, get_db
+from src.models.groups import AUTOCOMPLETE_CHANNEL, Group, get_all_groups, notify_autocomplete
+from src.models.users import AUTH_TOKENS_CHANNEL
+from src.security import auth_tokens_cache
+
+LISTENER_RECONNECT_SECONDS = 5
+
+g_listener_task: None | asyncio.Task = None
+
+
+class SuggestionKind(StrEnum):
+    group = "group"
+    coach = "coach"
+
+
+class Suggestion:
+    text: str
+    kind: SuggestionKind
+    item_id: UUID
+
+    def __init__(self, text: str, kind: SuggestionKind, item_id: UUID):
+        self.text = text
+        self.kind = kind
+        self.item_id = item_id
+
+
+# entry of the index: (search key, kind, item id, original text)
+_Entry = tuple[str, SuggestionKind, UUID, str]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def _make_entries(text: str, kind: SuggestionKind, item_id: UUID) -> list[_Entry]:
+    """Return entry for each word of the text, so a prefix of any word in the text matches"""
+
+    words = _normalize(text).split(" ")
+
+    return [(" ".join(words[i:]), kind, item_id, text) for i in range(len(words)) if words[i]]
+
+
+class PrefixIndex:
+    """
+    In-process prefix index of group names and coach names, kept as sorted array and searched with bisect.
+    Writers replace the array (copy on write) under a lock, so searches never lock.
+    The index is per process, each worker builds its own and applies the changes of all the workers (by the listener).
+    The changes are idempotent, the listener may apply a change that is already in the built index.
+    """
+
+    def __init__(self) -> None:
+        self._entries: list[_Entry] = []
+        self._group_ids: set[UUID] = set()
+        self._coaches_groups_count: dict[UUID, int] = {}
+        self._lock = threading.Lock()
+
+    def build(self, groups: list[tuple[Group, str]]) -> None:
+        entries: list[_Entry] = []
+        group_ids: set[UUID] = set()
+        coaches_groups_count: dict[UUID, int] = {}
+
+        for group, coach_name in groups:
+            entries += _make_entries(group.name, SuggestionKind.group, group.group_id)
+            group_ids.add(group.group_id)
+
+            if group.coach_id not in coaches_groups_count:
+                entries += _make_entries(coach_name, SuggestionKind.coach, group.coach_id)
+            coaches_groups_count[group.coach_id] = coaches_groups_count.get(group.coach_id, 0) + 1
+
+        entries.sort()
+
+        with self._lock:
+            self._entries = entries
+            self._group_ids = group_ids
+            self._coaches_groups_count = coaches_groups_count
+
+    def add_group(self, group_id: UUID, coach_id: UUID, name: str, coach_name: str) -> None:
+        with self._lock:
+            if group_id in self._group_ids:
+                return
+
+            added = _make_entries(name, SuggestionKind.group, group_id)
+
+            coach_groups_count = self._coaches_groups_count.get(coach_id, 0)
+            if coach_groups_count == 0:
+                added += _make_entries(coach_name, SuggestionKind.coach, coach_id)
+            self._coaches_groups_count[coach_id] = coach_groups_count + 1
+            self._group_ids.add(group_id)
+
+            # a copy of the array, the searches may be reading the current one
+            entries = list(self._entries)
+            for entry in added:
+                insort(entries, entry)
+
+            self._entries = entries
+
+    def remove_group(self, group_id: UUID, coach_id: UUID, name: str, coach_name: str) -> None:
+        with self._lock:
+            if group_id not in self._group_ids:
+                return
+
+            removed = set(_make_entries(name, SuggestionKind.group, group_id))
+
+            coach_groups_count = self._coaches_groups_count.get(coach_id, 0)
+            if coach_groups_count <= 1:
+                removed.update(_make_entries(coach_name, SuggestionKind.coach, coach_id))
+                self._coaches_groups_count.pop(coach_id, None)
+            else:
+                self._coaches_groups_count[coach_id] = coach_groups_count - 1
+            self._group_ids.discard(group_id)
+
+            self._entries = [entry for entry in self._entries if entry not in removed]
+
+    def rename_coach(self, coach_id: UUID, old_name: str, new_name: str) -> None:
+        with self._lock:
+            if coach_id not in self._coaches_groups_count:
+                return
+
+            removed = set(_make_entries(old_name, SuggestionKind.coach, coach_id))
+            if not any(entry in removed for entry in self._entries):
+                return
+
+            entries = [entry for entry in self._entries if entry not in removed]
+            for entry in _make_entries(new_name, SuggestionKind.coach, coach_id):
+                insort(entries, entry)
+
+            self._entries = entries
+
+    def apply_change(self, payload: str) -> None:
+        """Apply a change of the groups, from the notification of the worker that made it"""
+
+        try:
+            change = json.loads(payload)
+            event = change["event"]
+
+            if event == "group_added":
+                self.add_group(UUID(change["group_id"]), UUID(change["coach_id"]), change["name"], change["coach_name"])
+            elif event == "group_removed":
+                self.remove_group(UUID(change["group_id"]), UUID(change["coach_id"]), change["name"], change["coach_name"])
+            elif event == "coach_renamed":
+                self.rename_coach(UUID(change["coach_id"]), change["old_name"], change["new_name"])
+            else:
+                get_logger().error(f"Invalid autocomplete change: {payload}")
+        except (ValueError, KeyError):
+            get_logger().error(f"Invalid autocomplete change: {payload}")
+
+    def search(self, prefix: str, limit: int) -> list[Suggestion]:
+        key = _normalize(prefix)
+        if not key:
+            return []
+
+        entries = self._entries
+
+        suggestions: list[Suggestion] = []
+        found: set[tuple[SuggestionKind, UUID]] = set()
+
+        i = bisect_left(entries, (key,))
+        while i < len(entries) and len(suggestions) < limit:
+            entry_key, kind, item_id, text = entries[i]
+            if not entry_key.startswith(key):
+                break
+
+            if (kind, item_id) not in found:
+                found.add((kind, item_id))
+                suggestions.append(Suggestion(text=text, kind=kind, item_id=item_id))
+
+            i += 1
+
+        return suggestions
+
+
+autocomplete_index = PrefixIndex()
+
+
+def init_autocomplete(db: psycopg.Connection) -> None:
+    """Build the autocomplete index from the groups in the database"""
+
+    autocomplete_index.build(get_all_groups(db))
+
+
+# the changes are sent by notifications, delivered to the listeners of all the workers on commit (the writer worker included)
+def publish_group_added(db: psycopg.Connection, group: Group, coach_name: str) -> None:
+    _publish_change(db, _get_group_change("group_added", group, coach_name))
+
+
+def publish_group_removed(db: psycopg.Connection, group: Group, coach_name: str) -> None:
+    _publish_change(db, _get_group_change("group_removed", group, coach_name))
+
+
+def _get_group_change(event: str, group: Group, coach_name: str) -> dict[str, Any]:
+    return {"event": event, "group_id": str(group.group_id), "coach_id": str(group.coach_id), "name": group.name, "coach_name": coach_name}
+
+
+def publish_coach_renamed(db: psycopg.Connection, coach_id: UUID, old_name: str, new_name: str) -> None:
+    _publish_change(db, {"event": "coach_renamed", "coach_id": str(coach_id), "old_name": old_name, "new_name": new_name})
+
+
+def _publish_change(db: psycopg.Connection, change: dict[str, Any]) -> None:
+    notify_autocomplete(db, json.dumps(change))
+
+
+def _rebuild() -> None:
+    with get_db() as db:
+        init_autocomplete(db)
+
+
+def _remove_auth_token(payload: str) -> None:
+    try:
+        auth_tokens_cache.remove(UUID(payload))
+    except ValueError:
+        get_logger().error(f"Invalid auth tokens event: {payload}")
+
+
+async def _listen() -> None:
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(get_conninfo(), autocommit=True) as conn:
+                await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(AUTOCOMPLETE_CHANNEL)))
+                # the deleted auth tokens share the connection of the listener
+                await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(AUTH_TOKENS_CHANNEL)))
+
+                # after the LISTEN, so the changes since the build are applied; changes may be lost while the listener was not connected
+                auth_tokens_cache.clear()
+                await run_in_threadpool(_rebuild)
+
+                async for notify in conn.notifies():
+                    if notify.channel == AUTH_TOKENS_CHANNEL:
+                        _remove_auth_token(notify.payload)
+                    else:
+                        autocomplete_index.apply_change(notify.payload)
+        except Exception as e:
+            get_logger().error(f"Autocomplete listener disconnected: {e}")
+
+        await asyncio.sleep(LISTENER_RECONNECT_SECONDS)
+
+
+def start_autocomplete_listener() -> None:
+    """
+    Start the listener of the changes of the autocomplete index (and of the deleted auth tokens of the cache),
+    the index is built when the listener connects
+    """
+
+    global g_listener_task
+    if g_listener_task is not None:
+        return
+
+    g_listener_task = asyncio.create_task(_listen())
+
+
+async def stop_autocomplete_listener() -> None:
+    """Stop the listener of the changes of the autocomplete index"""
+
+    global g_listener_task
+    if g_listener_task is None:
+        return
+
+    g_listener_task.cancel()
+    await asyncio.gather(g_listener_task, return_exceptions=True)
+    g_listener_task = None
@@ -0,0 +1,115 @@
+import gzip
+import importlib
+from types import ModuleType
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import config
+
+brotli: ModuleType | None
+try:
+    brotli = importlib.import_module("brotli")
+except ImportError:  # brotli is optional, without it only gzip is used
+    brotli = None
+
+# media types worth compressing, the images are already compressed and the streams are sent uncompressed
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "text/html", "text/plain", "text/css", "application/javascript")
+
+
+def _get_accepted_encoding(accept_encoding: str) -> str | None:
+    """Return the encoding for the response by the Accept-Encoding header of the request, brotli preferred"""
+
+    accepted: set[str] = set()
+
+    for part in accept_encoding.split(","):
+        encoding, _, params = part.partition(";")
+        param_name, _, param_value = params.partition("=")
+
+        # q=0 means not acceptable
+        if param_name.strip() == "q":
+            try:
+                if float(param_value) <= 0:
+                    continue
+            except ValueError:
+                continue
+
+        accepted.add(encoding.strip().lower())
+
+    if brotli is not None and "br" in accepted:
+        return "br"
+
+    if "gzip" in accepted:
+        return "gzip"
+
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=config.compression_brotli_quality)
+
+    return gzip.compress(body, compresslevel=config.compression_gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compress the responses with brotli (when installed) or gzip, by the Accept-Encoding of the request.
+    Only complete responses (not streamed) of compressible media types, above the minimum size, are compressed.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or config.compression_gzip_level <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = _get_accepted_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, _CompressionResponder(send, encoding).send)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str) -> None:
+        self._send = send
+        self._encoding = encoding
+        self._start_message: Message | None = None
+        self._started = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # wait for the first body, to know if the response is complete and its size
+            self._start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self._started or self._start_message is None:
+            await self._send(message)
+            return
+
+        self._started = True
+
+        body: bytes = message.get("body", b"")
+        headers = MutableHeaders(raw=self._start_message["headers"])
+
+        media_type = headers.get("Content-Type", "").split(";")[0].strip()
+        compressible = media_type in COMPRESSIBLE_MEDIA_TYPES and "Content-Encoding" not in headers
+
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+
+        if compressible and not message.get("more_body", False) and len(body) >= config.compression_minimum_size:
+            body = _compress(body, self._encoding)
+
+            headers["Content-Encoding"] = self._encoding
+            headers["Content-Length"] = str(len(body))
+
+            message = {**message, "body": body}
+
+        await self._send(self._start_message)
+        await self._send(message)
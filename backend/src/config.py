@@ -14,10 +14,96 @@ class Config:
     pg_host: str = ""
     pg_port: str = "5432"
 
+    # connections of the pool of each worker
+    pg_pool_min_size: int = 1
+    pg_pool_max_size: int = 2
+
+    # wait for connection of the pool (503 after it), statement timeout of the queries (504 after it, 0 disables)
+    pg_pool_timeout_seconds: int = 5
+    pg_statement_timeout_ms: int = 10000
+
+    # deadline of each request from its start, the named queries do not run after it (0 disables the deadlines)
+    request_deadline_ms: int = 15000
+
     logger_level: str = "DEBUG"
 
+    # format of the log records (text or json), percent of the debug records kept by logger name (app.db=10,app.jobs=50)
+    log_format: str = "text"
+    log_sampling: dict[str, int] = {"app.db": 10}
+
+    # seconds of the user ids of the auth tokens in the cache of each worker (0 disables the cache), logouts remove them at once
+    auth_token_cache_seconds: int = 10
+
+    # include the debug routes, they are imported on the first request of /debug
+    debug_routes: bool = True
+
     assets_dir: str = "assets"
 
+    # archive meets older than the horizon, in batches, every interval (0 disables the job in the server)
+    archive_meets_after_days: int = 30
+    archive_meets_batch_size: int = 500
+    archive_meets_interval_minutes: int = 60
+
+    # drop monthly partitions of notifications older than the retention, checked every interval
+    notifications_retention_months: int = 6
+    notifications_retention_interval_hours: int = 24
+
+    notifications_stream_heartbeat_seconds: int = 15
+
+    # compression of the responses above the minimum size in bytes (gzip level 0 disables the compression)
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
+    # log the named queries slower than the threshold (0 disables), explain the percent of them (0 disables the EXPLAIN)
+    slow_query_ms: int = 200
+    slow_query_explain_percent: int = 0
+
+    # token of the protected debug routes, in the X-Debug-Token header (empty disables the protected routes)
+    debug_token: str = ""
+
+    # the cached ping of the database of the readiness probe, reject requests while more requests wait for the pool (0 disables)
+    readiness_ping_interval_seconds: int = 5
+    readiness_ping_timeout_seconds: int = 2
+    admission_max_waiting: int = 16
+    admission_retry_after_seconds: int = 1
+
+    # token buckets of the auth routes (per IP address) and the upload routes (per IP address and per auth token), 0 disables the limit.
+    # the buckets are in the memory of each worker, so the limits of the server are these limits times the serve workers
+    rate_limit_auth_per_minute: int = 20
+    rate_limit_auth_burst: int = 10
+    rate_limit_upload_per_minute: int = 30
+    rate_limit_upload_burst: int = 10
+    rate_limit_upload_token_per_minute: int = 10
+    rate_limit_upload_token_burst: int = 5
+
+    # addresses of the proxies trusted for the X-Forwarded-For and X-Forwarded-Proto headers, separated by commas (* trusts all)
+    forwarded_allow_ips: str = "127.0.0.1"
+
+    # export the spans of the traced requests to the console or the file ("" disables the tracing)
+    tracing_exporter: str = ""
+    tracing_file: str = "traces.jsonl"
+    tracing_sample_percent: int = 100
+
+    # the serve command (0 workers means worker for each CPU, 0 max requests disables the recycling of the workers)
+    serve_host: str = "0.0.0.0"
+    serve_port: int = 8000
+    serve_workers: int = 0
+    serve_max_requests: int = 10000
+    serve_max_requests_jitter: int = 1000
+    serve_graceful_timeout_seconds: int = 30
+
+    # the seed command, synthetic data for performance testing (0 workers means worker for each CPU)
+    seed_users: int = 10000
+    seed_coaches: int = 200
+    seed_groups: int = 1000
+    seed_groups_per_trainer: int = 3
+    seed_meets_per_group: int = 4
+    seed_notifications_per_user: int = 5
+    seed_pictures_percent: int = 30
+    seed_workers: int = 0
+    seed_random_seed: int = 0
+
 
 config = Config()
 
@@ -29,6 +115,36 @@ def _get_envioment_variable(variable_name: str) -> str:
     return variable
 
 
+def _get_int_envioment_variable(variable_name: str, default: int) -> int:
+    variable = os.environ.get(variable_name)
+    if variable is None:
+        return default
+
+    try:
+        return int(variable)
+    except ValueError as e:
+        raise CriticalException(f"Environment variable {variable_name} must be integer") from e
+
+
+def _get_log_sampling_envioment_variable(variable_name: str, default: dict[str, int]) -> dict[str, int]:
+    variable = os.environ.get(variable_name)
+    if variable is None:
+        return default
+
+    sampling: dict[str, int] = {}
+    for item in variable.split(","):
+        if not item.strip():
+            continue
+
+        name, _, percent = item.partition("=")
+        try:
+            sampling[name.strip()] = int(percent)
+        except ValueError as e:
+            raise CriticalException(f"Environment variable {variable_name} must be logger=percent pairs, separated by commas") from e
+
+    return sampling
+
+
 def init_config() -> None:
     """Initialize configuration from environment variables"""
 
@@ -43,3 +159,120 @@ def init_config() -> None:
     pg_port = os.environ.get("PG_PORT")
     if pg_port is not None:
         config.pg_port = pg_port
+
+    config.pg_pool_min_size = _get_int_envioment_variable("PG_POOL_MIN_SIZE", config.pg_pool_min_size)
+    config.pg_pool_max_size = _get_int_envioment_variable("PG_POOL_MAX_SIZE", config.pg_pool_max_size)
+
+    if config.pg_pool_min_size < 1 or config.pg_pool_max_size < config.pg_pool_min_size:
+        raise CriticalException("Environment variables PG_POOL_MIN_SIZE and PG_POOL_MAX_SIZE must be 1 <= min <= max")
+
+    config.pg_pool_timeout_seconds = _get_int_envioment_variable("PG_POOL_TIMEOUT_SECONDS", config.pg_pool_timeout_seconds)
+    config.pg_statement_timeout_ms = _get_int_envioment_variable("PG_STATEMENT_TIMEOUT_MS", config.pg_statement_timeout_ms)
+    config.request_deadline_ms = _get_int_envioment_variable("REQUEST_DEADLINE_MS", config.request_deadline_ms)
+
+    log_format = os.environ.get("LOG_FORMAT")
+    if log_format is not None:
+        if log_format not in ("text", "json"):
+            raise CriticalException("Environment variable LOG_FORMAT must be text or json")
+        config.log_format = log_format
+
+    config.log_sampling = _get_log_sampling_envioment_variable("LOG_SAMPLING", config.log_sampling)
+
+    config.auth_token_cache_seconds = _get_int_envioment_variable("AUTH_TOKEN_CACHE_SECONDS", config.auth_token_cache_seconds)
+
+    config.debug_routes = _get_int_envioment_variable("DEBUG_ROUTES", int(config.debug_routes)) != 0
+
+    config.archive_meets_after_days = _get_int_envioment_variable("ARCHIVE_MEETS_AFTER_DAYS", config.archive_meets_after_days)
+    config.archive_meets_batch_size = _get_int_envioment_variable("ARCHIVE_MEETS_BATCH_SIZE", config.archive_meets_batch_size)
+
+    if config.archive_meets_batch_size < 1:
+        raise CriticalException("Environment variable ARCHIVE_MEETS_BATCH_SIZE must be at least 1")
+
+    config.archive_meets_interval_minutes = _get_int_envioment_variable(
+        "ARCHIVE_MEETS_INTERVAL_MINUTES", config.archive_meets_interval_minutes
+    )
+
+    config.notifications_retention_months = _get_int_envioment_variable(
+        "NOTIFICATIONS_RETENTION_MONTHS", config.notifications_retention_months
+    )
+    config.notifications_retention_interval_hours = _get_int_envioment_variable(
+        "NOTIFICATIONS_RETENTION_INTERVAL_HOURS", config.notifications_retention_interval_hours
+    )
+    config.notifications_stream_heartbeat_seconds = _get_int_envioment_variable(
+        "NOTIFICATIONS_STREAM_HEARTBEAT_SECONDS", config.notifications_stream_heartbeat_seconds
+    )
+
+    config.compression_minimum_size = _get_int_envioment_variable("COMPRESSION_MINIMUM_SIZE", config.compression_minimum_size)
+    config.compression_gzip_level = _get_int_envioment_variable("COMPRESSION_GZIP_LEVEL", config.compression_gzip_level)
+    config.compression_brotli_quality = _get_int_envioment_variable("COMPRESSION_BROTLI_QUALITY", config.compression_brotli_quality)
+
+    if not 0 <= config.compression_gzip_level <= 9:
+        raise CriticalException("Environment variable COMPRESSION_GZIP_LEVEL must be between 0 and 9")
+
+    if not 0 <= config.compression_brotli_quality <= 11:
+        raise CriticalException("Environment variable COMPRESSION_BROTLI_QUALITY must be between 0 and 11")
+
+    config.slow_query_ms = _get_int_envioment_variable("SLOW_QUERY_MS", config.slow_query_ms)
+    config.slow_query_explain_percent = _get_int_envioment_variable("SLOW_QUERY_EXPLAIN_PERCENT", config.slow_query_explain_percent)
+
+    debug_token = os.environ.get("DEBUG_TOKEN")
+    if debug_token is not None:
+        config.debug_token = debug_token
+
+    config.readiness_ping_interval_seconds = _get_int_envioment_variable(
+        "READINESS_PING_INTERVAL_SECONDS", config.readiness_ping_interval_seconds
+    )
+    config.readiness_ping_timeout_seconds = _get_int_envioment_variable(
+        "READINESS_PING_TIMEOUT_SECONDS", config.readiness_ping_timeout_seconds
+    )
+    config.admission_max_waiting = _get_int_envioment_variable("ADMISSION_MAX_WAITING", config.admission_max_waiting)
+    config.admission_retry_after_seconds = _get_int_envioment_variable(
+        "ADMISSION_RETRY_AFTER_SECONDS", config.admission_retry_after_seconds
+    )
+
+    config.rate_limit_auth_per_minute = _get_int_envioment_variable("RATE_LIMIT_AUTH_PER_MINUTE", config.rate_limit_auth_per_minute)
+    config.rate_limit_auth_burst = _get_int_envioment_variable("RATE_LIMIT_AUTH_BURST", config.rate_limit_auth_burst)
+    config.rate_limit_upload_per_minute = _get_int_envioment_variable("RATE_LIMIT_UPLOAD_PER_MINUTE", config.rate_limit_upload_per_minute)
+    config.rate_limit_upload_burst = _get_int_envioment_variable("RATE_LIMIT_UPLOAD_BURST", config.rate_limit_upload_burst)
+    config.rate_limit_upload_token_per_minute = _get_int_envioment_variable(
+        "RATE_LIMIT_UPLOAD_TOKEN_PER_MINUTE", config.rate_limit_upload_token_per_minute
+    )
+    config.rate_limit_upload_token_burst = _get_int_envioment_variable(
+        "RATE_LIMIT_UPLOAD_TOKEN_BURST", config.rate_limit_upload_token_burst
+    )
+
+    forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS")
+    if forwarded_allow_ips is not None:
+        config.forwarded_allow_ips = forwarded_allow_ips
+
+    tracing_exporter = os.environ.get("TRACING_EXPORTER")
+    if tracing_exporter is not None:
+        config.tracing_exporter = tracing_exporter
+
+    tracing_file = os.environ.get("TRACING_FILE")
+    if tracing_file is not None:
+        config.tracing_file = tracing_file
+
+    config.tracing_sample_percent = _get_int_envioment_variable("TRACING_SAMPLE_PERCENT", config.tracing_sample_percent)
+
+    serve_host = os.environ.get("SERVE_HOST")
+    if serve_host is not None:
+        config.serve_host = serve_host
+
+    config.serve_port = _get_int_envioment_variable("SERVE_PORT", config.serve_port)
+    config.serve_workers = _get_int_envioment_variable("SERVE_WORKERS", config.serve_workers)
+    config.serve_max_requests = _get_int_envioment_variable("SERVE_MAX_REQUESTS", config.serve_max_requests)
+    config.serve_max_requests_jitter = _get_int_envioment_variable("SERVE_MAX_REQUESTS_JITTER", config.serve_max_requests_jitter)
+    config.serve_graceful_timeout_seconds = _get_int_envioment_variable(
+        "SERVE_GRACEFUL_TIMEOUT_SECONDS", config.serve_graceful_timeout_seconds
+    )
+
+    config.seed_users = _get_int_envioment_variable("SEED_USERS", config.seed_users)
+    config.seed_coaches = _get_int_envioment_variable("SEED_COACHES", config.seed_coaches)
+    config.seed_groups = _get_int_envioment_variable("SEED_GROUPS", config.seed_groups)
+    config.seed_groups_per_trainer = _get_int_envioment_variable("SEED_GROUPS_PER_TRAINER", config.seed_groups_per_trainer)
+    config.seed_meets_per_group = _get_int_envioment_variable("SEED_MEETS_PER_GROUP", config.seed_meets_per_group)
+    config.seed_notifications_per_user = _get_int_envioment_variable("SEED_NOTIFICATIONS_PER_USER", config.seed_notifications_per_user)
+    config.seed_pictures_percent = _get_int_envioment_variable("SEED_PICTURES_PERCENT", config.seed_pictures_percent)
+    config.seed_workers = _get_int_envioment_variable("SEED_WORKERS", config.seed_workers)
+    config.seed_random_seed = _get_int_envioment_variable("SEED_RANDOM_SEED", config.seed_random_seed)
@@ -0,0 +1,67 @@
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Callable
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.config import config
+
+# the streams are long by design, their database queries are capped only by the statement timeout
+DEADLINE_EXEMPT_PATHS = frozenset(("/notifications-stream/stream",))
+
+
+class Deadline:
+    """Deadline of the request, the named queries of the request do not run after it"""
+
+    __slots__ = ("started_at", "expires_at")
+
+    started_at: float
+    expires_at: float
+
+    def __init__(self, started_at: float, expires_at: float):
+        self.started_at = started_at
+        self.expires_at = expires_at
+
+    def get_remaining_seconds(self) -> float:
+        return self.expires_at - time.monotonic()
+
+
+# mutable, so a dependency of the route (in another context) can change the deadline of the request
+g_deadline: ContextVar[Deadline | None] = ContextVar("deadline", default=None)
+
+
+def get_deadline_remaining_seconds() -> float | None:
+    """Return the seconds until the deadline of the current request, None when there is no deadline"""
+
+    deadline = g_deadline.get()
+    return None if deadline is None else deadline.get_remaining_seconds()
+
+
+def request_deadline(milliseconds: int) -> Callable[[], Awaitable[None]]:
+    """FastAPI dependency of route with its own deadline, instead of REQUEST_DEADLINE_MS (from the start of the request)"""
+
+    async def set_request_deadline() -> None:
+        deadline = g_deadline.get()
+        if deadline is not None:
+            deadline.expires_at = deadline.started_at + milliseconds / 1000
+
+    return set_request_deadline
+
+
+class DeadlineMiddleware:
+    """Set the deadline of the requests, REQUEST_DEADLINE_MS after their start"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or config.request_deadline_ms <= 0 or scope["path"] in DEADLINE_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.monotonic()
+        token = g_deadline.set(Deadline(started_at, started_at + config.request_deadline_ms / 1000))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            g_deadline.reset(token)
@@ -4,3 +4,11 @@ class CriticalException(Exception):
 
 class DBException(Exception):
     pass
+
+
+class DBUnavailableException(DBException):
+    """No connection of the pool within the timeout, the request is answered with 503"""
+
+
+class DBTimeoutException(DBException):
+    """Query canceled by the statement timeout or the deadline of the request, the request is answered with 504"""
@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Callable
+
+from starlette.concurrency import run_in_threadpool
+
+from src.api import API_DATE_FORMAT
+from src.config import config
+from src.logger import get_logger
+from src.models import get_db
+from src.models.groups import archive_meets_batch
+from src.models.notifications import drop_old_notifications_partitions, ensure_notifications_partitions
+
+g_jobs_tasks: list[asyncio.Task] = []
+
+jobs_logger = get_logger("jobs")
+
+
+def archive_past_meets() -> int:
+    """Move the meets older than the archive horizon to the history tables. Return the number of moved meets"""
+
+    before_date = (datetime.now() - timedelta(days=config.archive_meets_after_days)).strftime(API_DATE_FORMAT)
+
+    archived_count = 0
+
+    while True:
+        # each batch on its own connection and transaction, so the requests don't wait for the whole job
+        with get_db() as db:
+            batch_count = archive_meets_batch(db, before_date, config.archive_meets_batch_size)
+
+        archived_count += batch_count
+        jobs_logger.debug("Archived batch of %d meets", batch_count)
+
+        if batch_count < config.archive_meets_batch_size:
+            return archived_count
+
+
+def maintain_notifications_partitions() -> int:
+    """Create the next partitions of the notifications and drop the expired ones. Return the number of dropped partitions"""
+
+    now = datetime.now()
+
+    with get_db() as db:
+        ensure_notifications_partitions(db, now)
+        return drop_old_notifications_partitions(db, now, config.notifications_retention_months)
+
+
+async def _run_periodically(job: Callable[[], int], interval_seconds: int) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+
+        try:
+            count = await run_in_threadpool(job)
+            jobs_logger.info(f"Job {job.__name__} done: {count} rows")
+        except Exception as e:
+            jobs_logger.error(f"Job {job.__name__} failed")
+            jobs_logger.exception(e)
+
+
+def start_jobs() -> None:
+    """Start the periodic maintenance jobs of the server"""
+
+    if config.notifications_retention_interval_hours > 0:
+        g_jobs_tasks.append(
+            asyncio.create_task(_run_periodically(maintain_notifications_partitions, config.notifications_retention_interval_hours * 3600))
+        )
+
+    if config.archive_meets_interval_minutes > 0:
+        g_jobs_tasks.append(asyncio.create_task(_run_periodically(archive_past_meets, config.archive_meets_interval_minutes * 60)))
+
+
+async def stop_jobs() -> None:
+    """Stop the periodic maintenance jobs of the server"""
+
+    for task in g_jobs_tasks:
+        task.cancel()
+
+    await asyncio.gather(*g_jobs_tasks, return_exceptions=True)
+    g_jobs_tasks.clear()
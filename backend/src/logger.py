@@ -1,42 +1,211 @@
+import copy
 import logging
-import logging.config
-from logging.config import dictConfig
+import queue
+import random
+import re
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from uuid import uuid4
+
+import pydantic_core
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from uvicorn.logging import DefaultFormatter
 
 from src.config import config
+from src.metrics import get_route
+from src.tracing import g_current_span
+
+# records waiting for the listener thread, more are dropped so a blocked stderr does not block the requests
+LOG_QUEUE_SIZE = 10000
+
+REQUEST_ID_HEADER = "X-Request-ID"
+REQUEST_ID_PATTERN = re.compile(r"^[0-9A-Za-z._-]{1,128}$")
+
+
+class RequestContext:
+    __slots__ = ("request_id", "route")
+
+    request_id: str
+    route: str
+
+    def __init__(self, request_id: str, route: str):
+        self.request_id = request_id
+        self.route = route
+
+
+# the context of the current request, for the fields of its log records
+g_request_context: ContextVar[RequestContext | None] = ContextVar("request_context", default=None)
+
+g_log_listener: QueueListener | None = None
+g_log_handler: QueueHandler | None = None
+
+
+class ContextFilter(logging.Filter):
+    """Add the request id, the route and the ids of the trace of the current request to the log records"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_context = g_request_context.get()
+        span = g_current_span.get()
+
+        request_id = None if request_context is None else request_context.request_id
+        trace_id = None if span is None else span.trace_id
+        span_id = None if span is None else span.span_id
+
+        record.request_id = request_id
+        record.route = None if request_context is None else request_context.route
+        record.trace_id = trace_id
+        record.span_id = span_id
+
+        fields = [
+            f"{name}={value}"
+            for name, value in (("request_id", request_id), ("trace_id", trace_id), ("span_id", span_id))
+            if value is not None
+        ]
+        record.context = f"[{' '.join(fields)}] " if fields else ""
+
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a percent of the debug records of the sampled loggers, by the most specific logger name in the sampling"""
+
+    def __init__(self, sampling: dict[str, int]) -> None:
+        super().__init__()
+        self._sampling = sampling
+        self._percents: dict[str, int | None] = {}
+
+    def _get_percent(self, name: str) -> int | None:
+        if name not in self._percents:
+            parts = name.split(".")
+            prefixes = (".".join(parts[:i]) for i in range(len(parts), 0, -1))
+            self._percents[name] = next((self._sampling[prefix] for prefix in prefixes if prefix in self._sampling), None)
+
+        return self._percents[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or not self._sampling:
+            return True
+
+        percent = self._get_percent(record.name)
+        return percent is None or random.random() * 100 < percent
+
+
+class JsonFormatter(logging.Formatter):
+    """Format the log records as JSON lines, with the fields of the request"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "route": getattr(record, "route", None),
+            "trace_id": getattr(record, "trace_id", None),
+            "span_id": getattr(record, "span_id", None),
+        }
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return pydantic_core.to_json(entry, serialize_unknown=True).decode()
+
+
+class _QueueHandler(QueueHandler):
+    """Put the log records in the queue of the listener, the formatting and the writing of the records are in its thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the message is merged now, the arguments may change later; the traceback is formatted in the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
 
 
 def init_loggers() -> None:
-    """Initialize the loggers for the application"""
-
-    logger_config = {
-        "version": 1,
-        "disable_existing_loggers": False,
-        "formatters": {
-            "default": {
-                "()": "uvicorn.logging.DefaultFormatter",
-                "fmt": "%(levelprefix)s %(message)s",
-                "datefmt": "%Y-%m-%d %H:%M:%S",
-            },
-        },
-        "handlers": {
-            "default": {
-                "formatter": "default",
-                "class": "logging.StreamHandler",
-                "stream": "ext://sys.stderr",
-            },
-        },
-        "loggers": {
-            "app": {"handlers": ["default"], "level": "DEBUG"},
-        },
-    }
-
-    dictConfig(logger_config)
-
-    logging.getLogger("app").setLevel(config.logger_level)
+    """Initialize the loggers for the application, the records are written to stderr by a background thread"""
+
+    global g_log_listener, g_log_handler
+
+    close_loggers()
+
+    formatter: logging.Formatter
+    if config.log_format == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = DefaultFormatter(fmt="%(levelprefix)s %(context)s%(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(LOG_QUEUE_SIZE)
+    g_log_handler = _QueueHandler(log_queue)
+    # the filters run in the thread of the request, where the context of the request is
+    g_log_handler.addFilter(SamplingFilter(config.log_sampling))
+    g_log_handler.addFilter(ContextFilter())
+
+    g_log_listener = QueueListener(log_queue, stream_handler)
+    g_log_listener.start()
+
+    logger = get_logger()
+    logger.addHandler(g_log_handler)
+    logger.setLevel(config.logger_level)
     logging.getLogger("psycopg").setLevel("ERROR")
     logging.getLogger("psycopg.pool").setLevel("ERROR")
 
 
-def get_logger() -> logging.Logger:
-    """Get the logger for the application"""
-    return logging.getLogger("app")
+def close_loggers() -> None:
+    """Write the queued log records and stop the thread of the loggers"""
+
+    global g_log_listener, g_log_handler
+
+    if g_log_listener is None or g_log_handler is None:
+        return
+
+    get_logger().removeHandler(g_log_handler)
+    g_log_listener.stop()
+
+    g_log_listener = None
+    g_log_handler = None
+
+
+def get_logger(name: str | None = None) -> logging.Logger:
+    """Get the logger for the application, or its child logger by name (for the sampling of its debug records)"""
+    return logging.getLogger("app" if name is None else f"app.{name}")
+
+
+class RequestContextMiddleware:
+    """Set the context of the request for its log records, the request id is from the X-Request-ID header or new"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        if request_id is None or REQUEST_ID_PATTERN.match(request_id) is None:
+            request_id = uuid4().hex
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(REQUEST_ID_HEADER, request_id)
+            await send(message)
+
+        # the route, not the path, so the records of a route are grouped
+        token = g_request_context.set(RequestContext(request_id, get_route(scope)))
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            g_request_context.reset(token)
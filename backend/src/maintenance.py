@@ -0,0 +1,28 @@
+from src.config import init_config
+from src.jobs import archive_past_meets
+from src.models import get_db, init_db
+from src.models.groups import repair_meets_member_count
+
+
+def repair_counters() -> None:
+    """Command to check the maintained counters against the source rows and repair drift"""
+
+    init_config()
+    # the maintenance runs over whole tables, the named queries have the timeout of the maintenance
+    init_db(statement_timeout_ms=0)
+
+    with get_db() as db:
+        fixed_meets = repair_meets_member_count(db)
+
+    print(f"Meets member count: {fixed_meets} repaired")
+
+
+def archive_meets() -> None:
+    """Command to move the meets older than the archive horizon to the history tables"""
+
+    init_config()
+    init_db(statement_timeout_ms=0)
+
+    archived_count = archive_past_meets()
+
+    print(f"Meets: {archived_count} archived")
@@ -0,0 +1,315 @@
+import abc
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# seconds, the upper bounds of the buckets of the latency histograms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# label of the path of the requests that no route matched, so scans of random paths do not add series
+UNMATCHED_ROUTE = "unmatched"
+
+# interval of the snapshots of the samples of each worker of the serve command, in the metrics directory of the supervisor
+METRICS_SNAPSHOT_SECONDS = 1
+
+_LabelValues = tuple[str, ...]
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: _LabelValues, extra: str = "") -> str:
+    labels = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    metric_type = ""
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._lock = threading.Lock()
+
+        g_registry.append(self)
+
+    @abc.abstractmethod
+    def _render_samples(self, worker_label: str) -> list[str]:
+        """Return the lines of the samples of the metric, in the Prometheus text format"""
+
+    def get_samples(self, worker_label: str) -> list[str]:
+        with self._lock:
+            return self._render_samples(worker_label)
+
+    def render(self, samples: list[str]) -> list[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.metric_type}"] + samples
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = ()) -> None:
+        super().__init__(name, description, label_names)
+        self._values: dict[_LabelValues, float] = {}
+
+    def inc(self, label_values: _LabelValues = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def _render_samples(self, worker_label: str) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, label_values, worker_label)} {_format_value(value)}"
+            for label_values, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...] = ()) -> None:
+        super().__init__(name, description, label_names)
+        self._values: dict[_LabelValues, float] = {}
+
+    def set(self, value: float, label_values: _LabelValues = ()) -> None:
+        with self._lock:
+            self._values[label_values] = value
+
+    def inc(self, label_values: _LabelValues = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, label_values: _LabelValues = (), amount: float = 1) -> None:
+        self.inc(label_values, -amount)
+
+    def _render_samples(self, worker_label: str) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, label_values, worker_label)} {_format_value(value)}"
+            for label_values, value in self._values.items()
+        ]
+
+
+class _HistogramValues:
+    __slots__ = ("bucket_counts", "count", "total")
+
+    def __init__(self, buckets_count: int) -> None:
+        # not cumulative, the last bucket is +Inf
+        self.bucket_counts = [0] * (buckets_count + 1)
+        self.count = 0
+        self.total = 0.0
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(
+        self, name: str, description: str, label_names: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, description, label_names)
+        self.buckets = buckets
+        self._values: dict[_LabelValues, _HistogramValues] = {}
+
+    def observe(self, value: float, label_values: _LabelValues = ()) -> None:
+        bucket_index = bisect_left(self.buckets, value)
+
+        with self._lock:
+            values = self._values.get(label_values)
+            if values is None:
+                values = self._values[label_values] = _HistogramValues(len(self.buckets))
+
+            values.bucket_counts[bucket_index] += 1
+            values.count += 1
+            values.total += value
+
+    def _render_samples(self, worker_label: str) -> list[str]:
+        lines: list[str] = []
+
+        for label_values, values in self._values.items():
+            cumulative_count = 0
+            for upper_bound, bucket_count in zip(self.buckets + (math.inf,), values.bucket_counts):
+                cumulative_count += bucket_count
+                le_label = f'le="{_format_value(upper_bound)}"'
+                if worker_label:
+                    le_label = f"{worker_label},{le_label}"
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, label_values, le_label)} {cumulative_count}")
+
+            labels = _format_labels(self.label_names, label_values, worker_label)
+            lines.append(f"{self.name}_sum{labels} {_format_value(values.total)}")
+            lines.append(f"{self.name}_count{labels} {values.count}")
+
+        return lines
+
+
+g_registry: list[_Metric] = []
+g_collectors: list[Callable[[], None]] = []
+
+# the paths of the routes of the app, refreshed when routes are added (the debug routes are included in the lifespan)
+g_routes_count = 0
+g_route_paths: frozenset[str] = frozenset()
+
+# the workers of the serve command have their own metrics, distinguished by the worker label.
+# each worker writes snapshots of its samples to the metrics directory, so the worker that answers the scrape renders all of them
+g_worker_id: str | None = None
+g_metrics_dir: str | None = None
+g_snapshot_thread: threading.Thread | None = None
+
+
+def _get_worker_label() -> str:
+    return "" if g_worker_id is None else f'worker="{_escape_label_value(g_worker_id)}"'
+
+
+def _get_snapshot_path(metrics_dir: str, worker_id: str) -> str:
+    return os.path.join(metrics_dir, f"worker_{worker_id}.json")
+
+
+def _get_samples() -> dict[str, list[str]]:
+    for collector in g_collectors:
+        collector()
+
+    worker_label = _get_worker_label()
+
+    return {metric.name: metric.get_samples(worker_label) for metric in g_registry}
+
+
+def _write_snapshots(metrics_dir: str, worker_id: str) -> None:
+    path = _get_snapshot_path(metrics_dir, worker_id)
+
+    while True:
+        try:
+            # replaced at once, so the other workers do not read a partial snapshot
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(_get_samples(), f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            print(f"Snapshot of the metrics failed: {e}")
+
+        time.sleep(METRICS_SNAPSHOT_SECONDS)
+
+
+def _read_other_workers_samples() -> list[dict[str, list[str]]]:
+    if g_metrics_dir is None or g_worker_id is None:
+        return []
+
+    own_path = _get_snapshot_path(g_metrics_dir, g_worker_id)
+
+    workers_samples: list[dict[str, list[str]]] = []
+    for name in sorted(os.listdir(g_metrics_dir)):
+        path = os.path.join(g_metrics_dir, name)
+        if not name.endswith(".json") or path == own_path:
+            continue
+
+        try:
+            with open(path) as f:
+                workers_samples.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    return workers_samples
+
+
+def init_worker_metrics(worker_id: str, metrics_dir: str | None) -> None:
+    """Set the worker label of the metrics of the process, and write snapshots of its samples to the metrics directory"""
+
+    global g_worker_id, g_metrics_dir, g_snapshot_thread
+
+    g_worker_id = worker_id
+    g_metrics_dir = metrics_dir
+
+    if metrics_dir is None or g_snapshot_thread is not None:
+        return
+
+    g_snapshot_thread = threading.Thread(target=_write_snapshots, args=(metrics_dir, worker_id), name="metrics-snapshots", daemon=True)
+    g_snapshot_thread.start()
+
+
+def get_route(scope: Scope) -> str:
+    """Return the route of the request for the labels and the log fields, UNMATCHED_ROUTE when no route matches its path"""
+
+    global g_routes_count, g_route_paths
+
+    # the routes of the API have no path parameters, so the path of a matched request is the route
+    routes = scope["app"].routes
+    if len(routes) != g_routes_count:
+        g_route_paths = frozenset(route.path for route in routes)
+        g_routes_count = len(routes)
+
+    path = scope["path"]
+    return path if path in g_route_paths else UNMATCHED_ROUTE
+
+
+def register_collector(collector: Callable[[], None]) -> None:
+    """Register function that updates metrics (gauges of state) when the metrics are rendered"""
+
+    g_collectors.append(collector)
+
+
+def render_metrics() -> str:
+    """
+    Return all the metrics in the Prometheus text format: of the process,
+    and of the other workers of the serve command (from their latest snapshots, up to METRICS_SNAPSHOT_SECONDS old).
+    """
+
+    samples = _get_samples()
+    workers_samples = _read_other_workers_samples()
+
+    lines: list[str] = []
+    for metric in g_registry:
+        metric_samples = samples[metric.name]
+        for worker_samples in workers_samples:
+            metric_samples += worker_samples.get(metric.name, [])
+
+        lines += metric.render(metric_samples)
+
+    return "\n".join(lines) + "\n"
+
+
+http_requests_in_flight = Gauge("http_requests_in_flight", "Requests in progress")
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "Duration of the requests until the response is sent", ("method", "route", "status")
+)
+
+
+class MetricsMiddleware:
+    """Record the in-flight requests and the duration of each request by route and status code"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started_at = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            http_request_duration_seconds.observe(time.perf_counter() - started_at, (scope["method"], get_route(scope), str(status_code)))
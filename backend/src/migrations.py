@@ -1,9 +1,11 @@
+from datetime import datetime
 from uuid import uuid4
 
 import psycopg
 
 from src.config import init_config
 from src.models import get_db, init_db
+from src.models.notifications import ensure_notifications_partitions
 
 
 def create_database(cursor: psycopg.Cursor) -> None:
@@ -23,12 +25,49 @@ def create_database(cursor: psycopg.Cursor) -> None:
             is_coach BOOLEAN NOT NULL
         );
 
-        CREATE TABLE notifications (
-            id UUID PRIMARY KEY,
+        CREATE TABLE public.auth_tokens (
+            token UUID PRIMARY KEY,
+            user_id UUID NOT NULL
+                REFERENCES public.users (id),
+            created_at TIMESTAMP NOT NULL
+        );
+
+        CREATE SEQUENCE public.notifications_seq AS BIGINT;
+
+        CREATE TABLE public.notifications (
+            id UUID NOT NULL,
             user_id UUID NOT NULL
                 REFERENCES public.users (id),
             message VARCHAR(255) NOT NULL,
-            date TIMESTAMP NOT NULL
+            date TIMESTAMP NOT NULL,
+            is_read BOOLEAN NOT NULL DEFAULT false,
+            seq BIGINT NOT NULL DEFAULT nextval('public.notifications_seq'),
+            change_xid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date);
+
+        CREATE INDEX notifications_user_id_date_idx ON public.notifications (user_id, date DESC);
+
+        CREATE INDEX notifications_user_id_change_xid_idx ON public.notifications (user_id, change_xid);
+
+        CREATE TABLE public.notification_deletions (
+            user_id UUID NOT NULL
+                REFERENCES public.users (id),
+            seq BIGINT NOT NULL DEFAULT nextval('public.notifications_seq'),
+            change_xid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+            notification_id UUID NOT NULL,
+            date TIMESTAMP NOT NULL,
+            PRIMARY KEY (user_id, seq)
+        );
+
+        CREATE INDEX notification_deletions_date_idx ON public.notification_deletions (date);
+
+        CREATE INDEX notification_deletions_user_id_change_xid_idx ON public.notification_deletions (user_id, change_xid);
+
+        CREATE TABLE public.notification_counters (
+            user_id UUID PRIMARY KEY
+                REFERENCES public.users (id),
+            unread_count INTEGER NOT NULL DEFAULT 0
         );
 
         CREATE TABLE public.profiles (
@@ -59,9 +98,12 @@ def create_database(cursor: psycopg.Cursor) -> None:
             name VARCHAR(255) NOT NULL,
             description VARCHAR(255) NOT NULL,
             area_id UUID NOT NULL
-                REFERENCES public.areas (id)
+                REFERENCES public.areas (id),
+            search_vector TSVECTOR NOT NULL
         );
 
+        CREATE INDEX groups_search_vector_idx ON public.groups USING GIN (search_vector);
+
         CREATE TABLE public.group_members (
             group_id UUID NOT NULL
                 REFERENCES public.groups (id),
@@ -78,9 +120,15 @@ def create_database(cursor: psycopg.Cursor) -> None:
             date VARCHAR(255) NOT NULL,
             duration INTEGER NOT NULL,
             city VARCHAR(255) NOT NULL,
-            street VARCHAR(255) NOT NULL
+            street VARCHAR(255) NOT NULL,
+            member_count INTEGER NOT NULL DEFAULT 0,
+            free_spots INTEGER GENERATED ALWAYS AS (max_members - member_count) STORED
         );
 
+        CREATE INDEX meetings_group_id_idx ON public.meetings (group_id);
+
+        CREATE INDEX meetings_upcoming_idx ON public.meetings (date, id) INCLUDE (group_id, city, free_spots);
+
         CREATE TABLE public.meeting_members (
             meeting_id UUID NOT NULL
                 REFERENCES public.meetings (id),
@@ -88,6 +136,31 @@ def create_database(cursor: psycopg.Cursor) -> None:
                 REFERENCES public.users (id),
             PRIMARY KEY (meeting_id, user_id)
         );
+
+        CREATE TABLE public.meetings_history (
+            id UUID PRIMARY KEY,
+            group_id UUID NOT NULL
+                REFERENCES public.groups (id),
+            max_members INTEGER NOT NULL,
+            date VARCHAR(255) NOT NULL,
+            duration INTEGER NOT NULL,
+            city VARCHAR(255) NOT NULL,
+            street VARCHAR(255) NOT NULL,
+            member_count INTEGER NOT NULL
+        );
+
+        CREATE INDEX meetings_history_group_id_idx ON public.meetings_history (group_id);
+
+        CREATE TABLE public.meeting_members_history (
+            meeting_id UUID NOT NULL
+                REFERENCES public.meetings_history (id),
+            user_id UUID NOT NULL
+                REFERENCES public.users (id),
+            meeting_date VARCHAR(255) NOT NULL,
+            PRIMARY KEY (meeting_id, user_id)
+        );
+
+        CREATE INDEX meeting_members_history_user_idx ON public.meeting_members_history (user_id, meeting_date DESC, meeting_id DESC);
         """
     )
 
@@ -100,9 +173,12 @@ def migrate_db() -> None:
     """Command to create the database DDL"""
 
     init_config()
-    init_db()
+    # the DDL may wait for the locks of a running server, it is not canceled by the timeout of the requests
+    init_db(statement_timeout_ms=0)
 
     with get_db() as db:
         with db.cursor() as cursor:
             create_database(cursor)
         db.commit()
+
+        ensure_notifications_partitions(db, datetime.now())
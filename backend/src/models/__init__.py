@@ -1,16 +1,42 @@
 import functools
+import time
 from contextlib import contextmanager
-from typing import Any, Callable, Generator, TypeVar
+from typing import Any, Callable, Generator, TypeVar, cast, overload
 
 import psycopg
 import psycopg_pool
 
 from src.config import config
-from src.exceptions import CriticalException, DBException
+from src.deadlines import get_deadline_remaining_seconds
+from src.exceptions import CriticalException, DBException, DBTimeoutException, DBUnavailableException
 from src.logger import get_logger
+from src.metrics import Counter, Gauge, Histogram, register_collector
+from src.slow_queries import RecordingCursor, record_statements, report_slow_query
+from src.tracing import SPAN_KIND_CLIENT, start_span
 
 g_pool: None | psycopg_pool.ConnectionPool = None
 
+DB_WAIT_SECONDS = 5
+
+# pause between the pings of wait_db, after a failed connection
+DB_WAIT_RETRY_SECONDS = 0.5
+
+# statement timeout of the named queries of the maintenance, over the whole table (instead of PG_STATEMENT_TIMEOUT_MS)
+MAINTENANCE_STATEMENT_TIMEOUT_MS = 10 * 60 * 1000
+
+db_query_duration_seconds = Histogram("db_query_duration_seconds", "Duration of the named queries", ("query",))
+db_query_errors_total = Counter("db_query_errors_total", "Named queries failed with database error", ("query",))
+db_query_timeouts_total = Counter(
+    "db_query_timeouts_total", "Named queries canceled by the statement timeout or not run after the deadline", ("query",)
+)
+db_pool_size = Gauge("db_pool_size", "Connections of the pool, idle and in use")
+db_pool_max_size = Gauge("db_pool_max_size", "Maximum connections of the pool")
+db_pool_idle = Gauge("db_pool_idle", "Idle connections of the pool")
+db_pool_waiting = Gauge("db_pool_waiting", "Requests waiting for a connection of the pool")
+
+# debug record of each named query, sampled by LOG_SAMPLING (app.db)
+db_logger = get_logger("db")
+
 
 def _get_pool() -> psycopg_pool.ConnectionPool:
     global g_pool
@@ -19,32 +45,69 @@ def _get_pool() -> psycopg_pool.ConnectionPool:
     return g_pool
 
 
-def init_db() -> None:
-    """Initialize database connection pool"""
+def get_conninfo() -> str:
+    """Return the connection string of the database"""
+
+    return f"""
+    dbname={config.pg_database}
+    user={config.pg_user}
+    password={config.pg_password}
+    host={config.pg_host}
+    port={config.pg_port}
+    """
+
+
+def init_db(wait: bool = True, statement_timeout_ms: int | None = None) -> None:
+    """
+    Initialize database connection pool.
+    The connections are opened in parallel by the workers of the pool, without wait the pool fills in the background.
+    The statement timeout of the connections is PG_STATEMENT_TIMEOUT_MS, or its own (the commands disable it with 0).
+    """
 
     global g_pool
     if g_pool is not None:
         return
 
-    try:
-        conninfo = f"""
-        dbname={config.pg_database}
-        user={config.pg_user}
-        password={config.pg_password}
-        host={config.pg_host}
-        port=5432
-        """
+    if statement_timeout_ms is None:
+        statement_timeout_ms = config.pg_statement_timeout_ms
 
+    try:
         g_pool = psycopg_pool.ConnectionPool(
-            conninfo=conninfo,
-            min_size=1,
-            max_size=2,
+            conninfo=get_conninfo(),
+            min_size=config.pg_pool_min_size,
+            max_size=config.pg_pool_max_size,
+            timeout=config.pg_pool_timeout_seconds,
+            kwargs={"cursor_factory": RecordingCursor, "options": f"-c statement_timeout={statement_timeout_ms}"},
             reconnect_failed=lambda conn: print("check", conn),
         )
-        g_pool.wait(5)
     except psycopg.OperationalError as e:
         raise CriticalException("Database connection failed") from e
 
+    if wait and not wait_db(DB_WAIT_SECONDS):
+        raise CriticalException("Database connection failed")
+
+
+def wait_db(timeout: float) -> bool:
+    """
+    Wait until a connection of the pool answers a ping, up to the timeout. Return if the database is ready.
+    Not ConnectionPool.wait, it closes the pool on timeout (the pool keeps reconnecting, for the database that starts later).
+    """
+
+    deadline = time.monotonic() + timeout
+
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+
+        try:
+            ping_db(remaining)
+            return True
+        except psycopg_pool.PoolTimeout:
+            return False
+        except psycopg.OperationalError:
+            time.sleep(min(DB_WAIT_RETRY_SECONDS, remaining))
+
 
 def close_db() -> None:
     """Close database connection pool"""
@@ -58,15 +121,63 @@ def close_db() -> None:
 
 
 def db_dependency() -> Generator[psycopg.Connection, None, None]:
-    """FastAPI dependency for database connection, used in the endpoints of the API"""
+    """
+    FastAPI dependency for database connection, used in the endpoints of the API.
+    Waits for connection up to PG_POOL_TIMEOUT_SECONDS (and the deadline of the request), then raise DBUnavailableException.
+    """
+
+    timeout: float = config.pg_pool_timeout_seconds
+    remaining = get_deadline_remaining_seconds()
+    if remaining is not None:
+        timeout = max(min(timeout, remaining), 0)
+
+    try:
+        db = _get_pool().getconn(timeout)
+    except psycopg_pool.PoolTimeout as e:
+        raise DBUnavailableException(f"No connection of the pool after {timeout:.1f} seconds") from e
+    except psycopg_pool.PoolClosed as e:
+        raise DBUnavailableException("The pool is closed") from e
 
-    db = _get_pool().getconn()
     try:
         yield db
     finally:
         _get_pool().putconn(db)
 
 
+def get_pool_stats() -> dict[str, int] | None:
+    """Return the statistics of the pool (pool_size, pool_max, pool_available, requests_waiting), None before it is initialized"""
+
+    if g_pool is None:
+        return None
+
+    return g_pool.get_stats()
+
+
+def ping_db(timeout: float) -> float:
+    """Run trivial query on connection of the pool, waiting for the connection up to the timeout. Return the seconds of the ping"""
+
+    started_at = time.perf_counter()
+
+    with _get_pool().connection(timeout) as db:
+        db.execute("SELECT 1")
+
+    return time.perf_counter() - started_at
+
+
+def _collect_pool_stats() -> None:
+    stats = get_pool_stats()
+    if stats is None:
+        return
+
+    db_pool_size.set(stats["pool_size"])
+    db_pool_max_size.set(stats["pool_max"])
+    db_pool_idle.set(stats["pool_available"])
+    db_pool_waiting.set(stats["requests_waiting"])
+
+
+register_collector(_collect_pool_stats)
+
+
 @contextmanager
 def get_db() -> Generator[psycopg.Connection, None, None]:
     """Return database connection"""
@@ -74,20 +185,121 @@ def get_db() -> Generator[psycopg.Connection, None, None]:
     return db_dependency()
 
 
+class _SnapshotConnection:
+    """Connection inside a snapshot, the commits of the named queries keep the snapshot transaction open"""
+
+    def __init__(self, db: psycopg.Connection) -> None:
+        self._db = db
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._db, name)
+
+    def commit(self) -> None:
+        pass
+
+
+@contextmanager
+def read_only_snapshot(db: psycopg.Connection) -> Generator[psycopg.Connection, None, None]:
+    """Run the named queries on the connection in one read only snapshot (repeatable read transaction)"""
+
+    db.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+    db.read_only = True
+    try:
+        yield cast(psycopg.Connection, _SnapshotConnection(db))
+    finally:
+        db.rollback()
+        db.isolation_level = None
+        db.read_only = None
+
+
 ReturnT = TypeVar("ReturnT")
 
 
-def db_named_query(func: Callable[..., ReturnT]) -> Callable[..., ReturnT]:
-    """Decorator for database named queries in the models."""
+def _get_statement_timeout_ms(name: str, statement_timeout_ms: int | None) -> int | None:
+    """Return the statement timeout of the named query in the transaction, None for the timeout of the connection"""
+
+    remaining = get_deadline_remaining_seconds()
+    if remaining is None:
+        return statement_timeout_ms
+
+    if remaining <= 0:
+        db_query_timeouts_total.inc((name,))
+        raise DBTimeoutException(f"The deadline of the request passed before the query {name}")
+
+    remaining_ms = max(int(remaining * 1000), 1)
+    timeout_ms = config.pg_statement_timeout_ms if statement_timeout_ms is None else statement_timeout_ms
+    if timeout_ms <= 0 or remaining_ms < timeout_ms:
+        return remaining_ms
+
+    return statement_timeout_ms
+
+
+def _set_statement_timeout(db: psycopg.Connection, timeout_ms: int) -> None:
+    # for the current transaction, the named query commits at its end
+    db.execute("SELECT set_config('statement_timeout', %s, true)", [str(timeout_ms)])
+
+
+def _wrap_named_query(func: Callable[..., ReturnT], statement_timeout_ms: int | None) -> Callable[..., ReturnT]:
+    label_values = (func.__name__,)
+    span_name = f"db {func.__name__}"
+    span_attributes = {"db.system": "postgresql", "db.operation": func.__name__}
 
     @functools.wraps(func)
     def wrapper(*args: Any, **kwargs: Any) -> ReturnT:
-        try:
-            return func(*args, **kwargs)
-        except psycopg.errors.DatabaseError as e:
-            error_msg = str(e)
-            get_logger().error(f"Database error: {error_msg}")
-            get_logger().exception(e)
-            raise DBException from e
+        timeout_ms = _get_statement_timeout_ms(func.__name__, statement_timeout_ms)
+
+        with start_span(span_name, SPAN_KIND_CLIENT, **span_attributes):
+            try:
+                if timeout_ms is not None:
+                    _set_statement_timeout(args[0] if args else kwargs["db"], timeout_ms)
+
+                started_at = time.perf_counter()
+                with record_statements(config.slow_query_ms > 0 and config.slow_query_explain_percent > 0) as statements:
+                    try:
+                        return func(*args, **kwargs)
+                    finally:
+                        seconds = time.perf_counter() - started_at
+                        db_query_duration_seconds.observe(seconds, label_values)
+                        db_logger.debug("Query %s done in %.1fms", func.__name__, seconds * 1000)
+
+                        if config.slow_query_ms > 0 and seconds * 1000 >= config.slow_query_ms:
+                            report_slow_query(func, seconds, args, kwargs, statements, get_conninfo())
+            except psycopg.errors.QueryCanceled as e:
+                db_query_timeouts_total.inc(label_values)
+                get_logger().warning(f"Query {func.__name__} canceled: {e}")
+                raise DBTimeoutException(f"The query {func.__name__} timed out") from e
+            except psycopg.errors.DatabaseError as e:
+                db_query_errors_total.inc(label_values)
+                error_msg = str(e)
+                get_logger().error(f"Database error: {error_msg}")
+                get_logger().exception(e)
+                raise DBException from e
 
     return wrapper
+
+
+@overload
+def db_named_query(func: Callable[..., ReturnT]) -> Callable[..., ReturnT]:
+    ...
+
+
+@overload
+def db_named_query(*, statement_timeout_ms: int | None = None) -> Callable[[Callable[..., ReturnT]], Callable[..., ReturnT]]:
+    ...
+
+
+def db_named_query(
+    func: Callable[..., ReturnT] | None = None, *, statement_timeout_ms: int | None = None
+) -> Callable[..., ReturnT] | Callable[[Callable[..., ReturnT]], Callable[..., ReturnT]]:
+    """
+    Decorator for database named queries in the models, records the duration of each query by its name.
+    The queries slower than SLOW_QUERY_MS are logged, and a sample of them is explained.
+    Each query is a span in the trace of the request.
+    The statement timeout of the query is PG_STATEMENT_TIMEOUT_MS or its own (@db_named_query(statement_timeout_ms=...)),
+    capped by the deadline of the request. Timed out queries raise DBTimeoutException.
+    """
+
+    if func is None:
+        return functools.partial(_wrap_named_query, statement_timeout_ms=statement_timeout_ms)
+
+    return _wrap_named_query(func, statement_timeout_ms)
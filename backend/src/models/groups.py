@@ -1,13 +1,20 @@
+import re
 from datetime import datetime
 from uuid import UUID, uuid4
 
 import psycopg
+from psycopg.rows import BaseRowFactory, args_row
 
-from src.models import db_named_query
-from src.models.users import Gender, User
+from src.models import MAINTENANCE_STATEMENT_TIMEOUT_MS, db_named_query
+from src.models.users import USER_CARD_COLUMNS, UserCard, user_card_row
+
+# notifications of the changes of the groups names, for the autocomplete indexes of all the workers
+AUTOCOMPLETE_CHANNEL = "autocomplete"
 
 
 class Area:
+    __slots__ = ("area_id", "name")
+
     area_id: UUID
     name: str
 
@@ -42,23 +49,11 @@ def create_area(db: psycopg.Connection, name: str) -> Area:
 
 @db_named_query
 def get_areas(db: psycopg.Connection) -> list[Area]:
-    with db.cursor() as cursor:
+    with db.cursor(row_factory=args_row(Area)) as cursor:
         cursor.execute("SELECT id, name FROM public.areas;")
         db.commit()
 
-        rows = cursor.fetchall()
-
-        areas: list[Area] = []
-
-        for row in rows:
-            area = Area(
-                area_id=row[0],
-                name=str(row[1]),
-            )
-
-            areas.append(area)
-
-        return areas
+        return cursor.fetchall()
 
 
 @db_named_query
@@ -73,6 +68,8 @@ def area_exists(db: psycopg.Connection, area_id: UUID) -> bool:
 
 
 class Group:
+    __slots__ = ("group_id", "coach_id", "name", "description", "area_id")
+
     group_id: UUID
     coach_id: UUID
     name: str
@@ -87,6 +84,16 @@ class Group:
         self.area_id = area_id
 
 
+def _make_group_with_coach(
+    group_id: UUID, coach_id: UUID, name: str, description: str, area_id: UUID, coach_name: str
+) -> tuple[Group, str]:
+    return Group(group_id, coach_id, name, description, area_id), coach_name
+
+
+# row factory of the groups with coach name
+group_with_coach_row: BaseRowFactory[tuple[Group, str]] = args_row(_make_group_with_coach)
+
+
 @db_named_query
 def create_group(db: psycopg.Connection, coach_id: UUID, name: str, description: str, area_id: UUID) -> Group:
     group_id = uuid4()
@@ -101,16 +108,21 @@ def create_group(db: psycopg.Connection, coach_id: UUID, name: str, description:
 
     with db.cursor() as cursor:
         cursor.execute(
-            """INSERT INTO public.groups (id, coach_id, name, description, area_id)
-            VALUES (%s, %s, %s, %s, %s);
+            """INSERT INTO public.groups (id, coach_id, name, description, area_id, search_vector)
+            SELECT %(group_id)s, coach.id, %(name)s, %(description)s, %(area_id)s,
+                setweight(to_tsvector('simple', %(name)s::VARCHAR), 'A')
+                || setweight(to_tsvector('simple', coach.name), 'B')
+                || setweight(to_tsvector('simple', %(description)s::VARCHAR), 'C')
+            FROM public.users AS coach
+            WHERE coach.id = %(coach_id)s;
             """,
-            (
-                str(group.group_id),
-                str(group.coach_id),
-                str(group.name),
-                str(group.description),
-                str(group.area_id),
-            ),
+            {
+                "group_id": str(group.group_id),
+                "coach_id": str(group.coach_id),
+                "name": str(group.name),
+                "description": str(group.description),
+                "area_id": str(group.area_id),
+            },
         )
         db.commit()
 
@@ -118,8 +130,27 @@ def create_group(db: psycopg.Connection, coach_id: UUID, name: str, description:
 
 
 @db_named_query
-def get_group_by_id(db: psycopg.Connection, group_id: UUID) -> tuple[Group, str] | None:
+def refresh_coach_groups_search_vector(db: psycopg.Connection, coach_id: UUID) -> None:
+    """Rebuild the search vector of the groups of the coach, after the coach name changed"""
+
     with db.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE public.groups AS g
+            SET search_vector = setweight(to_tsvector('simple', g.name), 'A')
+                || setweight(to_tsvector('simple', coach.name), 'B')
+                || setweight(to_tsvector('simple', g.description), 'C')
+            FROM public.users AS coach
+            WHERE (g.coach_id = coach.id AND coach.id = %s);
+            """,
+            [str(coach_id)],
+        )
+        db.commit()
+
+
+@db_named_query
+def get_group_by_id(db: psycopg.Connection, group_id: UUID) -> tuple[Group, str] | None:
+    with db.cursor(row_factory=group_with_coach_row) as cursor:
         cursor.execute(
             """
             SELECT g.id, g.coach_id, g.name, g.description, g.area_id, coach.name
@@ -131,28 +162,37 @@ def get_group_by_id(db: psycopg.Connection, group_id: UUID) -> tuple[Group, str]
         )
         db.commit()
 
-        row = cursor.fetchone()
+        return cursor.fetchone()
 
-        if row is None:
-            return None
 
-        group = Group(
-            group_id=row[0],
-            coach_id=row[1],
-            name=str(row[2]),
-            description=str(row[3]),
-            area_id=row[4],
+@db_named_query(statement_timeout_ms=MAINTENANCE_STATEMENT_TIMEOUT_MS)
+def get_all_groups(db: psycopg.Connection) -> list[tuple[Group, str]]:
+    """Return list of all the groups with coach name"""
+    with db.cursor(row_factory=group_with_coach_row) as cursor:
+        cursor.execute(
+            """
+            SELECT g.id, g.coach_id, g.name, g.description, g.area_id, coach.name
+            FROM public.groups AS g
+            JOIN public.users AS coach ON g.coach_id = coach.id;
+            """
         )
+        db.commit()
 
-        coach_name = str(row[5])
+        return cursor.fetchall()
 
-        return group, coach_name
+
+@db_named_query
+def notify_autocomplete(db: psycopg.Connection, payload: str) -> None:
+    with db.cursor() as cursor:
+        # delivered to the listeners on commit
+        cursor.execute("SELECT pg_notify(%s, %s)", [AUTOCOMPLETE_CHANNEL, payload])
+        db.commit()
 
 
 @db_named_query
 def get_groups_by_area_id(db: psycopg.Connection, area_id: UUID) -> list[tuple[Group, str]]:
     """Return list of groups with coach name. By area_id"""
-    with db.cursor() as cursor:
+    with db.cursor(row_factory=group_with_coach_row) as cursor:
         cursor.execute(
             """
             SELECT g.id, g.coach_id, g.name, g.description, g.area_id, coach.name
@@ -164,24 +204,49 @@ def get_groups_by_area_id(db: psycopg.Connection, area_id: UUID) -> list[tuple[G
         )
         db.commit()
 
-        rows = cursor.fetchall()
+        return cursor.fetchall()
 
-        groups: list[tuple[Group, str]] = []
 
-        for row in rows:
-            group = Group(
-                group_id=row[0],
-                coach_id=row[1],
-                name=str(row[2]),
-                description=str(row[3]),
-                area_id=row[4],
-            )
+def _build_prefix_tsquery(text: str) -> str | None:
+    """Build tsquery that matches all the words of the text, each word as prefix"""
 
-            coach_name = str(row[5])
+    words = re.findall(r"\w+", text.lower())
 
-            groups.append((group, coach_name))
+    if not words:
+        return None
 
-        return groups
+    return " & ".join(f"{word}:*" for word in words)
+
+
+@db_named_query
+def search_groups(db: psycopg.Connection, text: str, area_id: UUID | None, limit: int) -> list[tuple[Group, str]]:
+    """Return list of groups with coach name, that match the text, ordered by rank. Can filtered by area_id"""
+
+    tsquery = _build_prefix_tsquery(text)
+
+    if tsquery is None:
+        return []
+
+    with db.cursor(row_factory=group_with_coach_row) as cursor:
+        cursor.execute(
+            """
+            SELECT g.id, g.coach_id, g.name, g.description, g.area_id, coach.name
+            FROM public.groups AS g
+            JOIN public.users AS coach ON g.coach_id = coach.id
+            CROSS JOIN to_tsquery('simple', %(tsquery)s) AS query
+            WHERE (g.search_vector @@ query AND (%(area_id)s::UUID IS NULL OR g.area_id = %(area_id)s::UUID))
+            ORDER BY ts_rank(g.search_vector, query) DESC, g.name
+            LIMIT %(limit)s;
+            """,
+            {
+                "tsquery": tsquery,
+                "area_id": str(area_id) if area_id is not None else None,
+                "limit": int(limit),
+            },
+        )
+        db.commit()
+
+        return cursor.fetchall()
 
 
 @db_named_query
@@ -220,7 +285,7 @@ def get_tariner_groups(db: psycopg.Connection, trainer_id: UUID) -> list[tuple[U
 def get_coach_groups(db: psycopg.Connection, coach_id: UUID) -> list[Group]:
     """Return list of groups of coach"""
 
-    with db.cursor() as cursor:
+    with db.cursor(row_factory=args_row(Group)) as cursor:
         cursor.execute(
             """
             SELECT g.id, g.coach_id, g.name, g.description, g.area_id
@@ -231,30 +296,17 @@ def get_coach_groups(db: psycopg.Connection, coach_id: UUID) -> list[Group]:
         )
         db.commit()
 
-        rows = cursor.fetchall()
-
-        groups: list[Group] = []
-
-        for row in rows:
-            group = Group(
-                group_id=row[0],
-                coach_id=row[1],
-                name=str(row[2]),
-                description=str(row[3]),
-                area_id=row[4],
-            )
-
-            groups.append(group)
-
-        return groups
+        return cursor.fetchall()
 
 
 @db_named_query
-def get_group_members(db: psycopg.Connection, group_id: UUID) -> list[User]:
-    with db.cursor() as cursor:
+def get_group_members(db: psycopg.Connection, group_id: UUID) -> list[UserCard]:
+    """Return the public details of the members of the group"""
+
+    with db.cursor(row_factory=user_card_row) as cursor:
         cursor.execute(
-            """
-            SELECT u.id, u.name, u.email, u.password_hash, u.phone, u.gender, u.date_of_birth, u.description, u.is_coach
+            f"""
+            SELECT {USER_CARD_COLUMNS}
             FROM public.group_members AS gm
             JOIN public.users AS u ON gm.user_id = u.id
             WHERE gm.group_id = %s
@@ -263,25 +315,18 @@ def get_group_members(db: psycopg.Connection, group_id: UUID) -> list[User]:
         )
         db.commit()
 
-        rows = cursor.fetchall()
+        return cursor.fetchall()
 
-        members: list[User] = []
 
-        for row in rows:
-            user = User(
-                user_id=row[0],
-                name=str(row[1]),
-                email=str(row[2]),
-                password_hash=str(row[3]),
-                phone=str(row[4]),
-                gender=Gender(str(row[5])),
-                date_of_birth=str(row[6]),
-                description=str(row[7]),
-                is_coach=bool(row[8]),
-            )
-            members.append(user)
+@db_named_query
+def get_group_member_ids(db: psycopg.Connection, group_id: UUID) -> list[UUID]:
+    """Return only the ids of the members of the group, without reading the users"""
 
-        return members
+    with db.cursor() as cursor:
+        cursor.execute("SELECT user_id FROM public.group_members WHERE group_id = %s;", [str(group_id)])
+        db.commit()
+
+        return [row[0] for row in cursor.fetchall()]
 
 
 @db_named_query
@@ -302,6 +347,17 @@ def add_member_to_group(db: psycopg.Connection, group_id: UUID, user_id: UUID) -
 @db_named_query
 def remove_member_from_group(db: psycopg.Connection, group_id: int, user_id: UUID) -> None:
     with db.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE public.meetings SET member_count = member_count - 1
+            WHERE (group_id = %s AND id IN (SELECT meeting_id FROM public.meeting_members WHERE user_id = %s));
+            """,
+            (
+                str(group_id),
+                str(user_id),
+            ),
+        )
+
         cursor.execute(
             """
             DELETE FROM public.meeting_members
@@ -326,6 +382,8 @@ def remove_member_from_group(db: psycopg.Connection, group_id: int, user_id: UUI
 
 
 class Meet:
+    __slots__ = ("meet_id", "group_id", "max_members", "meet_date", "duration", "city", "street")
+
     meet_id: UUID
     group_id: UUID
     max_members: int
@@ -338,12 +396,38 @@ class Meet:
         self.meet_id = meet_id
         self.group_id = group_id
         self.max_members = max_members
-        self.meet_date = datetime.strptime(meet_date, "%Y-%m-%d %H:%M:%S")
+        # the dates are saved as "YYYY-MM-DD HH:MM:SS", fromisoformat parses them much faster than strptime
+        self.meet_date = datetime.fromisoformat(meet_date)
         self.duration = duration
         self.city = city
         self.street = street
 
 
+def _make_meet_info(
+    meet_id: UUID,
+    group_id: UUID,
+    max_members: int,
+    meet_date: str,
+    duration: int,
+    city: str,
+    street: str,
+    group_name: str,
+    full: bool,
+    registered: bool,
+) -> tuple[Meet, str, bool, bool]:
+    return Meet(meet_id, group_id, max_members, meet_date, duration, city, street), group_name, full, registered
+
+
+def _make_past_meet(
+    meet_id: UUID, group_id: UUID, max_members: int, meet_date: str, duration: int, city: str, street: str, group_name: str, full: bool
+) -> tuple[Meet, str, bool]:
+    return Meet(meet_id, group_id, max_members, meet_date, duration, city, street), group_name, full
+
+
+# row factory of the meets with group_name, full, registered
+meet_info_row: BaseRowFactory[tuple[Meet, str, bool, bool]] = args_row(_make_meet_info)
+
+
 @db_named_query
 def create_meet(db: psycopg.Connection, group_id: UUID, max_members: int, meet_date: str, duration: int, city: str, street: str) -> Meet:
     meet_id = uuid4()
@@ -379,12 +463,15 @@ def create_meet(db: psycopg.Connection, group_id: UUID, max_members: int, meet_d
 
 
 @db_named_query
-def update_meet(db: psycopg.Connection, meet_id: UUID, max_members: int, meet_date: str, duration: int, city: str, street: str) -> None:
+def update_meet(db: psycopg.Connection, meet_id: UUID, max_members: int, meet_date: str, duration: int, city: str, street: str) -> bool:
+    """Update the details of the meet. Return False when the max members is below its members (the meet is not updated)"""
+
     with db.cursor() as cursor:
+        # checked in the update, so a member that joins meanwhile is counted
         cursor.execute(
             """UPDATE public.meetings
             SET max_members = %s, date = %s, duration = %s, city = %s, street = %s
-            WHERE id = %s;
+            WHERE (id = %s AND member_count <= %s);
             """,
             (
                 int(max_members),
@@ -393,14 +480,30 @@ def update_meet(db: psycopg.Connection, meet_id: UUID, max_members: int, meet_da
                 str(city),
                 str(street),
                 str(meet_id),
+                int(max_members),
             ),
         )
         db.commit()
 
+        return cursor.rowcount > 0
+
 
 @db_named_query
-def add_member_to_meet(db: psycopg.Connection, meet_id: UUID, user_id: UUID) -> None:
+def add_member_to_meet(db: psycopg.Connection, meet_id: UUID, user_id: UUID) -> bool:
+    """Add the member to the meet, if the meet is not full. Return if the member added"""
+
     with db.cursor() as cursor:
+        cursor.execute(
+            """UPDATE public.meetings SET member_count = member_count + 1
+            WHERE (id = %s AND member_count < max_members);
+            """,
+            [str(meet_id)],
+        )
+
+        if cursor.rowcount == 0:
+            db.rollback()
+            return False
+
         cursor.execute(
             """INSERT INTO public.meeting_members (meeting_id, user_id)
             VALUES (%s, %s);
@@ -412,6 +515,8 @@ def add_member_to_meet(db: psycopg.Connection, meet_id: UUID, user_id: UUID) ->
         )
         db.commit()
 
+        return True
+
 
 @db_named_query
 def remove_member_from_meet(db: psycopg.Connection, meet_id: UUID, user_id: UUID) -> None:
@@ -425,6 +530,13 @@ def remove_member_from_meet(db: psycopg.Connection, meet_id: UUID, user_id: UUID
                 str(user_id),
             ),
         )
+        if cursor.rowcount > 0:
+            cursor.execute(
+                """UPDATE public.meetings SET member_count = member_count - 1
+                WHERE id = %s;
+                """,
+                [str(meet_id)],
+            )
         db.commit()
 
 
@@ -480,11 +592,13 @@ def get_meet(db: psycopg.Connection, meet_id: UUID) -> tuple[Meet, UUID] | None:
 
 
 @db_named_query
-def get_meet_members(db: psycopg.Connection, meet_id: UUID) -> list[User]:
-    with db.cursor() as cursor:
+def get_meet_members(db: psycopg.Connection, meet_id: UUID) -> list[UserCard]:
+    """Return the public details of the members of the meet"""
+
+    with db.cursor(row_factory=user_card_row) as cursor:
         cursor.execute(
-            """
-            SELECT u.id, u.name, u.email, u.password_hash, u.phone, u.gender, u.date_of_birth, u.description, u.is_coach
+            f"""
+            SELECT {USER_CARD_COLUMNS}
             FROM public.users AS u
             JOIN public.meeting_members AS mm ON u.id = mm.user_id
             WHERE mm.meeting_id = %s;
@@ -493,26 +607,18 @@ def get_meet_members(db: psycopg.Connection, meet_id: UUID) -> list[User]:
         )
         db.commit()
 
-        rows = cursor.fetchall()
+        return cursor.fetchall()
 
-        members: list[User] = []
 
-        for row in rows:
-            member = User(
-                user_id=row[0],
-                name=str(row[1]),
-                email=str(row[2]),
-                password_hash=str(row[3]),
-                phone=str(row[4]),
-                gender=Gender(str(row[5])),
-                date_of_birth=str(row[6]),
-                description=str(row[7]),
-                is_coach=bool(row[8]),
-            )
+@db_named_query
+def get_meet_member_ids(db: psycopg.Connection, meet_id: UUID) -> list[UUID]:
+    """Return only the ids of the members of the meet, without reading the users"""
 
-            members.append(member)
+    with db.cursor() as cursor:
+        cursor.execute("SELECT user_id FROM public.meeting_members WHERE meeting_id = %s;", [str(meet_id)])
+        db.commit()
 
-        return members
+        return [row[0] for row in cursor.fetchall()]
 
 
 @db_named_query
@@ -520,8 +626,8 @@ def get_meet_members_count(db: psycopg.Connection, meet_id: UUID) -> int:
     with db.cursor() as cursor:
         cursor.execute(
             """
-            SELECT COUNT(user_id) FROM public.meeting_members
-            WHERE meeting_id = %s;
+            SELECT member_count FROM public.meetings
+            WHERE id = %s;
             """,
             [str(meet_id)],
         )
@@ -554,10 +660,10 @@ def check_member_in_meet(db: psycopg.Connection, meet_id: UUID, user_id: UUID) -
 
 @db_named_query
 def get_group_meets(db: psycopg.Connection, group_id: UUID) -> list[Meet]:
-    with db.cursor() as cursor:
+    with db.cursor(row_factory=args_row(Meet)) as cursor:
         cursor.execute(
             """
-            SELECT m.id, m.date, m.duration, m.city, m.street, m.max_members
+            SELECT m.id, m.group_id, m.max_members, m.date, m.duration, m.city, m.street
             FROM public.meetings AS m
             WHERE m.group_id = %s;
             """,
@@ -565,105 +671,151 @@ def get_group_meets(db: psycopg.Connection, group_id: UUID) -> list[Meet]:
         )
         db.commit()
 
-        rows = cursor.fetchall()
-
-        meets: list[Meet] = []
-
-        for row in rows:
-            meet = Meet(
-                meet_id=row[0],
-                group_id=group_id,
-                max_members=row[5],
-                meet_date=row[1],
-                duration=row[2],
-                city=row[3],
-                street=row[4],
-            )
-
-            meets.append(meet)
-
-        return meets
+        return cursor.fetchall()
 
 
 @db_named_query
-def get_group_meets_info(db: psycopg.Connection, group_id: UUID, user_id: UUID) -> list[tuple[Meet, bool, bool]]:
+def get_group_view(db: psycopg.Connection, group_id: UUID, user_id: UUID) -> tuple[Group, str, list[tuple[Meet, bool, bool]], bool] | None:
+    """
+    Return the group view for the user in one query.
+    Contain group, coach_name, meets of the group (each with full, registered) and if the user registered to the group.
+    """
     with db.cursor() as cursor:
         cursor.execute(
             """
-            SELECT m.id, m.date, m.duration, m.city, m.street, m.max_members, COUNT(mm.user_id),
-                    %s IN (SELECT user_id FROM public.meeting_members WHERE meeting_id = m.id)
-            FROM public.meetings AS m
-            LEFT JOIN public.meeting_members AS mm ON m.id = mm.meeting_id
-            WHERE (m.group_id = %s)
-            GROUP BY (m.id);
+            SELECT g.id, g.coach_id, g.name, g.description, g.area_id, coach.name,
+                EXISTS (SELECT 1 FROM public.group_members AS gm WHERE (gm.group_id = %(group_id)s AND gm.user_id = %(user_id)s)),
+                m.id, m.date, m.duration, m.city, m.street, m.max_members, m.member_count,
+                EXISTS (SELECT 1 FROM public.meeting_members AS mm WHERE (mm.meeting_id = m.id AND mm.user_id = %(user_id)s))
+            FROM public.groups AS g
+            JOIN public.users AS coach ON g.coach_id = coach.id
+            LEFT JOIN public.meetings AS m ON g.id = m.group_id
+            WHERE (g.id = %(group_id)s)
+            ORDER BY m.date;
             """,
-            (str(user_id), str(group_id)),
+            {"group_id": str(group_id), "user_id": str(user_id)},
         )
         db.commit()
 
         rows = cursor.fetchall()
 
+        if not rows:
+            return None
+
+        first_row = rows[0]
+
+        group = Group(
+            group_id=first_row[0],
+            coach_id=first_row[1],
+            name=str(first_row[2]),
+            description=str(first_row[3]),
+            area_id=first_row[4],
+        )
+
+        coach_name = str(first_row[5])
+        registered_to_group = bool(first_row[6])
+
         meets: list[tuple[Meet, bool, bool]] = []
 
         for row in rows:
+            # group without meets
+            if row[7] is None:
+                continue
+
             meet = Meet(
-                meet_id=row[0],
-                group_id=group_id,
-                max_members=row[5],
-                meet_date=row[1],
-                duration=row[2],
-                city=row[3],
-                street=row[4],
+                meet_id=row[7],
+                group_id=group.group_id,
+                max_members=row[12],
+                meet_date=row[8],
+                duration=row[9],
+                city=row[10],
+                street=row[11],
             )
 
-            registered = row[7] is not None
-            full = row[6] >= row[5]
+            full = row[13] >= row[12]
+            registered = bool(row[14])
 
             meets.append((meet, full, registered))
 
-        return meets
+        return group, coach_name, meets, registered_to_group
 
 
 @db_named_query
 def get_trainer_meets(db: psycopg.Connection, user_id: UUID) -> list[tuple[Meet, str, bool, bool]]:
-    with db.cursor() as cursor:
+    with db.cursor(row_factory=meet_info_row) as cursor:
+        # all the meets are of the trainer, so registered
         cursor.execute(
             """
-            SELECT m.id, m.group_id, m.date, m.duration, m.city, m.street, m.max_members, g.name, COUNT(mm.user_id), mm2.user_id
-            FROM public.meetings AS m
+            SELECT m.id, m.group_id, m.max_members, m.date, m.duration, m.city, m.street, g.name, m.member_count >= m.max_members, TRUE
+            FROM public.meeting_members AS mm
+            JOIN public.meetings AS m ON mm.meeting_id = m.id
             JOIN public.groups AS g ON m.group_id = g.id
-            LEFT JOIN public.meeting_members AS mm ON m.id = mm.meeting_id
-            LEFT JOIN public.meeting_members AS mm2 ON m.id = mm2.meeting_id
-            WHERE (mm2.user_id = %s)
-            GROUP BY m.id, g.id, mm2.user_id;
+            WHERE (mm.user_id = %s);
             """,
             [str(user_id)],
         )
         db.commit()
 
-        rows = cursor.fetchall()
+        return cursor.fetchall()
 
-        meets: list[tuple[Meet, str, bool, bool]] = []
 
-        for row in rows:
-            meet = Meet(
-                meet_id=row[0],
-                group_id=row[1],
-                max_members=row[6],
-                meet_date=row[2],
-                duration=row[3],
-                city=row[4],
-                street=row[5],
-            )
+@db_named_query
+def get_upcoming_meets(
+    db: psycopg.Connection,
+    user_id: UUID,
+    from_date: str,
+    to_date: str | None,
+    area_id: UUID | None,
+    city: str | None,
+    only_free: bool,
+    after: tuple[str, UUID] | None,
+    limit: int,
+) -> list[tuple[Meet, str, bool, bool]]:
+    """
+    Return page of meets from all the groups, ordered by date.
+    Each row contain meet, group_name, full, registered.
+    The page starts after the (date, meet_id) of the last meet of the previous page.
+    """
+
+    conditions = ["m.date >= %(from_date)s"]
+    params: dict[str, str | int] = {"user_id": str(user_id), "from_date": from_date, "limit": int(limit)}
+
+    if to_date is not None:
+        conditions.append("m.date <= %(to_date)s")
+        params["to_date"] = to_date
 
-            group_name = str(row[7])
+    if area_id is not None:
+        conditions.append("g.area_id = %(area_id)s")
+        params["area_id"] = str(area_id)
 
-            registered = row[9] is not None
-            full = row[8] >= row[6]
+    if city is not None:
+        conditions.append("m.city = %(city)s")
+        params["city"] = city
 
-            meets.append((meet, group_name, full, registered))
+    if only_free:
+        conditions.append("m.free_spots > 0")
 
-        return meets
+    if after is not None:
+        conditions.append("(m.date, m.id) > (%(after_date)s, %(after_meet_id)s)")
+        params["after_date"] = after[0]
+        params["after_meet_id"] = str(after[1])
+
+    with db.cursor(row_factory=meet_info_row) as cursor:
+        cursor.execute(
+            f"""
+            SELECT m.id, m.group_id, m.max_members, m.date, m.duration, m.city, m.street, g.name, m.free_spots <= 0,
+                EXISTS (SELECT 1 FROM public.meeting_members AS mm WHERE (mm.meeting_id = m.id AND mm.user_id = %(user_id)s))
+            FROM public.meetings AS m
+            JOIN public.groups AS g ON m.group_id = g.id
+            WHERE ({" AND ".join(conditions)})
+            ORDER BY m.date, m.id
+            LIMIT %(limit)s;
+            """,
+            params,
+        )
+        db.commit()
+
+        return cursor.fetchall()
 
 
 @db_named_query
@@ -689,6 +841,22 @@ def delete_meet(db: psycopg.Connection, meet_id: UUID) -> None:
 @db_named_query
 def delete_group(db: psycopg.Connection, group_id: UUID) -> None:
     with db.cursor() as cursor:
+        cursor.execute(
+            """
+            DELETE FROM public.meeting_members_history
+            WHERE meeting_id IN (SELECT id FROM public.meetings_history WHERE group_id = %s);
+            """,
+            [str(group_id)],
+        )
+
+        cursor.execute(
+            """
+            DELETE FROM public.meetings_history
+            WHERE group_id = %s;
+            """,
+            [str(group_id)],
+        )
+
         cursor.execute(
             """
             DELETE FROM public.group_members
@@ -705,3 +873,112 @@ def delete_group(db: psycopg.Connection, group_id: UUID) -> None:
             [str(group_id)],
         )
         db.commit()
+
+
+@db_named_query(statement_timeout_ms=MAINTENANCE_STATEMENT_TIMEOUT_MS)
+def repair_meets_member_count(db: psycopg.Connection) -> int:
+    """Recount the members of each meet and fix the meets that their member_count drifted. Return the number of fixed meets"""
+
+    with db.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE public.meetings AS m
+            SET member_count = counts.member_count
+            FROM (
+                SELECT m2.id, COUNT(mm.user_id) AS member_count
+                FROM public.meetings AS m2
+                LEFT JOIN public.meeting_members AS mm ON m2.id = mm.meeting_id
+                GROUP BY m2.id
+            ) AS counts
+            WHERE (m.id = counts.id AND m.member_count <> counts.member_count);
+            """
+        )
+        db.commit()
+
+        return cursor.rowcount
+
+
+@db_named_query(statement_timeout_ms=MAINTENANCE_STATEMENT_TIMEOUT_MS)
+def archive_meets_batch(db: psycopg.Connection, before_date: str, batch_size: int) -> int:
+    """Move batch of meets older than before_date, with their members, to the history tables. Return the number of moved meets"""
+
+    with db.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT id FROM public.meetings
+            WHERE date < %s
+            ORDER BY date
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED;
+            """,
+            [str(before_date), int(batch_size)],
+        )
+
+        meet_ids = [row[0] for row in cursor.fetchall()]
+
+        if not meet_ids:
+            db.commit()
+            return 0
+
+        cursor.execute(
+            """
+            INSERT INTO public.meetings_history (id, group_id, max_members, date, duration, city, street, member_count)
+            SELECT id, group_id, max_members, date, duration, city, street, member_count
+            FROM public.meetings
+            WHERE id = ANY(%s);
+            """,
+            [meet_ids],
+        )
+
+        cursor.execute(
+            """
+            INSERT INTO public.meeting_members_history (meeting_id, user_id, meeting_date)
+            SELECT mm.meeting_id, mm.user_id, m.date
+            FROM public.meeting_members AS mm
+            JOIN public.meetings AS m ON mm.meeting_id = m.id
+            WHERE mm.meeting_id = ANY(%s);
+            """,
+            [meet_ids],
+        )
+
+        cursor.execute("DELETE FROM public.meeting_members WHERE meeting_id = ANY(%s);", [meet_ids])
+        cursor.execute("DELETE FROM public.meetings WHERE id = ANY(%s);", [meet_ids])
+        db.commit()
+
+        return len(meet_ids)
+
+
+@db_named_query
+def get_trainer_past_meets(
+    db: psycopg.Connection, user_id: UUID, after: tuple[str, UUID] | None, limit: int
+) -> list[tuple[Meet, str, bool]]:
+    """
+    Return page of the archived meets of the trainer, from the newest.
+    Each row contain meet, group_name, full.
+    The page starts after the (date, meet_id) of the last meet of the previous page.
+    """
+
+    condition = "mmh.user_id = %(user_id)s"
+    params: dict[str, str | int] = {"user_id": str(user_id), "limit": int(limit)}
+
+    if after is not None:
+        condition += " AND (mmh.meeting_date, mmh.meeting_id) < (%(after_date)s, %(after_meet_id)s)"
+        params["after_date"] = after[0]
+        params["after_meet_id"] = str(after[1])
+
+    with db.cursor(row_factory=args_row(_make_past_meet)) as cursor:
+        cursor.execute(
+            f"""
+            SELECT m.id, m.group_id, m.max_members, m.date, m.duration, m.city, m.street, g.name, m.member_count >= m.max_members
+            FROM public.meeting_members_history AS mmh
+            JOIN public.meetings_history AS m ON mmh.meeting_id = m.id
+            JOIN public.groups AS g ON m.group_id = g.id
+            WHERE ({condition})
+            ORDER BY mmh.meeting_date DESC, mmh.meeting_id DESC
+            LIMIT %(limit)s;
+            """,
+            params,
+        )
+        db.commit()
+
+        return cursor.fetchall()
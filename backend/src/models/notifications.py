@@ -1,22 +1,41 @@
+import json
 from datetime import datetime
 from uuid import UUID, uuid4
 
 import psycopg
+from psycopg import sql
+from psycopg.rows import args_row
 
-from src.models import db_named_query
+from src.models import MAINTENANCE_STATEMENT_TIMEOUT_MS, db_named_query
+
+# partitions of months after the current month, that created ahead
+NOTIFICATIONS_PARTITIONS_AHEAD_MONTHS = 2
+
+# name of the advisory lock of the maintenance of the partitions (its key is hashtext of the name),
+# the workers of the serve command run it at the same time
+NOTIFICATIONS_PARTITIONS_LOCK = "notifications_partitions"
+
+# channel of LISTEN/NOTIFY for created and deleted notifications
+NOTIFICATIONS_CHANNEL = "notifications"
 
 
 class Notification:
+    __slots__ = ("notification_id", "user_id", "message", "date", "is_read", "seq")
+
     notification_id: UUID
     user_id: UUID
     message: str
     date: datetime
+    is_read: bool
+    seq: int
 
-    def __init__(self, notification_id: UUID, user_id: UUID, message: str, date: datetime):
+    def __init__(self, notification_id: UUID, user_id: UUID, message: str, date: datetime, is_read: bool, seq: int):
         self.notification_id = notification_id
         self.user_id = user_id
         self.message = message
         self.date = date
+        self.is_read = is_read
+        self.seq = seq
 
 
 @db_named_query
@@ -28,15 +47,52 @@ def create_notification(db: psycopg.Connection, user_id: UUID, message: str) ->
         user_id=user_id,
         message=message,
         date=datetime.now(),
+        is_read=False,
+        seq=0,
     )
 
     with db.cursor() as cursor:
         cursor.execute(
             """INSERT INTO public.notifications (id, user_id, message, date)
-            VALUES (%s, %s, %s, %s)""",
+            VALUES (%s, %s, %s, %s)
+            RETURNING seq, pg_snapshot_xmin(pg_current_snapshot())::text::bigint""",
             (str(notification.notification_id), str(notification.user_id), str(notification.message), notification.date),
         )
 
+        row = cursor.fetchone()
+        changes_cursor = 0
+        if row is not None:
+            notification.seq = int(row[0])
+            changes_cursor = int(row[1])
+
+        # delivered to the listeners on commit
+        cursor.execute(
+            "SELECT pg_notify(%s, %s)",
+            [
+                NOTIFICATIONS_CHANNEL,
+                json.dumps(
+                    {
+                        "user_id": str(notification.user_id),
+                        "event": "notification",
+                        "seq": notification.seq,
+                        "cursor": changes_cursor,
+                        "data": {
+                            "notification_id": str(notification.notification_id),
+                            "message": notification.message,
+                            "date": notification.date.strftime("%Y-%m-%d %H:%M:%S"),
+                            "is_read": notification.is_read,
+                        },
+                    }
+                ),
+            ],
+        )
+        cursor.execute(
+            """INSERT INTO public.notification_counters (user_id, unread_count)
+            VALUES (%s, 1)
+            ON CONFLICT (user_id) DO UPDATE SET unread_count = public.notification_counters.unread_count + 1""",
+            [str(notification.user_id)],
+        )
+
         db.commit()
 
 
@@ -46,22 +102,144 @@ def delete_user_notification(db: psycopg.Connection, notification_id: UUID, user
         cursor.execute(
             """
             DELETE FROM public.notifications
-            WHERE (id = %s AND user_id = %s);
+            WHERE (id = %s AND user_id = %s)
+            RETURNING is_read;
             """,
             [str(notification_id), str(user_id)],
         )
 
+        row = cursor.fetchone()
+
+        if row is not None:
+            # tombstone for the clients that fetch the changes since their cursor
+            cursor.execute(
+                """
+                INSERT INTO public.notification_deletions (user_id, notification_id, date)
+                VALUES (%s, %s, %s)
+                RETURNING seq, pg_snapshot_xmin(pg_current_snapshot())::text::bigint;
+                """,
+                [str(user_id), str(notification_id), datetime.now()],
+            )
+
+            deletion_row = cursor.fetchone()
+            seq = int(deletion_row[0]) if deletion_row is not None else 0
+            changes_cursor = int(deletion_row[1]) if deletion_row is not None else 0
+
+            # delivered to the listeners on commit
+            cursor.execute(
+                "SELECT pg_notify(%s, %s)",
+                [
+                    NOTIFICATIONS_CHANNEL,
+                    json.dumps(
+                        {
+                            "user_id": str(user_id),
+                            "event": "deleted",
+                            "seq": seq,
+                            "cursor": changes_cursor,
+                            "data": {"notification_id": str(notification_id)},
+                        }
+                    ),
+                ],
+            )
+
+        if row is not None and not row[0]:
+            cursor.execute(
+                """
+                UPDATE public.notification_counters SET unread_count = unread_count - 1
+                WHERE user_id = %s;
+                """,
+                [str(user_id)],
+            )
+
         db.commit()
 
 
 @db_named_query
-def get_user_notifications(db: psycopg.Connection, user_id: UUID) -> list[Notification]:
-    notifications = []
+def mark_user_notification_read(db: psycopg.Connection, notification_id: UUID, user_id: UUID) -> None:
+    with db.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE public.notifications SET is_read = true, change_xid = pg_current_xact_id()
+            WHERE (id = %s AND user_id = %s AND NOT is_read);
+            """,
+            [str(notification_id), str(user_id)],
+        )
+
+        if cursor.rowcount > 0:
+            cursor.execute(
+                """
+                UPDATE public.notification_counters SET unread_count = unread_count - %s
+                WHERE user_id = %s;
+                """,
+                [cursor.rowcount, str(user_id)],
+            )
+
+        db.commit()
+
 
+@db_named_query
+def mark_user_notifications_read(db: psycopg.Connection, user_id: UUID) -> None:
     with db.cursor() as cursor:
         cursor.execute(
             """
-            SELECT id, user_id, message, date
+            UPDATE public.notifications SET is_read = true, change_xid = pg_current_xact_id()
+            WHERE (user_id = %s AND NOT is_read);
+            """,
+            [str(user_id)],
+        )
+
+        if cursor.rowcount > 0:
+            cursor.execute(
+                """
+                UPDATE public.notification_counters SET unread_count = unread_count - %s
+                WHERE user_id = %s;
+                """,
+                [cursor.rowcount, str(user_id)],
+            )
+
+        db.commit()
+
+
+@db_named_query
+def get_user_unread_count(db: psycopg.Connection, user_id: UUID) -> int:
+    with db.cursor() as cursor:
+        cursor.execute("SELECT unread_count FROM public.notification_counters WHERE user_id = %s", [str(user_id)])
+
+        db.commit()
+
+        row = cursor.fetchone()
+
+        if row is None:
+            return 0
+
+        return int(row[0])
+
+
+@db_named_query
+def get_notifications_cursor(db: psycopg.Connection) -> int:
+    """
+    Return the cursor of the notifications changes, read it before the notifications.
+    The cursor is the oldest transaction in progress, the changes of the older transactions are already committed (or rolled back).
+    The rows keep the transaction of their last change (change_xid), so the changes since the cursor include the changes
+    that are committed after a newer one (the seq is in the order of the inserts, not the commits).
+    """
+
+    with db.cursor() as cursor:
+        cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint;")
+
+        db.commit()
+
+        row = cursor.fetchone()
+
+        return int(row[0]) if row is not None else 0
+
+
+@db_named_query
+def get_user_notifications(db: psycopg.Connection, user_id: UUID) -> list[Notification]:
+    with db.cursor(row_factory=args_row(Notification)) as cursor:
+        cursor.execute(
+            """
+            SELECT id, user_id, message, date, is_read, seq
             FROM public.notifications
             WHERE user_id = %s
             ORDER BY date DESC;
@@ -71,10 +249,129 @@ def get_user_notifications(db: psycopg.Connection, user_id: UUID) -> list[Notifi
 
         db.commit()
 
-        rows = cursor.fetchall()
+        return cursor.fetchall()
+
+
+@db_named_query
+def get_user_notifications_since(db: psycopg.Connection, user_id: UUID, since: int) -> tuple[list[Notification], list[tuple[UUID, int]]]:
+    """
+    Return the notifications created or read since the cursor (newest first),
+    and the ids with seq of the notifications deleted since it (the cursor of get_notifications_cursor).
+    The changes of the transactions that were in progress at the cursor are returned again, the clients apply them by id.
+    Deletions by the retention are not reported, clients with cursor older than the retention should fetch all again.
+    """
+
+    with db.cursor(row_factory=args_row(Notification)) as cursor:
+        cursor.execute(
+            """
+            SELECT id, user_id, message, date, is_read, seq
+            FROM public.notifications
+            WHERE (user_id = %s AND change_xid >= %s::xid8)
+            ORDER BY seq DESC;
+            """,
+            [str(user_id), str(since)],
+        )
+
+        notifications = cursor.fetchall()
+
+    with db.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT notification_id, seq
+            FROM public.notification_deletions
+            WHERE (user_id = %s AND change_xid >= %s::xid8);
+            """,
+            [str(user_id), str(since)],
+        )
+
+        deletions = [(row[0], int(row[1])) for row in cursor.fetchall()]
+
+        db.commit()
+
+    return notifications, deletions
+
+
+def _add_months(year: int, month: int, months: int) -> tuple[int, int]:
+    index = year * 12 + (month - 1) + months
+    return index // 12, index % 12 + 1
+
+
+def _get_partition_name(year: int, month: int) -> str:
+    return f"notifications_{year:04d}_{month:02d}"
 
-        for row in rows:
-            notification_id, user_id, message, date = row
-            notifications.append(Notification(notification_id, user_id, message, date))
 
-    return notifications
+@db_named_query(statement_timeout_ms=MAINTENANCE_STATEMENT_TIMEOUT_MS)
+def ensure_notifications_partitions(db: psycopg.Connection, now: datetime) -> None:
+    """Create the monthly partitions of the notifications, from the month of now and the months ahead"""
+
+    with db.cursor() as cursor:
+        # until the commit, so the workers do not create the same partition together
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [NOTIFICATIONS_PARTITIONS_LOCK])
+
+        for months in range(NOTIFICATIONS_PARTITIONS_AHEAD_MONTHS + 1):
+            year, month = _add_months(now.year, now.month, months)
+            next_year, next_month = _add_months(year, month, 1)
+
+            cursor.execute(
+                sql.SQL("CREATE TABLE IF NOT EXISTS public.{} PARTITION OF public.notifications FOR VALUES FROM ({}) TO ({})").format(
+                    sql.Identifier(_get_partition_name(year, month)),
+                    sql.Literal(datetime(year, month, 1)),
+                    sql.Literal(datetime(next_year, next_month, 1)),
+                )
+            )
+
+        db.commit()
+
+
+@db_named_query(statement_timeout_ms=MAINTENANCE_STATEMENT_TIMEOUT_MS)
+def drop_old_notifications_partitions(db: psycopg.Connection, now: datetime, retention_months: int) -> int:
+    """Drop the monthly partitions of the notifications older than the retention. Return the number of dropped partitions"""
+
+    oldest_year, oldest_month = _add_months(now.year, now.month, -retention_months)
+    oldest_partition_name = _get_partition_name(oldest_year, oldest_month)
+
+    with db.cursor() as cursor:
+        # until the commit, so the partitions are listed after the drops of the other workers
+        cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [NOTIFICATIONS_PARTITIONS_LOCK])
+
+        cursor.execute(
+            """
+            SELECT c.relname
+            FROM pg_inherits AS i
+            JOIN pg_class AS c ON i.inhrelid = c.oid
+            WHERE i.inhparent = 'public.notifications'::regclass;
+            """
+        )
+
+        # the names are ordered as the months
+        partitions_names = [str(row[0]) for row in cursor.fetchall() if str(row[0]) < oldest_partition_name]
+
+        for partition_name in partitions_names:
+            # block changes to the read flags while the unread counters are fixed
+            cursor.execute(sql.SQL("LOCK TABLE public.{} IN ACCESS EXCLUSIVE MODE").format(sql.Identifier(partition_name)))
+
+            cursor.execute(
+                sql.SQL(
+                    """
+                    UPDATE public.notification_counters AS c
+                    SET unread_count = c.unread_count - p.unread_count
+                    FROM (
+                        SELECT user_id, COUNT(*) AS unread_count FROM public.{}
+                        WHERE NOT is_read
+                        GROUP BY user_id
+                    ) AS p
+                    WHERE c.user_id = p.user_id;
+                    """
+                ).format(sql.Identifier(partition_name))
+            )
+
+            cursor.execute(sql.SQL("DROP TABLE public.{}").format(sql.Identifier(partition_name)))
+
+        cursor.execute(
+            "DELETE FROM public.notification_deletions WHERE date < %s;",
+            [datetime(oldest_year, oldest_month, 1)],
+        )
+
+        db.commit()
+
+        return len(partitions_names)
@@ -2,9 +2,13 @@ from enum import StrEnum
 from uuid import UUID, uuid4
 
 import psycopg
+from psycopg.rows import BaseRowFactory, args_row
 
 from src.models import db_named_query
 
+# notifications of the deleted auth tokens, for the auth tokens caches of all the workers
+AUTH_TOKENS_CHANNEL = "auth_tokens"
+
 
 class Gender(StrEnum):
     male = "male"
@@ -12,6 +16,8 @@ class Gender(StrEnum):
 
 
 class User:
+    __slots__ = ("user_id", "name", "email", "password_hash", "phone", "gender", "date_of_birth", "description", "is_coach")
+
     user_id: UUID
     name: str
     email: str
@@ -45,6 +51,51 @@ class User:
         self.is_coach = is_coach
 
 
+def _make_user(
+    user_id: UUID, name: str, email: str, password_hash: str, phone: str, gender: str, date_of_birth: str, description: str, is_coach: bool
+) -> User:
+    return User(user_id, name, email, password_hash, phone, Gender(gender), date_of_birth, description, is_coach)
+
+
+# row factory of the users, for selecting the columns of USER_COLUMNS
+user_row: BaseRowFactory[User] = args_row(_make_user)
+
+USER_COLUMNS = "id, name, email, password_hash, phone, gender, date_of_birth, description, is_coach"
+
+
+class UserCard:
+    """The public details of user, as shown to the other users (without the password hash and the coach flag)"""
+
+    __slots__ = ("user_id", "name", "email", "phone", "gender", "date_of_birth", "description")
+
+    user_id: UUID
+    name: str
+    email: str
+    phone: str
+    gender: Gender
+    date_of_birth: str
+    description: str
+
+    def __init__(self, user_id: UUID, name: str, email: str, phone: str, gender: Gender, date_of_birth: str, description: str):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.phone = phone
+        self.gender = gender
+        self.date_of_birth = date_of_birth
+        self.description = description
+
+
+def _make_user_card(user_id: UUID, name: str, email: str, phone: str, gender: str, date_of_birth: str, description: str) -> UserCard:
+    return UserCard(user_id, name, email, phone, Gender(gender), date_of_birth, description)
+
+
+# row factory of the user cards, for selecting the columns of USER_CARD_COLUMNS (with the prefix of the users table)
+user_card_row: BaseRowFactory[UserCard] = args_row(_make_user_card)
+
+USER_CARD_COLUMNS = "u.id, u.name, u.email, u.phone, u.gender, u.date_of_birth, u.description"
+
+
 @db_named_query
 def create_user(db: psycopg.Connection, name: str, email: str, password_hash: str, phone: str, gender: Gender, date_of_birth: str) -> User:
     user_id = uuid4()
@@ -83,56 +134,26 @@ def create_user(db: psycopg.Connection, name: str, email: str, password_hash: st
 
 @db_named_query
 def get_user_by_id(db: psycopg.Connection, user_id: UUID) -> User | None:
-    with db.cursor() as cursor:
+    with db.cursor(row_factory=user_row) as cursor:
         cursor.execute(
-            "SELECT id, name, email, password_hash, phone, gender, date_of_birth, description, is_coach FROM public.users WHERE id = %s",
+            f"SELECT {USER_COLUMNS} FROM public.users WHERE id = %s",
             [str(user_id)],
         )
         db.commit()
 
-        row = cursor.fetchone()
-
-        if row is None:
-            return None
-
-        return User(
-            user_id=row[0],
-            name=str(row[1]),
-            email=str(row[2]),
-            password_hash=str(row[3]),
-            phone=str(row[4]),
-            gender=Gender(str(row[5])),
-            date_of_birth=str(row[6]),
-            description=str(row[7]),
-            is_coach=bool(row[8]),
-        )
+        return cursor.fetchone()
 
 
 @db_named_query
 def get_user_by_email(db: psycopg.Connection, email: str) -> User | None:
-    with db.cursor() as cursor:
+    with db.cursor(row_factory=user_row) as cursor:
         cursor.execute(
-            "SELECT id, name, email, password_hash, phone, gender, date_of_birth, description, is_coach FROM public.users WHERE email = %s",
+            f"SELECT {USER_COLUMNS} FROM public.users WHERE email = %s",
             [str(email)],
         )
         db.commit()
 
-        row = cursor.fetchone()
-
-        if row is None:
-            return None
-
-        return User(
-            user_id=row[0],
-            name=str(row[1]),
-            email=str(row[2]),
-            password_hash=str(row[3]),
-            phone=str(row[4]),
-            gender=Gender(str(row[5])),
-            date_of_birth=str(row[6]),
-            description=str(row[7]),
-            is_coach=bool(row[8]),
-        )
+        return cursor.fetchone()
 
 
 @db_named_query
@@ -160,7 +181,60 @@ def update_user_password(db: psycopg.Connection, user_id: UUID, password_hash: s
         db.commit()
 
 
+@db_named_query
+def create_auth_token(db: psycopg.Connection, user_id: UUID) -> UUID:
+    auth_token = uuid4()
+
+    with db.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO public.auth_tokens (token, user_id, created_at) VALUES (%s, %s, now())",
+            [str(auth_token), str(user_id)],
+        )
+        db.commit()
+
+    return auth_token
+
+
+@db_named_query
+def delete_auth_token(db: psycopg.Connection, auth_token: UUID, user_id: UUID) -> bool:
+    with db.cursor() as cursor:
+        cursor.execute("DELETE FROM public.auth_tokens WHERE token = %s AND user_id = %s", [str(auth_token), str(user_id)])
+        deleted = cursor.rowcount > 0
+
+        if deleted:
+            # delivered with the commit of the delete
+            cursor.execute("SELECT pg_notify(%s, %s)", [AUTH_TOKENS_CHANNEL, str(auth_token)])
+        db.commit()
+
+        return deleted
+
+
+@db_named_query
+def get_auth_token_user_id(db: psycopg.Connection, auth_token: UUID) -> UUID | None:
+    with db.cursor() as cursor:
+        cursor.execute("SELECT user_id FROM public.auth_tokens WHERE token = %s", [str(auth_token)])
+        db.commit()
+
+        row = cursor.fetchone()
+
+    return None if row is None else row[0]
+
+
+@db_named_query
+def get_user_by_auth_token(db: psycopg.Connection, auth_token: UUID) -> User | None:
+    with db.cursor(row_factory=user_row) as cursor:
+        cursor.execute(
+            f"SELECT {USER_COLUMNS} FROM public.users WHERE id = (SELECT user_id FROM public.auth_tokens WHERE token = %s)",
+            [str(auth_token)],
+        )
+        db.commit()
+
+        return cursor.fetchone()
+
+
 class FileModel:
+    __slots__ = ("file_id", "user_id", "name", "body")
+
     file_id: UUID
     user_id: UUID
     name: str
@@ -194,7 +268,7 @@ def user_upload_certificate(db: psycopg.Connection, user_id: UUID, name: str, bo
 
 @db_named_query
 def get_user_certificate(db: psycopg.Connection, user_id: UUID, file_id: UUID) -> FileModel | None:
-    with db.cursor() as cursor:
+    with db.cursor(row_factory=args_row(FileModel)) as cursor:
         cursor.execute(
             """
         SELECT id, user_id, name, body FROM public.certificates
@@ -204,23 +278,17 @@ def get_user_certificate(db: psycopg.Connection, user_id: UUID, file_id: UUID) -
         )
         db.commit()
 
-        row = cursor.fetchone()
-
-        if row is None:
-            return None
-
-        return FileModel(file_id=row[0], user_id=row[1], name=str(row[2]), body=row[3])
+        return cursor.fetchone()
 
 
 @db_named_query
 def get_user_certificates(db: psycopg.Connection, user_id: UUID) -> list[FileModel]:
-    with db.cursor() as cursor:
-        cursor.execute("SELECT id, user_id, name FROM public.certificates WHERE user_id = %s", [str(user_id)])
+    with db.cursor(row_factory=args_row(FileModel)) as cursor:
+        # without the bodies of the certificates
+        cursor.execute("SELECT id, user_id, name, ''::BYTEA FROM public.certificates WHERE user_id = %s", [str(user_id)])
         db.commit()
 
-        rows = cursor.fetchall()
-
-        return [FileModel(file_id=row[0], user_id=row[1], name=str(row[2]), body=b"") for row in rows]
+        return cursor.fetchall()
 
 
 @db_named_query
@@ -251,16 +319,11 @@ def user_upload_profile_image(db: psycopg.Connection, user_id: UUID, name: str,
 
 @db_named_query
 def get_user_profile_image(db: psycopg.Connection, user_id: UUID) -> FileModel | None:
-    with db.cursor() as cursor:
+    with db.cursor(row_factory=args_row(FileModel)) as cursor:
         cursor.execute("SELECT id, user_id, name, body FROM public.profiles WHERE user_id = %s", [str(user_id)])
         db.commit()
 
-        row = cursor.fetchone()
-
-        if row is None:
-            return None
-
-        return FileModel(file_id=row[0], user_id=row[1], name=str(row[2]), body=row[3])
+        return cursor.fetchone()
 
 
 @db_named_query
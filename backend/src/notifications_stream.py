@@ -0,0 +1,188 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator
+from uuid import UUID
+
+import psycopg
+from psycopg import sql
+from starlette.concurrency import run_in_threadpool
+
+from src.config import config
+from src.logger import get_logger
+from src.models import get_conninfo, get_db
+from src.models.notifications import NOTIFICATIONS_CHANNEL, get_notifications_cursor, get_user_notifications_since
+from src.schemas import NotificationSchema
+
+# events waiting for a slow client, before the client is resynced from the database
+SUBSCRIBER_QUEUE_SIZE = 100
+
+LISTENER_RECONNECT_SECONDS = 5
+
+g_listener_task: None | asyncio.Task = None
+
+
+class _Subscriber:
+    queue: asyncio.Queue[dict[str, Any]]
+    # events were lost (slow client or listener reconnect), resync from the database
+    missed_events: bool
+
+    def __init__(self) -> None:
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.missed_events = False
+
+    def push(self, event: dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.missed_events = True
+
+
+class NotificationsHub:
+    """Fan out of the notifications events of the listener to the connected clients of the process"""
+
+    def __init__(self) -> None:
+        self._subscribers: dict[UUID, set[_Subscriber]] = {}
+
+    def subscribe(self, user_id: UUID) -> _Subscriber:
+        subscriber = _Subscriber()
+        self._subscribers.setdefault(user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, user_id: UUID, subscriber: _Subscriber) -> None:
+        subscribers = self._subscribers.get(user_id)
+        if subscribers is None:
+            return
+
+        subscribers.discard(subscriber)
+        if not subscribers:
+            self._subscribers.pop(user_id)
+
+    def publish(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+            user_id = UUID(event["user_id"])
+        except (ValueError, KeyError):
+            get_logger().error(f"Invalid notifications event: {payload}")
+            return
+
+        for subscriber in self._subscribers.get(user_id, ()):
+            subscriber.push(event)
+
+    def resync_all(self) -> None:
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                subscriber.missed_events = True
+                subscriber.push({"event": "resync"})
+
+
+notifications_hub = NotificationsHub()
+
+
+async def _listen() -> None:
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(get_conninfo(), autocommit=True) as conn:
+                await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(NOTIFICATIONS_CHANNEL)))
+
+                # events may be lost while the listener was not connected
+                notifications_hub.resync_all()
+
+                async for notify in conn.notifies():
+                    notifications_hub.publish(notify.payload)
+        except psycopg.Error as e:
+            get_logger().error(f"Notifications listener disconnected: {e}")
+
+        await asyncio.sleep(LISTENER_RECONNECT_SECONDS)
+
+
+def start_notifications_listener() -> None:
+    """Start the listener of the notifications events, one database connection for all the clients of the process"""
+
+    global g_listener_task
+    if g_listener_task is not None:
+        return
+
+    g_listener_task = asyncio.create_task(_listen())
+
+
+async def stop_notifications_listener() -> None:
+    """Stop the listener of the notifications events"""
+
+    global g_listener_task
+    if g_listener_task is None:
+        return
+
+    g_listener_task.cancel()
+    await asyncio.gather(g_listener_task, return_exceptions=True)
+    g_listener_task = None
+
+
+def _format_event(cursor: int, event: str, data: str) -> str:
+    return f"id: {cursor}\nevent: {event}\ndata: {data}\n\n"
+
+
+def _fetch_events_since(user_id: UUID, since: int) -> tuple[list[tuple[int, str, str]], int]:
+    """Return the events of the user since the cursor as (seq, event, data) ordered by seq, and the new cursor"""
+
+    with get_db() as db:
+        cursor = get_notifications_cursor(db)
+        notifications, deletions = get_user_notifications_since(db, user_id, since)
+
+    events = [
+        (notification.seq, "notification", NotificationSchema.from_model(notification).model_dump_json()) for notification in notifications
+    ]
+    events += [(seq, "deleted", json.dumps({"notification_id": str(notification_id)})) for notification_id, seq in deletions]
+
+    return sorted(events), cursor
+
+
+async def stream_notifications(user_id: UUID, since: int | None) -> AsyncIterator[str]:
+    """
+    Stream the notifications events of the user as Server-Sent Events, resumed from the since cursor.
+    The read flags are not streamed, the clients fetch their changes with the cursor (notifications/get).
+    """
+
+    # subscribe before reading the database, so no event is lost between them
+    subscriber = notifications_hub.subscribe(user_id)
+
+    try:
+        cursor = since
+        resumed_seqs: set[int] = set()
+
+        if since is not None:
+            subscriber.missed_events = True
+
+        while True:
+            if subscriber.missed_events:
+                subscriber.missed_events = False
+
+                if cursor is None:
+                    # the client should fetch all the notifications again
+                    yield "event: resync\ndata: {}\n\n"
+                else:
+                    events, fetched_cursor = await run_in_threadpool(_fetch_events_since, user_id, cursor)
+
+                    # the id of the event is the cursor to resume from, the new cursor only after the last event of the batch
+                    resumed_seqs = {seq for seq, _, _ in events}
+                    for i, (seq, event_name, data) in enumerate(events):
+                        yield _format_event(fetched_cursor if i == len(events) - 1 else cursor, event_name, data)
+
+                    cursor = max(cursor, fetched_cursor)
+
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=config.notifications_stream_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+
+            if event["event"] == "resync":
+                continue
+
+            if int(event["seq"]) in resumed_seqs:
+                continue
+
+            # the cursor of the transaction of the event, the older transactions are committed
+            cursor = int(event["cursor"]) if cursor is None else max(cursor, int(event["cursor"]))
+            yield _format_event(cursor, event["event"], json.dumps(event["data"]))
+    finally:
+        notifications_hub.unsubscribe(user_id, subscriber)
@@ -0,0 +1,188 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.api import FastJSONResponse
+from src.config import config
+from src.metrics import Counter
+
+# the classes of the limited routes, the other routes are not limited.
+# the auth routes are limited per IP address, the upload routes per IP address and per auth token (before the token is verified)
+RATE_LIMIT_ROUTE_CLASSES = {
+    "/auth/login": "auth",
+    "/auth/signup": "auth",
+    "/profile/upload-first-certificate": "upload",
+    "/profile/upload-certificate": "upload",
+    "/profile/upload-profile-picture": "upload",
+}
+
+# the buckets are split between shards, each with its own lock, so the requests of different clients do not wait for each other
+RATE_LIMIT_SHARDS_COUNT = 16
+
+# buckets in a shard, the least recently used are evicted (made up clients do not grow the memory)
+RATE_LIMIT_SHARD_MAX_BUCKETS = 10000
+
+http_requests_rate_limited_total = Counter(
+    "http_requests_rate_limited_total", "Requests rejected by the rate limit, with 429", ("route_class",)
+)
+
+
+class RateLimit:
+    """Limit of a route class, a token bucket of the burst size refilled with the requests per minute"""
+
+    __slots__ = ("per_minute", "burst")
+
+    per_minute: int
+    burst: int
+
+    def __init__(self, per_minute: int, burst: int):
+        self.per_minute = per_minute
+        self.burst = burst
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float) -> None:
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.buckets: OrderedDict[tuple[str, str], _Bucket] = OrderedDict()
+
+
+class RateLimiter:
+    """Token buckets by limit and client (the IP address or the auth token)"""
+
+    def __init__(
+        self,
+        limits: dict[str, RateLimit],
+        shards_count: int = RATE_LIMIT_SHARDS_COUNT,
+        shard_max_buckets: int = RATE_LIMIT_SHARD_MAX_BUCKETS,
+    ) -> None:
+        self.limits = limits
+        self._shards = [_Shard() for _ in range(shards_count)]
+        self._shard_max_buckets = shard_max_buckets
+
+    def acquire(self, limit_name: str, client: str) -> tuple[bool, float, float]:
+        """
+        Take a token of the bucket of the client. Return if the request is allowed, the remaining tokens
+        and the seconds until the bucket is full (or until the next token, when the request is not allowed).
+        """
+
+        limit = self.limits[limit_name]
+        key = (limit_name, client)
+        rate = limit.per_minute / 60
+        now = time.monotonic()
+        shard = self._shards[hash(key) % len(self._shards)]
+
+        with shard.lock:
+            bucket = shard.buckets.get(key)
+            if bucket is None:
+                if len(shard.buckets) >= self._shard_max_buckets:
+                    shard.buckets.popitem(last=False)
+                bucket = shard.buckets[key] = _Bucket(limit.burst, now)
+            else:
+                bucket.tokens = min(limit.burst, bucket.tokens + (now - bucket.updated_at) * rate)
+                bucket.updated_at = now
+                shard.buckets.move_to_end(key)
+
+            if bucket.tokens < 1:
+                return False, bucket.tokens, (1 - bucket.tokens) / rate
+
+            bucket.tokens -= 1
+            return True, bucket.tokens, (limit.burst - bucket.tokens) / rate
+
+
+def get_rate_limits() -> dict[str, RateLimit]:
+    """Return the limits by the configuration (auth and upload per IP address, upload per auth token), without the disabled ones"""
+
+    limits = {
+        "auth": RateLimit(config.rate_limit_auth_per_minute, config.rate_limit_auth_burst),
+        "upload": RateLimit(config.rate_limit_upload_per_minute, config.rate_limit_upload_burst),
+        "upload_token": RateLimit(config.rate_limit_upload_token_per_minute, config.rate_limit_upload_token_burst),
+    }
+
+    return {limit_name: limit for limit_name, limit in limits.items() if limit.per_minute > 0 and limit.burst > 0}
+
+
+def _get_clients(scope: Scope, route_class: str) -> list[tuple[str, str]]:
+    """Return the limits of the request with its client in each of them"""
+
+    # the address of the client behind the trusted proxies (FORWARDED_ALLOW_IPS), by the proxy headers of uvicorn
+    client = scope.get("client")
+    clients = [(route_class, f"ip:{client[0] if client else ''}")]
+
+    if route_class == "upload":
+        auth_tokens = parse_qs(scope["query_string"].decode("latin-1")).get("auth_token")
+        if auth_tokens:
+            clients.append(("upload_token", f"token:{auth_tokens[0]}"))
+
+    return clients
+
+
+class RateLimitMiddleware:
+    """
+    Rate limit the auth and the upload routes, per client and route class, in the memory of each worker
+    (the limits of the server are the limits of the configuration times the workers).
+    The responses have the RateLimit-Limit, RateLimit-Remaining and RateLimit-Reset headers (of the most limiting bucket),
+    the rejected requests get 429 with Retry-After.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._limiter: RateLimiter | None = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route_class = RATE_LIMIT_ROUTE_CLASSES.get(scope["path"]) if scope["type"] == "http" else None
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        # the configuration is initialized in the lifespan, after the middleware is created
+        if self._limiter is None:
+            self._limiter = RateLimiter(get_rate_limits())
+
+        clients = [(limit_name, client) for limit_name, client in _get_clients(scope, route_class) if limit_name in self._limiter.limits]
+        if not clients:
+            await self.app(scope, receive, send)
+            return
+
+        # each bucket is taken, so the made up auth tokens are limited by the bucket of the IP address.
+        # the headers are of the most limiting bucket, the rejecting one or the one with the fewest remaining tokens
+        results = [(self._limiter.acquire(limit_name, client), limit_name) for limit_name, client in clients]
+        (allowed, remaining, reset_seconds), limit_name = min(results, key=lambda result: (result[0][0], result[0][1]))
+        headers = {
+            "RateLimit-Limit": str(self._limiter.limits[limit_name].burst),
+            "RateLimit-Remaining": str(max(math.floor(remaining), 0)),
+            "RateLimit-Reset": str(math.ceil(reset_seconds)),
+        }
+
+        if not allowed:
+            http_requests_rate_limited_total.inc((route_class,))
+            response = FastJSONResponse(
+                {"detail": "Too many requests, retry later"},
+                status_code=429,
+                headers={**headers, "Retry-After": str(math.ceil(reset_seconds))},
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                for name, value in headers.items():
+                    response_headers.append(name, value)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
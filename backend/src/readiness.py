@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import psycopg_pool
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.api import FastJSONResponse
+from src.config import config
+from src.logger import get_logger
+from src.metrics import Counter
+from src.models import get_pool_stats, ping_db
+from src.startup import is_warm_up_done
+
+# the probes and the metrics are answered under load, so the load balancer sees the state of the server
+ADMISSION_EXEMPT_PATHS = frozenset(("/ready", "/health-check", "/metrics"))
+
+http_requests_rejected_total = Counter("http_requests_rejected_total", "Requests rejected by the admission control, with 503")
+
+
+class DBPing:
+    """The latest ping of the database, cached for the readiness probes"""
+
+    __slots__ = ("ok", "latency_ms", "error", "checked_at")
+
+    ok: bool
+    latency_ms: float | None
+    error: str | None
+    checked_at: float
+
+    def __init__(self, ok: bool, latency_ms: float | None, error: str | None, checked_at: float):
+        self.ok = ok
+        self.latency_ms = latency_ms
+        self.error = error
+        self.checked_at = checked_at
+
+
+class Readiness:
+    """The readiness of the server for traffic, with the state of the pool"""
+
+    __slots__ = ("ready", "warmed_up", "db_ping", "pool_size", "pool_max_size", "pool_idle", "pool_waiting")
+
+    ready: bool
+    warmed_up: bool
+    db_ping: DBPing | None
+    pool_size: int
+    pool_max_size: int
+    pool_idle: int
+    pool_waiting: int
+
+    def __init__(
+        self,
+        ready: bool,
+        warmed_up: bool,
+        db_ping: DBPing | None,
+        pool_size: int,
+        pool_max_size: int,
+        pool_idle: int,
+        pool_waiting: int,
+    ):
+        self.ready = ready
+        self.warmed_up = warmed_up
+        self.db_ping = db_ping
+        self.pool_size = pool_size
+        self.pool_max_size = pool_max_size
+        self.pool_idle = pool_idle
+        self.pool_waiting = pool_waiting
+
+
+g_db_ping: DBPing | None = None
+g_ping_task: None | asyncio.Task = None
+
+
+def _ping() -> DBPing:
+    try:
+        seconds = ping_db(config.readiness_ping_timeout_seconds)
+    except (psycopg_pool.PoolTimeout, psycopg_pool.PoolClosed) as e:
+        return DBPing(False, None, f"No connection of the pool: {e}", time.time())
+    except Exception as e:
+        return DBPing(False, None, str(e), time.time())
+
+    return DBPing(True, seconds * 1000, None, time.time())
+
+
+async def _ping_periodically() -> None:
+    global g_db_ping
+
+    while True:
+        db_ping = await run_in_threadpool(_ping)
+        if not db_ping.ok and (g_db_ping is None or g_db_ping.ok):
+            get_logger().error(f"Database ping failed: {db_ping.error}")
+
+        g_db_ping = db_ping
+
+        await asyncio.sleep(config.readiness_ping_interval_seconds)
+
+
+def start_readiness_checks() -> None:
+    """Start the periodic ping of the database, its result is cached for the readiness probes"""
+
+    global g_ping_task
+    if g_ping_task is not None:
+        return
+
+    g_ping_task = asyncio.create_task(_ping_periodically())
+
+
+async def stop_readiness_checks() -> None:
+    """Stop the periodic ping of the database"""
+
+    global g_ping_task, g_db_ping
+    if g_ping_task is None:
+        return
+
+    g_ping_task.cancel()
+    await asyncio.gather(g_ping_task, return_exceptions=True)
+    g_ping_task = None
+    g_db_ping = None
+
+
+def _is_overloaded(pool_waiting: int) -> bool:
+    return 0 < config.admission_max_waiting < pool_waiting
+
+
+def get_readiness() -> Readiness:
+    """
+    Return the readiness of the server for traffic: the warm up is done, the latest ping of the database succeeded
+    and the requests waiting for a connection of the pool are within the admission threshold.
+    """
+
+    stats = get_pool_stats() or {}
+    pool_waiting = stats.get("requests_waiting", 0)
+    warmed_up = is_warm_up_done()
+
+    ready = warmed_up and g_db_ping is not None and g_db_ping.ok and not _is_overloaded(pool_waiting)
+
+    return Readiness(
+        ready,
+        warmed_up,
+        g_db_ping,
+        stats.get("pool_size", 0),
+        stats.get("pool_max", 0),
+        stats.get("pool_available", 0),
+        pool_waiting,
+    )
+
+
+class AdmissionMiddleware:
+    """
+    Reject new requests with 503 and Retry-After while the requests waiting for a connection of the pool are over the threshold,
+    so the admitted requests are not delayed by a longer queue.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or config.admission_max_waiting <= 0 or scope["path"] in ADMISSION_EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        stats = get_pool_stats()
+        if stats is not None and _is_overloaded(stats["requests_waiting"]):
+            http_requests_rejected_total.inc()
+            response = FastJSONResponse(
+                {"detail": "The server is overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(config.admission_retry_after_seconds)},
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
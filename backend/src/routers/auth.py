@@ -51,7 +51,7 @@ def route_login(email: str, password: str, db: psycopg.Connection = Depends(db_d
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="email or password is incorrect")
 
     # login
-    auth_token = login_user(user)
+    auth_token = login_user(db, user)
 
     areas_models = get_areas(db)
 
@@ -61,5 +61,5 @@ def route_login(email: str, password: str, db: psycopg.Connection = Depends(db_d
 
 
 @router.post("/logout")
-def route_logout(auth_token: UUID, current_user: User = Depends(get_current_user)) -> None:
-    logout_user(auth_token, current_user)
+def route_logout(auth_token: UUID, db: psycopg.Connection = Depends(db_dependency), current_user: User = Depends(get_current_user)) -> None:
+    logout_user(db, auth_token, current_user)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from src.autocomplete import autocomplete_index
+from src.schemas import SuggestionSchema
+from src.security import get_current_user_id
+
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+router = APIRouter(dependencies=[Depends(get_current_user_id)])
+
+
+@router.post("/get")
+async def route_get(prefix: str, limit: int = 10) -> list[SuggestionSchema]:
+    if limit < 1 or limit > AUTOCOMPLETE_MAX_LIMIT:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Limit must be between 1 and {AUTOCOMPLETE_MAX_LIMIT}")
+
+    suggestions = autocomplete_index.search(prefix, limit)
+
+    return [SuggestionSchema.from_model(suggestion) for suggestion in suggestions]
@@ -0,0 +1,118 @@
+from typing import Any, Callable
+from uuid import UUID
+
+import psycopg
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+from src.exceptions import DBTimeoutException
+from src.models import db_dependency, read_only_snapshot
+from src.models.users import User
+from src.routers import my_groups, my_meets, notifications, profile
+from src.schemas import BatchRequestSchema, BatchResponseSchema, BatchSchema
+from src.security import get_current_user
+
+BATCH_MAX_REQUESTS = 10
+
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+
+class _NoParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+class _PastMeetsParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    after_date: str | None = None
+    after_meet_id: UUID | None = None
+    limit: int = 20
+
+
+class _NotificationsParams(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    since: int | None = None
+
+
+# read routes that can be sent in a batch: path -> (params, call of the route)
+BATCH_ROUTES: dict[str, tuple[type[BaseModel], Callable[[psycopg.Connection, User, Any], BaseModel]]] = {
+    "/my-groups/get": (_NoParams, lambda db, user, params: my_groups.route_get(db=db, current_user=user)),
+    "/my-meets/get": (_NoParams, lambda db, user, params: my_meets.route_get(db=db, current_user=user)),
+    "/my-meets/get-past": (
+        _PastMeetsParams,
+        lambda db, user, params: my_meets.route_get_past(
+            after_date=params.after_date, after_meet_id=params.after_meet_id, limit=params.limit, db=db, current_user=user
+        ),
+    ),
+    "/notifications/get": (
+        _NotificationsParams,
+        lambda db, user, params: notifications.route_get(since=params.since, db=db, current_user=user),
+    ),
+    "/notifications/get-unread-count": (
+        _NoParams,
+        lambda db, user, params: notifications.route_get_unread_count(db=db, current_user=user),
+    ),
+    "/profile/get": (_NoParams, lambda db, user, params: profile.route_get(current_user=user)),
+    "/profile/get-certificates": (_NoParams, lambda db, user, params: profile.route_get_certificates(db=db, current_user=user)),
+}
+
+
+@router.post("")
+def route_batch(
+    requests: list[BatchRequestSchema], db: psycopg.Connection = Depends(db_dependency), current_user: User = Depends(get_current_user)
+) -> BatchSchema:
+    # validation
+    if len(requests) < 1 or len(requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Batch must have between 1 and {BATCH_MAX_REQUESTS} requests")
+
+    for request in requests:
+        if request.path not in BATCH_ROUTES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Path {request.path} can't be sent in a batch")
+
+    responses: list[BatchResponseSchema] = []
+    timed_out = False
+
+    # the sub requests share the authentication and the connection, and see the same snapshot of the database
+    with read_only_snapshot(db) as snapshot_db:
+        for request in requests:
+            params_schema, route = BATCH_ROUTES[request.path]
+
+            # the canceled query aborted the snapshot transaction (or the deadline passed), the next sub requests can't run
+            if timed_out:
+                responses.append(
+                    BatchResponseSchema(
+                        path=request.path, status_code=status.HTTP_504_GATEWAY_TIMEOUT, body={"detail": "The request timed out"}
+                    )
+                )
+                continue
+
+            try:
+                params = params_schema.model_validate(request.params)
+            except ValidationError as e:
+                responses.append(
+                    BatchResponseSchema(
+                        path=request.path,
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        body={"detail": e.errors(include_url=False, include_context=False)},
+                    )
+                )
+                continue
+
+            try:
+                body = route(snapshot_db, current_user, params)
+            except HTTPException as e:
+                responses.append(BatchResponseSchema(path=request.path, status_code=e.status_code, body={"detail": e.detail}))
+                continue
+            except DBTimeoutException:
+                timed_out = True
+                responses.append(
+                    BatchResponseSchema(
+                        path=request.path, status_code=status.HTTP_504_GATEWAY_TIMEOUT, body={"detail": "The request timed out"}
+                    )
+                )
+                continue
+
+            responses.append(BatchResponseSchema(path=request.path, status_code=status.HTTP_200_OK, body=body))
+
+    return BatchSchema(responses=responses)
@@ -3,6 +3,7 @@ from uuid import UUID
 import psycopg
 from fastapi import APIRouter, Depends, HTTPException, status
 
+from src.autocomplete import publish_group_added
 from src.models import db_dependency
 from src.models.groups import area_exists, create_group
 from src.models.users import User
@@ -28,4 +29,6 @@ def route_create_group(
 
     group = create_group(db, user.user_id, name, description, area_id)
 
+    publish_group_added(db, group, user.name)
+
     return GroupSchema.from_model(group, user.name)
@@ -4,7 +4,7 @@ import psycopg
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from src.models import db_dependency
-from src.models.groups import create_meet, get_group_by_id, get_group_members
+from src.models.groups import create_meet, get_group_by_id, get_group_member_ids
 from src.models.notifications import create_notification
 from src.models.users import User
 from src.schemas import MeetSchema
@@ -40,8 +40,8 @@ def route_create_meet(
     meet = create_meet(db, group_id, max_members, meet_date, duration, city, street)
 
     # Send notifications
-    group_members = get_group_members(db, group_id)
-    for member in group_members:
-        create_notification(db, member.user_id, f"New Meet in {group.name} has been created by {user.name}!")
+    member_ids = get_group_member_ids(db, group_id)
+    for member_id in member_ids:
+        create_notification(db, member_id, f"New Meet in {group.name} has been created by {user.name}!")
 
     return MeetSchema.from_model(meet, group.name, [])
@@ -6,6 +6,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from src.models import db_dependency
 from src.models.debug import debug_set_is_coach
 from src.models.users import get_user_by_email
+from src.schemas import SlowQueryPlanSchema
+from src.security import verify_debug_token
+from src.slow_queries import get_slow_query_plans
 from src.validators import validate_email
 
 router = APIRouter()
@@ -37,3 +40,8 @@ async def route_debug_make_coach(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email not found")
 
     debug_set_is_coach(db, email, True)
+
+
+@router.get("/slow-queries", dependencies=[Depends(verify_debug_token)])
+async def route_debug_slow_queries() -> list[SlowQueryPlanSchema]:
+    return [SlowQueryPlanSchema.from_model(slow_query_plan) for slow_query_plan in get_slow_query_plans()]
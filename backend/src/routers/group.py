@@ -3,6 +3,7 @@ from uuid import UUID
 import psycopg
 from fastapi import APIRouter, Depends, HTTPException, status
 
+from src.autocomplete import publish_group_removed
 from src.models import db_dependency
 from src.models.groups import (
     add_member_to_group,
@@ -13,10 +14,10 @@ from src.models.groups import (
     delete_meet,
     get_group_by_id,
     get_group_meets,
-    get_group_meets_info,
+    get_group_member_ids,
     get_group_members,
+    get_group_view,
     get_meet,
-    get_meet_members_count,
     remove_member_from_group,
     remove_member_from_meet,
 )
@@ -32,23 +33,19 @@ router = APIRouter(dependencies=[Depends(get_current_user)])
 def route_get(
     group_id: UUID, db: psycopg.Connection = Depends(db_dependency), current_user: User = Depends(get_current_user)
 ) -> GroupViewInfoSchema:
-    group_data = get_group_by_id(db, group_id)
+    group_view = get_group_view(db, group_id, current_user.user_id)
 
-    if not group_data:
+    if not group_view:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
 
-    group, coach_name = group_data
-
-    meets_data = get_group_meets_info(db, group_id, current_user.user_id)
+    group, coach_name, meets_data, registered = group_view
 
     meets: list[MeetInfoSchema] = []
 
     for meet_data in meets_data:
-        meet, members_count, registered = meet_data
-
-        meets.append(MeetInfoSchema.from_model(meet, group.name, members_count, registered))
+        meet, meet_full, meet_registered = meet_data
 
-    registered = check_member_in_group(db, group_id, current_user.user_id)
+        meets.append(MeetInfoSchema.from_model(meet, group.name, meet_full, meet_registered))
 
     return GroupViewInfoSchema(group=GroupSchema.from_model(group, coach_name), meets=meets, registered=registered)
 
@@ -143,13 +140,9 @@ def route_register_to_meet(
     if check_member_in_meet(db, meet_id, current_user.user_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="You are already registered to this meet")
 
-    meet_full = get_meet_members_count(db, meet_id) >= meet.max_members
-
-    if meet_full:
+    if not add_member_to_meet(db, meet_id, current_user.user_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The meeting is full")
 
-    add_member_to_meet(db, meet_id, current_user.user_id)
-
     return None
 
 
@@ -222,19 +215,21 @@ def route_delete_group(
     if not group_data:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
 
-    group, _ = group_data
+    group, coach_name = group_data
 
     if group.coach_id != current_user.user_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="You are not the coach of this group")
 
     meets = get_group_meets(db, group_id)
-    members = get_group_members(db, group_id)
+    member_ids = get_group_member_ids(db, group_id)
 
     for meet in meets:
         delete_meet(db, meet.meet_id)
 
     delete_group(db, group_id)
 
+    publish_group_removed(db, group, coach_name)
+
     # send notification to the members
-    for member in members:
-        create_notification(db, member.user_id, f"The group {group.name} has been deleted by {current_user.name}")
+    for member_id in member_ids:
+        create_notification(db, member_id, f"The group {group.name} has been deleted by {current_user.name}")
@@ -4,7 +4,15 @@ import psycopg
 from fastapi import APIRouter, Depends, HTTPException, status
 
 from src.models import db_dependency
-from src.models.groups import delete_meet, get_group_by_id, get_meet, get_meet_members, remove_member_from_meet, update_meet
+from src.models.groups import (
+    delete_meet,
+    get_group_by_id,
+    get_meet,
+    get_meet_member_ids,
+    get_meet_members,
+    remove_member_from_meet,
+    update_meet,
+)
 from src.models.notifications import create_notification
 from src.models.users import User
 from src.schemas import MeetSchema
@@ -96,13 +104,14 @@ def route_update_details(
         street = new_street
         send_notification = True
 
-    update_meet(db, meet_id, max_members, meet_date, duration, city, street)
+    if not update_meet(db, meet_id, max_members, meet_date, duration, city, street):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Max members can't be less than the members of the meet")
 
     # send notification to the members
     if send_notification:
-        members = get_meet_members(db, meet_id)
-        for member in members:
-            create_notification(db, member.user_id, f"Meet details have been updated by {current_user.name}")
+        member_ids = get_meet_member_ids(db, meet_id)
+        for member_id in member_ids:
+            create_notification(db, member_id, f"Meet details have been updated by {current_user.name}")
 
     return None
 
@@ -172,10 +181,10 @@ def route_delete_meet(
 
     group = group_data[0]
 
-    members = get_meet_members(db, meet_id)
+    member_ids = get_meet_member_ids(db, meet_id)
 
     delete_meet(db, meet_id)
 
     # send notification to the members
-    for member in members:
-        create_notification(db, member.user_id, f"Meet in {group.name} has been deleted by {current_user.name}")
+    for member_id in member_ids:
+        create_notification(db, member_id, f"Meet in {group.name} has been deleted by {current_user.name}")
@@ -3,12 +3,22 @@ from uuid import UUID
 import psycopg
 from fastapi import APIRouter, Depends, HTTPException, status
 
+from src.api import API_DATE_FORMAT, normalize_api_date
 from src.models import db_dependency
-from src.models.groups import check_member_in_meet, get_group_by_id, get_meet, get_meet_members_count, get_trainer_meets
+from src.models.groups import (
+    check_member_in_meet,
+    get_group_by_id,
+    get_meet,
+    get_meet_members_count,
+    get_trainer_meets,
+    get_trainer_past_meets,
+)
 from src.models.users import User
-from src.schemas import GroupSchema, MeetInfoSchema, MeetViewInfoSchema, MyMeetsSchema
+from src.schemas import GroupSchema, MeetInfoSchema, MeetsPageSchema, MeetViewInfoSchema, MyMeetsSchema
 from src.security import get_current_user
 
+PAST_MEETS_MAX_LIMIT = 100
+
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
 
@@ -53,3 +63,43 @@ def route_get_meeting(
         group=GroupSchema.from_model(group, coach_name),
         meet=MeetInfoSchema.from_model(meet, group.name, meet_full, registered),
     )
+
+
+@router.post("/get-past")
+def route_get_past(
+    after_date: str | None = None,
+    after_meet_id: UUID | None = None,
+    limit: int = 20,
+    db: psycopg.Connection = Depends(db_dependency),
+    current_user: User = Depends(get_current_user),
+) -> MeetsPageSchema:
+    # validation
+    if limit < 1 or limit > PAST_MEETS_MAX_LIMIT:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Limit must be between 1 and {PAST_MEETS_MAX_LIMIT}")
+
+    if (after_date is None) != (after_meet_id is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="after_date and after_meet_id must be sent together")
+
+    after = None
+    if after_date is not None and after_meet_id is not None:
+        after = (normalize_api_date(after_date, "after_date"), after_meet_id)
+
+    # fetch one more meet, to know if there is a next page
+    meets_data = get_trainer_past_meets(db, current_user.user_id, after, limit + 1)
+
+    meets: list[MeetInfoSchema] = []
+
+    for meet_data in meets_data[:limit]:
+        meet, group_name, full = meet_data
+
+        meets.append(MeetInfoSchema.from_model(meet, group_name, full, True))
+
+    next_after_date = None
+    next_after_meet_id = None
+
+    if len(meets_data) > limit:
+        last_meet = meets_data[limit - 1][0]
+        next_after_date = last_meet.meet_date.strftime(API_DATE_FORMAT)
+        next_after_meet_id = str(last_meet.meet_id)
+
+    return MeetsPageSchema(meets=meets, next_after_date=next_after_date, next_after_meet_id=next_after_meet_id)
@@ -4,19 +4,37 @@ import psycopg
 from fastapi import APIRouter, Depends
 
 from src.models import db_dependency
-from src.models.notifications import delete_user_notification, get_user_notifications
+from src.models.notifications import (
+    delete_user_notification,
+    get_notifications_cursor,
+    get_user_notifications,
+    get_user_notifications_since,
+    get_user_unread_count,
+    mark_user_notification_read,
+    mark_user_notifications_read,
+)
 from src.models.users import User
-from src.schemas import NotificationsSchema
+from src.schemas import NotificationsSchema, UnreadCountSchema
 from src.security import get_current_user
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
 
 @router.post("/get")
-def route_get(db: psycopg.Connection = Depends(db_dependency), current_user: User = Depends(get_current_user)) -> NotificationsSchema:
-    notifications = get_user_notifications(db, current_user.user_id)
+def route_get(
+    since: int | None = None, db: psycopg.Connection = Depends(db_dependency), current_user: User = Depends(get_current_user)
+) -> NotificationsSchema:
+    # before the notifications, so the changes committed while they are read are in the next fetch
+    cursor = get_notifications_cursor(db)
 
-    return NotificationsSchema.from_model(notifications)
+    if since is None:
+        notifications = get_user_notifications(db, current_user.user_id)
+
+        return NotificationsSchema.from_model(notifications, [], cursor)
+
+    notifications, deletions = get_user_notifications_since(db, current_user.user_id, since)
+
+    return NotificationsSchema.from_model(notifications, deletions, cursor)
 
 
 @router.post("/delete")
@@ -24,3 +42,22 @@ def route_delete(
     notification_id: UUID, db: psycopg.Connection = Depends(db_dependency), current_user: User = Depends(get_current_user)
 ) -> None:
     delete_user_notification(db, notification_id, current_user.user_id)
+
+
+@router.post("/get-unread-count")
+def route_get_unread_count(
+    db: psycopg.Connection = Depends(db_dependency), current_user: User = Depends(get_current_user)
+) -> UnreadCountSchema:
+    return UnreadCountSchema(unread_count=get_user_unread_count(db, current_user.user_id))
+
+
+@router.post("/mark-read")
+def route_mark_read(
+    notification_id: UUID, db: psycopg.Connection = Depends(db_dependency), current_user: User = Depends(get_current_user)
+) -> None:
+    mark_user_notification_read(db, notification_id, current_user.user_id)
+
+
+@router.post("/mark-all-read")
+def route_mark_all_read(db: psycopg.Connection = Depends(db_dependency), current_user: User = Depends(get_current_user)) -> None:
+    mark_user_notifications_read(db, current_user.user_id)
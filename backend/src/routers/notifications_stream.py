@@ -0,0 +1,29 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from src.notifications_stream import stream_notifications
+from src.security import get_current_user_id
+
+router = APIRouter(dependencies=[Depends(get_current_user_id)])
+
+
+@router.get("/stream")
+async def route_stream(
+    since: int | None = None,
+    last_event_id: str | None = Header(default=None),
+    user_id: UUID = Depends(get_current_user_id),
+) -> StreamingResponse:
+    # EventSource sends the id of the last event when it reconnects
+    if since is None and last_event_id is not None:
+        if not last_event_id.isdigit():
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid Last-Event-ID")
+
+        since = int(last_event_id)
+
+    return StreamingResponse(
+        stream_notifications(user_id, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
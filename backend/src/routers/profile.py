@@ -5,8 +5,10 @@ from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile, sta
 from fastapi.responses import FileResponse
 
 from src.api import get_api_media_type
+from src.autocomplete import publish_coach_renamed
 from src.config import config
 from src.models import db_dependency
+from src.models.groups import refresh_coach_groups_search_vector
 from src.models.users import (
     Gender,
     User,
@@ -178,6 +180,10 @@ def route_update_details(
 
     update_user(db, current_user.user_id, updated_name, updated_email, updated_phone, updated_gender, updated_description)
 
+    if current_user.is_coach and updated_name != current_user.name:
+        refresh_coach_groups_search_vector(db, current_user.user_id)
+        publish_coach_renamed(db, current_user.user_id, current_user.name, updated_name)
+
     user = get_user_by_id(db, current_user.user_id)
 
     if user is None:
@@ -1,14 +1,20 @@
 from uuid import UUID
 
 import psycopg
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
 
+from src.deadlines import request_deadline
 from src.models import db_dependency
-from src.models.groups import get_groups_by_area_id
+from src.models.groups import get_groups_by_area_id, search_groups
 from src.schemas import GroupSchema
 from src.security import get_current_user
 
-router = APIRouter(dependencies=[Depends(get_current_user)])
+SEARCH_MAX_LIMIT = 100
+
+# the searches are interactive, a late answer is not useful (the deadline is first, so it caps the wait for the pool too)
+SEARCH_DEADLINE_MS = 3000
+
+router = APIRouter(dependencies=[Depends(request_deadline(SEARCH_DEADLINE_MS)), Depends(get_current_user)])
 
 
 @router.post("/get-groups-by-area")
@@ -16,3 +22,15 @@ def route_get_groups_by_area(area_id: UUID, db: psycopg.Connection = Depends(db_
     groups_data = get_groups_by_area_id(db, area_id)
 
     return [GroupSchema.from_model(group[0], group[1]) for group in groups_data]
+
+
+@router.post("/search")
+def route_search(
+    text: str, area_id: UUID | None = None, limit: int = 20, db: psycopg.Connection = Depends(db_dependency)
+) -> list[GroupSchema]:
+    if limit < 1 or limit > SEARCH_MAX_LIMIT:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Limit must be between 1 and {SEARCH_MAX_LIMIT}")
+
+    groups_data = search_groups(db, text, area_id, limit)
+
+    return [GroupSchema.from_model(group[0], group[1]) for group in groups_data]
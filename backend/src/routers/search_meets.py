@@ -0,0 +1,71 @@
+from datetime import datetime
+from uuid import UUID
+
+import psycopg
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from src.api import API_DATE_FORMAT, normalize_api_date
+from src.deadlines import request_deadline
+from src.models import db_dependency
+from src.models.groups import get_upcoming_meets
+from src.models.users import User
+from src.schemas import MeetInfoSchema, MeetsPageSchema
+from src.security import get_current_user
+
+SEARCH_MAX_LIMIT = 100
+
+# the searches are interactive, a late answer is not useful (the deadline is first, so it caps the wait for the pool too)
+SEARCH_DEADLINE_MS = 3000
+
+router = APIRouter(dependencies=[Depends(request_deadline(SEARCH_DEADLINE_MS)), Depends(get_current_user)])
+
+
+@router.post("/get-upcoming")
+def route_get_upcoming(
+    area_id: UUID | None = None,
+    city: str | None = None,
+    from_date: str | None = None,
+    to_date: str | None = None,
+    only_free: bool = False,
+    after_date: str | None = None,
+    after_meet_id: UUID | None = None,
+    limit: int = 20,
+    db: psycopg.Connection = Depends(db_dependency),
+    current_user: User = Depends(get_current_user),
+) -> MeetsPageSchema:
+    # validation
+    if limit < 1 or limit > SEARCH_MAX_LIMIT:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Limit must be between 1 and {SEARCH_MAX_LIMIT}")
+
+    if (after_date is None) != (after_meet_id is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="after_date and after_meet_id must be sent together")
+
+    now = datetime.now().strftime(API_DATE_FORMAT)
+    from_date = now if from_date is None else max(now, normalize_api_date(from_date, "from_date"))
+
+    if to_date is not None:
+        to_date = normalize_api_date(to_date, "to_date")
+
+    after = None
+    if after_date is not None and after_meet_id is not None:
+        after = (normalize_api_date(after_date, "after_date"), after_meet_id)
+
+    # fetch one more meet, to know if there is a next page
+    meets_data = get_upcoming_meets(db, current_user.user_id, from_date, to_date, area_id, city, only_free, after, limit + 1)
+
+    meets: list[MeetInfoSchema] = []
+
+    for meet_data in meets_data[:limit]:
+        meet, group_name, full, registered = meet_data
+
+        meets.append(MeetInfoSchema.from_model(meet, group_name, full, registered))
+
+    next_after_date = None
+    next_after_meet_id = None
+
+    if len(meets_data) > limit:
+        last_meet = meets_data[limit - 1][0]
+        next_after_date = last_meet.meet_date.strftime(API_DATE_FORMAT)
+        next_after_meet_id = str(last_meet.meet_id)
+
+    return MeetsPageSchema(meets=meets, next_after_date=next_after_date, next_after_meet_id=next_after_meet_id)
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
 from datetime import timedelta
+from typing import Any
 from uuid import UUID
 
 from pydantic import BaseModel
 
+from src.autocomplete import Suggestion, SuggestionKind
 from src.models.groups import Area, Group, Meet
 from src.models.notifications import Notification
-from src.models.users import FileModel, Gender, User
+from src.models.users import FileModel, Gender, User, UserCard
+from src.readiness import Readiness
+from src.slow_queries import SlowQueryPlan
+
+# the from_model methods build the schemas with model_construct, without validation, the models are already valid (from the database)
 
 
 class UserBaseSchema(BaseModel):
@@ -20,8 +26,8 @@ class UserBaseSchema(BaseModel):
     description: str
 
     @staticmethod
-    def from_model(user: User) -> UserBaseSchema:
-        return UserBaseSchema(
+    def from_model(user: User | UserCard) -> UserBaseSchema:
+        return UserBaseSchema.model_construct(
             user_id=str(user.user_id),
             name=user.name,
             email=user.email,
@@ -46,7 +52,7 @@ class UserSchema(BaseModel):
 
     @staticmethod
     def from_model(user: User) -> UserSchema:
-        return UserSchema(
+        return UserSchema.model_construct(
             user_id=str(user.user_id),
             name=user.name,
             email=user.email,
@@ -64,7 +70,7 @@ class FileSchema(BaseModel):
 
     @staticmethod
     def from_model(file: FileModel) -> FileSchema:
-        return FileSchema(
+        return FileSchema.model_construct(
             file_id=str(file.file_id),
             name=file.name,
         )
@@ -75,7 +81,7 @@ class CertificatesSchema(BaseModel):
 
     @staticmethod
     def from_model(certificates: list[FileModel]) -> CertificatesSchema:
-        return CertificatesSchema(
+        return CertificatesSchema.model_construct(
             certificates=[FileSchema.from_model(certificate) for certificate in certificates],
         )
 
@@ -86,7 +92,7 @@ class AreaSchema(BaseModel):
 
     @staticmethod
     def from_model(area: Area) -> AreaSchema:
-        return AreaSchema(
+        return AreaSchema.model_construct(
             area_id=str(area.area_id),
             name=area.name,
         )
@@ -108,7 +114,7 @@ class GroupSchema(BaseModel):
 
     @staticmethod
     def from_model(group: Group, coach_name: str) -> GroupSchema:
-        return GroupSchema(
+        return GroupSchema.model_construct(
             group_id=str(group.group_id),
             coach_id=str(group.coach_id),
             coach_name=coach_name,
@@ -126,7 +132,7 @@ class GroupInfoSchema(BaseModel):
 
     @staticmethod
     def from_model(row: tuple[UUID, str, str, str]) -> GroupInfoSchema:
-        return GroupInfoSchema(
+        return GroupInfoSchema.model_construct(
             group_id=str(row[0]),
             coach_name=row[1],
             name=row[2],
@@ -149,10 +155,10 @@ class MeetSchema(BaseModel):
     members: list[UserBaseSchema]
 
     @staticmethod
-    def from_model(meet: Meet, group_name: str, members: list[User]) -> MeetSchema:
+    def from_model(meet: Meet, group_name: str, members: list[UserCard]) -> MeetSchema:
         end_time = meet.meet_date + timedelta(minutes=meet.duration)
 
-        return MeetSchema(
+        return MeetSchema.model_construct(
             meet_id=str(meet.meet_id),
             group_id=str(meet.group_id),
             group_name=group_name,
@@ -184,7 +190,7 @@ class MeetInfoSchema(BaseModel):
     def from_model(meet: Meet, group_name: str, full: bool, registered: bool) -> MeetInfoSchema:
         end_time = meet.meet_date + timedelta(minutes=meet.duration)
 
-        return MeetInfoSchema(
+        return MeetInfoSchema.model_construct(
             meet_id=str(meet.meet_id),
             group_id=str(meet.group_id),
             group_name=group_name,
@@ -211,8 +217,8 @@ class GroupFullSchema(BaseModel):
     members: list[UserBaseSchema]
 
     @staticmethod
-    def from_model(group: Group, coach_name: str, meets: list[Meet], members: list[User]) -> GroupFullSchema:
-        return GroupFullSchema(
+    def from_model(group: Group, coach_name: str, meets: list[Meet], members: list[UserCard]) -> GroupFullSchema:
+        return GroupFullSchema.model_construct(
             group=GroupSchema.from_model(group, coach_name),
             meets=[MeetSchema.from_model(meet, group.name, []) for meet in meets],
             members=[UserBaseSchema.from_model(member) for member in members],
@@ -233,13 +239,19 @@ class MyMeetsSchema(BaseModel):
     meets: list[MeetInfoSchema]
 
 
+class MeetsPageSchema(BaseModel):
+    meets: list[MeetInfoSchema]
+    next_after_date: str | None
+    next_after_meet_id: str | None
+
+
 class ViewCoachSchema(BaseModel):
     coach: UserBaseSchema
     certificates: list[FileSchema]
 
     @staticmethod
     def from_model(coach: User, certificates: list[FileModel]) -> ViewCoachSchema:
-        return ViewCoachSchema(
+        return ViewCoachSchema.model_construct(
             coach=UserBaseSchema.from_model(coach),
             certificates=[FileSchema.from_model(certificate) for certificate in certificates],
         )
@@ -249,21 +261,117 @@ class NotificationSchema(BaseModel):
     notification_id: str
     message: str
     date: str
+    is_read: bool
 
     @staticmethod
     def from_model(notification: Notification) -> NotificationSchema:
-        return NotificationSchema(
+        return NotificationSchema.model_construct(
             notification_id=str(notification.notification_id),
             message=notification.message,
             date=notification.date.strftime("%Y-%m-%d %H:%M:%S"),
+            is_read=notification.is_read,
         )
 
 
 class NotificationsSchema(BaseModel):
     notifications: list[NotificationSchema]
+    deleted_ids: list[str]
+    cursor: int
 
     @staticmethod
-    def from_model(notifications: list[Notification]) -> NotificationsSchema:
-        return NotificationsSchema(
+    def from_model(notifications: list[Notification], deletions: list[tuple[UUID, int]], cursor: int) -> NotificationsSchema:
+        return NotificationsSchema.model_construct(
             notifications=[NotificationSchema.from_model(notification) for notification in notifications],
+            deleted_ids=[str(notification_id) for notification_id, _ in deletions],
+            cursor=cursor,
+        )
+
+
+class SuggestionSchema(BaseModel):
+    text: str
+    kind: SuggestionKind
+    item_id: str
+
+    @staticmethod
+    def from_model(suggestion: Suggestion) -> SuggestionSchema:
+        return SuggestionSchema.model_construct(
+            text=suggestion.text,
+            kind=suggestion.kind,
+            item_id=str(suggestion.item_id),
+        )
+
+
+class UnreadCountSchema(BaseModel):
+    unread_count: int
+
+
+class BatchRequestSchema(BaseModel):
+    path: str
+    params: dict[str, Any] = {}
+
+
+class BatchResponseSchema(BaseModel):
+    path: str
+    status_code: int
+    body: Any
+
+
+class BatchSchema(BaseModel):
+    responses: list[BatchResponseSchema]
+
+
+class SlowQueryStatementSchema(BaseModel):
+    statement: str
+    plan: str
+
+
+class SlowQueryPlanSchema(BaseModel):
+    query: str
+    duration_ms: float
+    date: str
+    params: dict[str, str]
+    statements: list[SlowQueryStatementSchema]
+
+    @staticmethod
+    def from_model(slow_query_plan: SlowQueryPlan) -> SlowQueryPlanSchema:
+        return SlowQueryPlanSchema.model_construct(
+            query=slow_query_plan.query,
+            duration_ms=round(slow_query_plan.duration_ms, 3),
+            date=slow_query_plan.date.strftime("%Y-%m-%d %H:%M:%S"),
+            params=slow_query_plan.params,
+            statements=[
+                SlowQueryStatementSchema.model_construct(statement=statement, plan=plan)
+                for statement, plan in zip(slow_query_plan.statements, slow_query_plan.plans)
+            ],
+        )
+
+
+class ReadinessSchema(BaseModel):
+    ready: bool
+    warmed_up: bool
+    db_ok: bool
+    db_ping_ms: float | None
+    db_error: str | None
+    pool_size: int
+    pool_max_size: int
+    pool_idle: int
+    pool_waiting: int
+    pool_saturation: float
+
+    @staticmethod
+    def from_model(readiness: Readiness) -> ReadinessSchema:
+        db_ping = readiness.db_ping
+        in_use = readiness.pool_size - readiness.pool_idle
+
+        return ReadinessSchema.model_construct(
+            ready=readiness.ready,
+            warmed_up=readiness.warmed_up,
+            db_ok=db_ping is not None and db_ping.ok,
+            db_ping_ms=None if db_ping is None or db_ping.latency_ms is None else round(db_ping.latency_ms, 3),
+            db_error=None if db_ping is None else db_ping.error,
+            pool_size=readiness.pool_size,
+            pool_max_size=readiness.pool_max_size,
+            pool_idle=readiness.pool_idle,
+            pool_waiting=readiness.pool_waiting,
+            pool_saturation=round(in_use / readiness.pool_max_size, 3) if readiness.pool_max_size else 0.0,
         )
@@ -1,11 +1,17 @@
 import hashlib
-from uuid import UUID, uuid4
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from uuid import UUID
 
 import psycopg
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 
-from src.models import db_dependency
-from src.models.users import User, get_user_by_id
+from src.config import config
+from src.models import db_dependency, get_db
+from src.models.users import User, create_auth_token, delete_auth_token, get_auth_token_user_id, get_user_by_auth_token
+from src.tracing import start_span
 
 
 # hash handling
@@ -24,43 +30,112 @@ def verify_hash(text: str, hashed_text: str) -> bool:
     return input_password_hashed == hashed_text
 
 
-# authentication
-auth_logged_users: dict[UUID, UUID] = {}
+# auth tokens in the cache of each worker, the least recently used are evicted
+AUTH_TOKENS_CACHE_MAX_SIZE = 10000
 
 
-def login_user(user: User) -> UUID:
-    token = uuid4()
+class AuthTokensCache:
+    """
+    Cache of the user ids of the auth tokens, for AUTH_TOKEN_CACHE_SECONDS, so frequent requests (autocomplete) do not query the database.
+    The deleted tokens are removed from the caches of all the workers by the listener of AUTH_TOKENS_CHANNEL.
+    """
 
-    while token in auth_logged_users:
-        token = uuid4()
+    def __init__(self, max_size: int = AUTH_TOKENS_CACHE_MAX_SIZE) -> None:
+        self._max_size = max_size
+        self._entries: OrderedDict[UUID, tuple[UUID, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        # changed by each removal, so a lookup that started before a logout is not cached after it
+        self.generation = 0
 
-    auth_logged_users[token] = user.user_id
+    def get(self, auth_token: UUID) -> UUID | None:
+        with self._lock:
+            entry = self._entries.get(auth_token)
+            if entry is None:
+                return None
 
-    return token
+            user_id, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[auth_token]
+                return None
 
+            self._entries.move_to_end(auth_token)
+            return user_id
 
-def logout_user(auth_token: UUID, user: User) -> None:
-    saved_user_id = auth_logged_users.get(auth_token)
-    if saved_user_id is None:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
+    def set(self, auth_token: UUID, user_id: UUID, seconds: float, generation: int) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return
+
+            self._entries[auth_token] = (user_id, time.monotonic() + seconds)
+            self._entries.move_to_end(auth_token)
+
+            if len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def remove(self, auth_token: UUID) -> None:
+        with self._lock:
+            self._entries.pop(auth_token, None)
+            self.generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+
+auth_tokens_cache = AuthTokensCache()
+
+
+# authentication
+# the auth tokens are saved in the database, so every worker process of the server accepts them
+def login_user(db: psycopg.Connection, user: User) -> UUID:
+    return create_auth_token(db, user.user_id)
+
+
+def logout_user(db: psycopg.Connection, auth_token: UUID, user: User) -> None:
+    # the other workers remove it by the notification of the delete
+    auth_tokens_cache.remove(auth_token)
 
-    if not saved_user_id == user.user_id:
+    if not delete_auth_token(db, auth_token, user.user_id):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
 
-    auth_logged_users.pop(auth_token)
 
+def get_current_user_id(auth_token: UUID) -> UUID:
+    """FastAPI dependency to get the current logged user id (from the auth token), without loading the user from the database"""
 
-def get_current_user(auth_token: UUID, db: psycopg.Connection = Depends(db_dependency)) -> User:
-    """FastAPI dependency to get the current logged user (from the auth token)"""
+    user_id = auth_tokens_cache.get(auth_token)
+    if user_id is not None:
+        return user_id
+
+    generation = auth_tokens_cache.generation
+
+    # not db_dependency, so long responses (streams) do not hold the connection
+    with start_span("get_current_user_id"), get_db() as db:
+        user_id = get_auth_token_user_id(db, auth_token)
 
-    user_id = auth_logged_users.get(auth_token)
     if user_id is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
 
-    user = get_user_by_id(db, user_id)
+    if config.auth_token_cache_seconds > 0:
+        auth_tokens_cache.set(auth_token, user_id, config.auth_token_cache_seconds, generation)
+
+    return user_id
+
+
+def get_current_user(auth_token: UUID, db: psycopg.Connection = Depends(db_dependency)) -> User:
+    """FastAPI dependency to get the current logged user (from the auth token)"""
+
+    with start_span("get_current_user"):
+        user = get_user_by_auth_token(db, auth_token)
 
     if user is None:
-        auth_logged_users.pop(auth_token)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
 
     return user
+
+
+def verify_debug_token(x_debug_token: str = Header(default="")) -> None:
+    """FastAPI dependency of the protected debug routes, the X-Debug-Token header must be the DEBUG_TOKEN"""
+
+    if not config.debug_token or not hmac.compare_digest(x_debug_token.encode(), config.debug_token.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid debug token")
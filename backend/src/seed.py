@@ -0,0 +1,338 @@
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable
+from uuid import UUID, uuid4
+
+import psycopg
+
+from src.config import config, init_config
+from src.exceptions import CriticalException
+from src.models import get_conninfo, get_db, init_db
+from src.models.groups import get_areas
+from src.models.notifications import ensure_notifications_partitions
+from src.security import create_hash
+
+# all the seeded users log in with the password, as coach<i>@<domain> and trainer<i>@<domain>
+SEED_PASSWORD = "password"
+SEED_EMAIL_DOMAIN = "seed.solutrain.com"
+
+USERS_CHUNK_SIZE = 10000
+GROUPS_CHUNK_SIZE = 100
+
+# the group of rank r has members in proportion to 1 / r ** GROUP_SIZE_SKEW, a few huge groups and many small ones
+GROUP_SIZE_SKEW = 1.1
+
+MEETS_DAYS_BEFORE = 14
+MEETS_DAYS_AFTER = 60
+MEET_MAX_MEMBERS_RANGE = (5, 40)
+NOTIFICATIONS_DAYS = 60
+NOTIFICATIONS_READ_PERCENT = 70
+
+# kinds of the seeded ids, so every worker derives the id of a row from its index
+ID_KIND_USER = 1
+ID_KIND_GROUP = 2
+ID_KIND_MEET = 3
+
+FIRST_NAMES = ["Noa", "Ori", "Tamar", "Dor", "Maya", "Itay", "Shira", "Omer", "Yael", "Stav", "Lior", "Roni", "Adi", "Eden", "Gal"]
+LAST_NAMES = ["Cohen", "Levi", "Mizrahi", "Peretz", "Biton", "Friedman", "Azulay", "Katz", "Shapira", "Dahan", "Sharon", "Ben David"]
+GROUP_KINDS = ["Running", "Yoga", "Pilates", "Cycling", "Swimming", "Crossfit", "Boxing", "Hiking", "Tennis", "Football"]
+CITIES = ["Tel Aviv", "Jerusalem", "Haifa", "Beer Sheva", "Ariel", "Netanya", "Eilat", "Rishon LeZion"]
+STREETS = ["Dizengoff", "Herzl", "Rothschild", "Ben Yehuda", "Allenby", "HaNassi", "Weizmann"]
+NOTIFICATION_MESSAGES = [
+    "New Meet in {group} has been created by {coach}!",
+    "The details of the meet in {group} have been updated",
+    "{coach} removed you from a meet in {group}",
+    "The meet in {group} has been canceled",
+]
+
+
+class SeedPlan:
+    """The sizes of the seeded data, passed to the worker processes"""
+
+    id_prefix: int
+    random_seed: int
+    users: int
+    coaches: int
+    groups: int
+    group_sizes: list[int]
+    meets_per_group: int
+    notifications_per_user: int
+    pictures_percent: int
+    area_ids: list[UUID]
+    password_hash: str
+    picture: bytes
+    now: datetime
+
+    def __init__(self, area_ids: list[UUID], picture: bytes) -> None:
+        self.id_prefix = random.getrandbits(64)
+        self.random_seed = config.seed_random_seed
+        self.users = config.seed_users
+        self.coaches = config.seed_coaches
+        self.groups = config.seed_groups
+        self.group_sizes = _get_group_sizes(self.users - self.coaches, self.groups, config.seed_groups_per_trainer)
+        self.meets_per_group = config.seed_meets_per_group
+        self.notifications_per_user = config.seed_notifications_per_user
+        self.pictures_percent = config.seed_pictures_percent
+        self.area_ids = area_ids
+        self.password_hash = create_hash(SEED_PASSWORD)
+        self.picture = picture
+        self.now = datetime.now().replace(microsecond=0)
+
+    def make_id(self, kind: int, index: int) -> UUID:
+        return UUID(int=(self.id_prefix << 64) | (kind << 56) | index, version=4)
+
+    def get_random(self, purpose: str, index: int) -> random.Random:
+        return random.Random(f"{self.random_seed}-{purpose}-{index}")
+
+
+def _get_group_sizes(trainers: int, groups: int, groups_per_trainer: int) -> list[int]:
+    weights = [1 / (rank + 1) ** GROUP_SIZE_SKEW for rank in range(groups)]
+    total_weight = sum(weights)
+    memberships = trainers * groups_per_trainer
+
+    return [min(trainers, max(1, round(memberships * weight / total_weight))) for weight in weights]
+
+
+def _get_user_name(user_index: int) -> str:
+    return f"{FIRST_NAMES[user_index % len(FIRST_NAMES)]} {LAST_NAMES[(user_index // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+
+
+def _get_user_email(plan: SeedPlan, user_index: int) -> str:
+    if user_index < plan.coaches:
+        return f"coach{user_index}@{SEED_EMAIL_DOMAIN}"
+    return f"trainer{user_index - plan.coaches}@{SEED_EMAIL_DOMAIN}"
+
+
+def _get_group_name(group_index: int) -> str:
+    return f"{GROUP_KINDS[group_index % len(GROUP_KINDS)]} {CITIES[(group_index // len(GROUP_KINDS)) % len(CITIES)]} {group_index}"
+
+
+def _seed_users(plan: SeedPlan, start: int, end: int) -> int:
+    """Load the users of the range, with their certificates, profile pictures, notifications and unread counters"""
+
+    init_config()
+
+    rng = plan.get_random("users", start)
+    user_ids = [plan.make_id(ID_KIND_USER, user_index) for user_index in range(start, end)]
+
+    with psycopg.connect(get_conninfo()) as db:
+        with db.cursor() as cursor:
+            with cursor.copy(
+                """COPY public.users (id, name, email, password_hash, phone, gender, date_of_birth, description, is_coach)
+                FROM STDIN"""
+            ) as copy:
+                for user_index, user_id in zip(range(start, end), user_ids):
+                    date_of_birth = f"{rng.randint(1960, 2006)}-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}"
+                    copy.write_row(
+                        (
+                            user_id,
+                            _get_user_name(user_index),
+                            _get_user_email(plan, user_index),
+                            plan.password_hash,
+                            f"05{rng.randrange(10 ** 8):08}",
+                            rng.choice(["male", "female"]),
+                            date_of_birth,
+                            "",
+                            user_index < plan.coaches,
+                        )
+                    )
+
+            with cursor.copy("COPY public.certificates (id, user_id, name, body) FROM STDIN") as copy:
+                for user_id in user_ids[: max(0, plan.coaches - start)]:
+                    copy.write_row((uuid4(), user_id, "certificate.png", plan.picture))
+
+            with cursor.copy("COPY public.profiles (id, user_id, name, body) FROM STDIN") as copy:
+                for user_id in user_ids:
+                    if rng.randrange(100) < plan.pictures_percent:
+                        copy.write_row((uuid4(), user_id, "picture.png", plan.picture))
+
+            unread_counts: list[tuple[UUID, int]] = []
+            with cursor.copy("COPY public.notifications (id, user_id, message, date, is_read) FROM STDIN") as copy:
+                for user_id in user_ids:
+                    unread_count = 0
+
+                    # exponential, most of the users have a few notifications and some have many
+                    for _ in range(int(rng.expovariate(1 / plan.notifications_per_user)) if plan.notifications_per_user else 0):
+                        group_index = rng.randrange(max(plan.groups, 1))
+                        message = rng.choice(NOTIFICATION_MESSAGES).format(
+                            group=_get_group_name(group_index), coach=_get_user_name(rng.randrange(plan.coaches))
+                        )
+                        is_read = rng.randrange(100) < NOTIFICATIONS_READ_PERCENT
+                        date = plan.now - timedelta(seconds=rng.randrange(NOTIFICATIONS_DAYS * 24 * 60 * 60))
+
+                        copy.write_row((uuid4(), user_id, message, date, is_read))
+                        if not is_read:
+                            unread_count += 1
+
+                    if unread_count:
+                        unread_counts.append((user_id, unread_count))
+
+            with cursor.copy("COPY public.notification_counters (user_id, unread_count) FROM STDIN") as copy:
+                for row in unread_counts:
+                    copy.write_row(row)
+
+        db.commit()
+
+    return end - start
+
+
+def _seed_groups(plan: SeedPlan, start: int, end: int) -> int:
+    """Load the groups of the range, with their members, meets and meet members"""
+
+    init_config()
+
+    trainers = range(plan.coaches, plan.users)
+
+    with psycopg.connect(get_conninfo()) as db:
+        with db.cursor() as cursor:
+            # the search vector is built by the database, as in create_group
+            cursor.execute(
+                """CREATE TEMP TABLE seed_groups (
+                    id UUID, coach_id UUID, coach_name VARCHAR(255), name VARCHAR(255), description VARCHAR(255), area_id UUID
+                ) ON COMMIT DROP"""
+            )
+
+            groups_members: list[tuple[int, list[int]]] = []
+            with cursor.copy("COPY seed_groups (id, coach_id, coach_name, name, description, area_id) FROM STDIN") as copy:
+                for group_index in range(start, end):
+                    rng = plan.get_random("group", group_index)
+                    coach_index = rng.randrange(plan.coaches)
+                    name = _get_group_name(group_index)
+
+                    copy.write_row(
+                        (
+                            plan.make_id(ID_KIND_GROUP, group_index),
+                            plan.make_id(ID_KIND_USER, coach_index),
+                            _get_user_name(coach_index),
+                            name,
+                            f"{name} with {_get_user_name(coach_index)}, for all the levels",
+                            rng.choice(plan.area_ids),
+                        )
+                    )
+                    groups_members.append((group_index, rng.sample(trainers, plan.group_sizes[group_index])))
+
+            cursor.execute(
+                """INSERT INTO public.groups (id, coach_id, name, description, area_id, search_vector)
+                SELECT id, coach_id, name, description, area_id,
+                    setweight(to_tsvector('simple', name), 'A')
+                    || setweight(to_tsvector('simple', coach_name), 'B')
+                    || setweight(to_tsvector('simple', description), 'C')
+                FROM seed_groups"""
+            )
+
+            with cursor.copy("COPY public.group_members (group_id, user_id) FROM STDIN") as copy:
+                for group_index, members in groups_members:
+                    group_id = plan.make_id(ID_KIND_GROUP, group_index)
+                    for user_index in members:
+                        copy.write_row((group_id, plan.make_id(ID_KIND_USER, user_index)))
+
+            meets_members: list[tuple[UUID, list[int]]] = []
+            with cursor.copy(
+                "COPY public.meetings (id, group_id, max_members, date, duration, city, street, member_count) FROM STDIN"
+            ) as copy:
+                max_meets = 2 * plan.meets_per_group
+                for group_index, members in groups_members:
+                    rng = plan.get_random("meets", group_index)
+
+                    for meet_number in range(rng.randint(0, max_meets)):
+                        meet_id = plan.make_id(ID_KIND_MEET, group_index * (max_meets + 1) + meet_number)
+                        max_members = rng.randint(*MEET_MAX_MEMBERS_RANGE)
+                        meet_members = rng.sample(members, min(len(members), rng.randint(0, max_members)))
+                        meet_date = plan.now.replace(hour=18, minute=0, second=0) + timedelta(
+                            days=rng.randint(-MEETS_DAYS_BEFORE, MEETS_DAYS_AFTER), hours=rng.randint(-12, 3)
+                        )
+
+                        copy.write_row(
+                            (
+                                meet_id,
+                                plan.make_id(ID_KIND_GROUP, group_index),
+                                max_members,
+                                meet_date.strftime("%Y-%m-%d %H:%M:%S"),
+                                rng.choice([45, 60, 90]),
+                                rng.choice(CITIES),
+                                f"{rng.choice(STREETS)} {rng.randint(1, 200)}",
+                                len(meet_members),
+                            )
+                        )
+                        meets_members.append((meet_id, meet_members))
+
+            with cursor.copy("COPY public.meeting_members (meeting_id, user_id) FROM STDIN") as copy:
+                for meet_id, meet_members in meets_members:
+                    for user_index in meet_members:
+                        copy.write_row((meet_id, plan.make_id(ID_KIND_USER, user_index)))
+
+        db.commit()
+
+    return end - start
+
+
+def _run_chunks(
+    executor: ProcessPoolExecutor, func: Callable[[SeedPlan, int, int], int], plan: SeedPlan, count: int, chunk_size: int
+) -> None:
+    futures = [executor.submit(func, plan, start, min(start + chunk_size, count)) for start in range(0, count, chunk_size)]
+
+    for future in futures:
+        future.result()
+
+
+def _ensure_seed_partitions(db: psycopg.Connection, now: datetime) -> None:
+    month = (now - timedelta(days=NOTIFICATIONS_DAYS)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    while month <= now:
+        ensure_notifications_partitions(db, month)
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def seed() -> None:
+    """Command to fill the database with large scale synthetic data, for performance testing"""
+
+    init_config()
+
+    if config.seed_coaches < 1 or config.seed_users <= config.seed_coaches or config.seed_groups < 0:
+        raise CriticalException("Environment variables SEED_USERS and SEED_COACHES must be 1 <= coaches < users")
+
+    # the ANALYZE of a large seed takes longer than the statement timeout of the requests
+    init_db(statement_timeout_ms=0)
+
+    with get_db() as db:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM public.users WHERE email = %s", [f"coach0@{SEED_EMAIL_DOMAIN}"])
+            already_seeded = cursor.fetchone() is not None
+            db.commit()
+
+        if already_seeded:
+            print("The database is already seeded")
+            return
+
+        area_ids = [area.area_id for area in get_areas(db)]
+
+        with open(os.path.join(config.assets_dir, "avatar_man_image.png"), "rb") as f:
+            plan = SeedPlan(area_ids, f.read())
+
+        _ensure_seed_partitions(db, plan.now)
+
+    workers_count = config.seed_workers or os.cpu_count() or 1
+    print(f"Seeding {plan.users} users ({plan.coaches} coaches) and {plan.groups} groups with {workers_count} workers")
+
+    with ProcessPoolExecutor(max_workers=workers_count, mp_context=multiprocessing.get_context("spawn")) as executor:
+        started_at = time.perf_counter()
+        _run_chunks(executor, _seed_users, plan, plan.users, USERS_CHUNK_SIZE)
+        print(f"Users: {plan.users} seeded in {time.perf_counter() - started_at:.1f}s")
+
+        # the groups reference the users, so they are seeded after all the users
+        started_at = time.perf_counter()
+        _run_chunks(executor, _seed_groups, plan, plan.groups, GROUPS_CHUNK_SIZE)
+        print(f"Groups: {plan.groups} seeded in {time.perf_counter() - started_at:.1f}s")
+
+    started_at = time.perf_counter()
+    with get_db() as db:
+        with db.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        db.commit()
+    print(f"Analyze done in {time.perf_counter() - started_at:.1f}s")
+
+    print(f"Log in as coach0@{SEED_EMAIL_DOMAIN} or trainer0@{SEED_EMAIL_DOMAIN} with the password {SEED_PASSWORD}")
@@ -0,0 +1,177 @@
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import socket
+import tempfile
+import threading
+import time
+from multiprocessing.context import SpawnProcess
+from types import FrameType
+
+import uvicorn
+
+from src.config import config, init_config
+from src.logger import close_loggers, get_logger, init_loggers
+from src.metrics import init_worker_metrics
+
+# interval of checking the workers, to replace the stopped ones
+WORKERS_CHECK_SECONDS = 1
+
+# worker that stopped faster than the lifetime (failed startup) is replaced only after the backoff
+WORKER_MIN_LIFETIME_SECONDS = 10
+WORKER_RESTART_BACKOFF_SECONDS = 5
+
+# extra time for the lifespan shutdown of the workers (close_db), after the graceful timeout of the requests
+SHUTDOWN_MARGIN_SECONDS = 10
+
+_spawn = multiprocessing.get_context("spawn")
+
+
+def _create_uvicorn_config() -> uvicorn.Config:
+    # each worker gets different limit, so the workers are not recycled together
+    limit_max_requests = None
+    if config.serve_max_requests > 0:
+        limit_max_requests = config.serve_max_requests + random.randint(0, config.serve_max_requests_jitter)
+
+    # loop and http "auto" use uvloop and httptools when they are installed,
+    # the client address of the requests of the trusted proxies is taken from X-Forwarded-For (the rate limits are per address)
+    return uvicorn.Config(
+        "src.app:app",
+        host=config.serve_host,
+        port=config.serve_port,
+        loop="auto",
+        http="auto",
+        proxy_headers=True,
+        forwarded_allow_ips=config.forwarded_allow_ips,
+        limit_max_requests=limit_max_requests,
+        timeout_graceful_shutdown=config.serve_graceful_timeout_seconds,
+    )
+
+
+def _run_worker(uvicorn_config: uvicorn.Config, sockets: list[socket.socket], worker_id: int, metrics_dir: str) -> None:
+    # the replacement of a worker keeps its id, so the metrics of the workers are distinguished by stable labels
+    init_worker_metrics(str(worker_id), metrics_dir)
+
+    # the lifespan of the app initializes the database pool of the worker,
+    # on SIGTERM uvicorn stops accepting, waits for the in-flight requests and then runs the lifespan shutdown (close_db)
+    uvicorn_config.configure_logging()
+    uvicorn.Server(uvicorn_config).run(sockets=sockets)
+
+
+class _Worker:
+    process: SpawnProcess
+    started_at: float
+
+    def __init__(self, process: SpawnProcess) -> None:
+        self.process = process
+        self.started_at = time.monotonic()
+
+
+class Supervisor:
+    """
+    Prefork supervisor of the workers of the server.
+    The socket is bound once and shared by the workers, stopped workers (recycled after max requests or crashed) are replaced.
+    The workers share only the database: the autocomplete index and the auth tokens cache of each worker follow the changes
+    by LISTEN/NOTIFY, the metrics are merged from the snapshots in the metrics directory, the partitions maintenance takes an advisory lock,
+    while the rate limit buckets and the slow query plans stay in the memory of each worker.
+    """
+
+    def __init__(self, workers_count: int) -> None:
+        self._workers_count = workers_count
+        self._workers: list[_Worker | None] = []
+        self._restart_at: list[float] = []
+        self._sockets: list[socket.socket] = []
+        self._metrics_dir = ""
+        self._should_exit = threading.Event()
+        self._forward_signal = True
+
+    def _handle_exit(self, sig: int, frame: FrameType | None) -> None:
+        # the terminal sends SIGINT to the whole process group, so the workers already got it
+        self._forward_signal = sig != signal.SIGINT
+        self._should_exit.set()
+
+    def _start_worker(self, worker_id: int) -> _Worker:
+        process = _spawn.Process(target=_run_worker, args=(_create_uvicorn_config(), self._sockets, worker_id, self._metrics_dir))
+        process.start()
+
+        return _Worker(process)
+
+    def _replace_stopped_workers(self) -> None:
+        now = time.monotonic()
+
+        for i, worker in enumerate(self._workers):
+            if worker is not None:
+                if worker.process.is_alive():
+                    continue
+
+                worker.process.join()
+                get_logger().info(f"Worker [{worker.process.pid}] stopped with exit code {worker.process.exitcode}")
+
+                self._workers[i] = None
+                self._restart_at[i] = now
+                if now - worker.started_at < WORKER_MIN_LIFETIME_SECONDS:
+                    self._restart_at[i] = now + WORKER_RESTART_BACKOFF_SECONDS
+
+            if now >= self._restart_at[i]:
+                self._workers[i] = self._start_worker(i)
+
+    def _stop_workers(self) -> None:
+        processes = [worker.process for worker in self._workers if worker is not None]
+
+        if self._forward_signal:
+            for process in processes:
+                process.terminate()
+
+        deadline = time.monotonic() + config.serve_graceful_timeout_seconds + SHUTDOWN_MARGIN_SECONDS
+
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+
+            if process.is_alive():
+                get_logger().error(f"Worker [{process.pid}] did not stop in time, killed")
+                process.kill()
+                process.join()
+
+    def run(self) -> None:
+        self._sockets = [_create_uvicorn_config().bind_socket()]
+        # the snapshots of the metrics of the workers, any worker answers the scrape with the metrics of all of them
+        self._metrics_dir = tempfile.mkdtemp(prefix="solutrain-metrics-")
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._handle_exit)
+
+        get_logger().info(f"Started supervisor [{os.getpid()}] with {self._workers_count} workers")
+
+        self._workers = [self._start_worker(i) for i in range(self._workers_count)]
+        self._restart_at = [0.0] * self._workers_count
+
+        while not self._should_exit.wait(WORKERS_CHECK_SECONDS):
+            self._replace_stopped_workers()
+
+        get_logger().info("Stopping the workers")
+
+        self._stop_workers()
+
+        for sock in self._sockets:
+            sock.close()
+
+        shutil.rmtree(self._metrics_dir, ignore_errors=True)
+
+        get_logger().info(f"Stopped supervisor [{os.getpid()}]")
+
+
+def serve() -> None:
+    """Command to run the server in production, with multiple worker processes"""
+
+    init_config()
+    init_loggers()
+
+    workers_count = config.serve_workers
+    if workers_count <= 0:
+        workers_count = os.cpu_count() or 1
+
+    Supervisor(workers_count).run()
+
+    close_loggers()
@@ -0,0 +1,194 @@
+import inspect
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Generator, Mapping, Self, Sequence
+
+import psycopg
+from psycopg import sql
+
+from src.config import config
+from src.logger import get_logger
+
+# the plans of the latest slow queries kept in memory of each worker
+SLOW_QUERY_PLANS_SIZE = 50
+
+# slow queries waiting for EXPLAIN, more are not explained so a burst of slow queries does not add load to the database
+EXPLAIN_MAX_PENDING = 4
+
+# the arguments of the named queries with these words in their names are not logged
+SECRET_PARAM_WORDS = ("password", "token", "hash")
+
+PARAM_MAX_LENGTH = 64
+
+Statement = tuple[Any, Sequence[Any] | Mapping[str, Any] | None]
+
+
+class SlowQueryPlan:
+    """The plans of the statements of a slow named query, from EXPLAIN (ANALYZE, BUFFERS)"""
+
+    __slots__ = ("query", "duration_ms", "date", "params", "statements", "plans")
+
+    query: str
+    duration_ms: float
+    date: datetime
+    params: dict[str, str]
+    statements: list[str]
+    plans: list[str]
+
+    def __init__(self, query: str, duration_ms: float, date: datetime, params: dict[str, str], statements: list[str], plans: list[str]):
+        self.query = query
+        self.duration_ms = duration_ms
+        self.date = date
+        self.params = params
+        self.statements = statements
+        self.plans = plans
+
+
+g_slow_query_plans: deque[SlowQueryPlan] = deque(maxlen=SLOW_QUERY_PLANS_SIZE)
+
+g_explain_executor: ThreadPoolExecutor | None = None
+g_explain_pending = 0
+g_explain_lock = threading.Lock()
+
+_recording = threading.local()
+
+
+class RecordingCursor(psycopg.Cursor):
+    """Cursor of the pool connections, records the executed statements of the named queries for EXPLAIN of the slow ones"""
+
+    def execute(
+        self,
+        query: Any,
+        params: Sequence[Any] | Mapping[str, Any] | None = None,
+        *,
+        prepare: bool | None = None,
+        binary: bool | None = None,
+    ) -> Self:
+        statements: list[Statement] | None = getattr(_recording, "statements", None)
+        if statements is not None:
+            statements.append((query, params))
+
+        return super().execute(query, params, prepare=prepare, binary=binary)
+
+
+@contextmanager
+def record_statements(enabled: bool) -> Generator[list[Statement] | None, None, None]:
+    """Record the statements executed by the cursors of the current thread, yield None when not enabled"""
+
+    if not enabled:
+        yield None
+        return
+
+    previous = getattr(_recording, "statements", None)
+    statements: list[Statement] = []
+    _recording.statements = statements
+    try:
+        yield statements
+    finally:
+        _recording.statements = previous
+
+
+def _sanitize_value(value: Any) -> str:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+
+    text = str(value)
+    if len(text) > PARAM_MAX_LENGTH:
+        return f"{text[:PARAM_MAX_LENGTH]}... <{len(text)} chars>"
+    return text
+
+
+def sanitize_params(func: Callable[..., Any], args: tuple[Any, ...], kwargs: dict[str, Any]) -> dict[str, str]:
+    """Return the arguments of named query for the log, without the connection, the secrets and the long values"""
+
+    try:
+        bound_arguments = inspect.signature(func).bind(*args, **kwargs)
+    except TypeError:
+        return {}
+
+    params: dict[str, str] = {}
+    for index, (name, value) in enumerate(bound_arguments.arguments.items()):
+        # the first argument is the connection
+        if index == 0:
+            continue
+
+        if any(word in name for word in SECRET_PARAM_WORDS):
+            params[name] = "<hidden>"
+        else:
+            params[name] = _sanitize_value(value)
+
+    return params
+
+
+def _explain(conninfo: str, plan: SlowQueryPlan, statements: list[Statement]) -> None:
+    global g_explain_pending
+
+    try:
+        # new connection in read only transactions, so the statements that write fail instead of running again
+        with psycopg.connect(conninfo) as db:
+            db.read_only = True
+            for query, params in statements:
+                statement = query.as_string(db) if isinstance(query, sql.Composable) else str(query)
+                explain_query = sql.SQL("EXPLAIN (ANALYZE, BUFFERS) ") + (
+                    query if isinstance(query, sql.Composable) else sql.SQL(statement)
+                )
+
+                try:
+                    with db.cursor() as cursor:
+                        cursor.execute(explain_query, params)
+                        plan_text = "\n".join(row[0] for row in cursor.fetchall())
+                except psycopg.errors.DatabaseError as e:
+                    plan_text = f"Not explained: {e}"
+                db.rollback()
+
+                plan.statements.append(statement.strip())
+                plan.plans.append(plan_text)
+
+        g_slow_query_plans.append(plan)
+    except Exception as e:
+        get_logger().error(f"Explain of slow query {plan.query} failed: {e}")
+    finally:
+        with g_explain_lock:
+            g_explain_pending -= 1
+
+
+def _submit_explain(conninfo: str, plan: SlowQueryPlan, statements: list[Statement]) -> None:
+    global g_explain_executor, g_explain_pending
+
+    with g_explain_lock:
+        if g_explain_pending >= EXPLAIN_MAX_PENDING:
+            return
+        g_explain_pending += 1
+
+        if g_explain_executor is None:
+            g_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain-slow-query")
+
+    g_explain_executor.submit(_explain, conninfo, plan, statements)
+
+
+def report_slow_query(
+    func: Callable[..., Any],
+    seconds: float,
+    args: tuple[Any, ...],
+    kwargs: dict[str, Any],
+    statements: list[Statement] | None,
+    conninfo: str,
+) -> None:
+    """Log named query slower than the threshold, and explain a sample of them in the background"""
+
+    duration_ms = seconds * 1000
+    params = sanitize_params(func, args, kwargs)
+    get_logger().warning(f"Slow query {func.__name__} took {duration_ms:.1f} ms, params: {params}")
+
+    if statements and random.random() * 100 < config.slow_query_explain_percent:
+        _submit_explain(conninfo, SlowQueryPlan(func.__name__, duration_ms, datetime.now(), params, [], []), statements)
+
+
+def get_slow_query_plans() -> list[SlowQueryPlan]:
+    """Return the plans of the latest slow queries, the newest first"""
+
+    return list(reversed(g_slow_query_plans))
@@ -0,0 +1,157 @@
+import asyncio
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from starlette.concurrency import run_in_threadpool
+
+from src import IMPORT_STARTED_AT
+from src.jobs import maintain_notifications_partitions
+from src.logger import get_logger
+from src.models import wait_db
+
+# budget of importing the app in a fresh process (the cold start before the lifespan)
+IMPORT_TIME_BUDGET_MS = 1500
+
+WARM_UP_POOL_WAIT_SECONDS = 10
+WARM_UP_RETRY_SECONDS = 5
+
+g_warm_up_task: None | asyncio.Task = None
+
+# seconds of the import of the app, set once at the end of its import
+g_import_seconds: float | None = None
+
+
+class StartupTimings:
+    """Durations of the phases of the startup, reported in the log"""
+
+    def __init__(self) -> None:
+        self._phases: list[tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        self._phases.append((name, seconds))
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started_at)
+
+    def report(self, title: str) -> None:
+        total = sum(seconds for _, seconds in self._phases)
+        phases = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self._phases)
+
+        get_logger().info(f"{title} in {total * 1000:.0f}ms: {phases}")
+
+
+def mark_import_done() -> None:
+    """Record the seconds of the import of the app, at the end of the import of its module"""
+
+    global g_import_seconds
+    if g_import_seconds is None:
+        g_import_seconds = time.perf_counter() - IMPORT_STARTED_AT
+
+
+def get_import_seconds() -> float:
+    """Return the seconds of the import of the app (0 before its import is done)"""
+
+    return g_import_seconds or 0.0
+
+
+def _warm_up() -> None:
+    timings = StartupTimings()
+
+    with timings.measure("pool"):
+        if not wait_db(WARM_UP_POOL_WAIT_SECONDS):
+            raise TimeoutError(f"The pool is not ready after {WARM_UP_POOL_WAIT_SECONDS} seconds")
+
+    with timings.measure("notifications partitions"):
+        maintain_notifications_partitions()
+
+    timings.report("Warm up done")
+
+
+async def _warm_up_until_done() -> None:
+    while True:
+        try:
+            await run_in_threadpool(_warm_up)
+            return
+        except Exception as e:
+            get_logger().error("Warm up failed, retrying")
+            get_logger().exception(e)
+
+        await asyncio.sleep(WARM_UP_RETRY_SECONDS)
+
+
+def start_warm_up() -> None:
+    """
+    Start the initialization that needs the database in the background, so the server answers (health check) before the pool is full.
+    """
+
+    global g_warm_up_task
+    if g_warm_up_task is not None:
+        return
+
+    g_warm_up_task = asyncio.create_task(_warm_up_until_done())
+
+
+async def stop_warm_up() -> None:
+    """Stop the warm up, if it is still running"""
+
+    global g_warm_up_task
+    if g_warm_up_task is None:
+        return
+
+    g_warm_up_task.cancel()
+    await asyncio.gather(g_warm_up_task, return_exceptions=True)
+    g_warm_up_task = None
+
+
+def is_warm_up_done() -> bool:
+    """Return if the warm up succeeded"""
+
+    return g_warm_up_task is not None and g_warm_up_task.done() and not g_warm_up_task.cancelled()
+
+
+def check_import_time(budget_ms: int = IMPORT_TIME_BUDGET_MS) -> None:
+    """Command to measure the import time of the app in a fresh process, and fail if it is over the budget"""
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.app"], capture_output=True, text=True, check=True)
+
+    # lines of "import time: self [us] | cumulative | imported package"
+    imports: list[tuple[int, int, str]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_text, cumulative_text, name_text = line.removeprefix("import time:").split("|")
+        imports.append((int(self_text), int(cumulative_text), name_text.rstrip()))
+
+    app_index = next(i for i, (_, _, name) in enumerate(imports) if name.strip() == "src.app")
+    _, app_us, app_name = imports[app_index]
+    app_indent = len(app_name) - len(app_name.lstrip())
+
+    # the direct imports of the app, by their cumulative time.
+    # a module is printed after its imports, so the subtree of the app is the deeper lines right before it
+    direct_imports: list[tuple[int, str]] = []
+    for _, cumulative_us, name in reversed(imports[:app_index]):
+        indent = len(name) - len(name.lstrip())
+        if indent <= app_indent:
+            break
+
+        if indent == app_indent + 2:
+            direct_imports.append((cumulative_us, name.strip()))
+
+    print("Slowest imports of the app:")
+    for cumulative_us, name in sorted(direct_imports, reverse=True)[:10]:
+        print(f"  {cumulative_us / 1000:8.1f}ms  {name}")
+
+    print(f"Import of the app: {app_us / 1000:.1f}ms (budget {budget_ms}ms)")
+
+    if app_us / 1000 > budget_ms:
+        print("Import time is over the budget")
+        sys.exit(1)
@@ -0,0 +1,262 @@
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Generator
+
+import pydantic_core
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import config
+from src.exceptions import CriticalException
+
+SERVICE_NAME = "solutrain-backend"
+
+TRACING_EXPORTERS = ("", "console", "file")
+
+# spans waiting for the exporter thread, more are dropped so a slow exporter does not hold the memory of the server
+EXPORT_QUEUE_SIZE = 10000
+EXPORT_BATCH_SIZE = 512
+
+# the W3C Trace Context header, version-trace_id-parent_id-flags
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+INVALID_TRACE_ID = "0" * 32
+INVALID_SPAN_ID = "0" * 16
+SAMPLED_FLAG = 0x01
+
+SPAN_KIND_SERVER = "SPAN_KIND_SERVER"
+SPAN_KIND_INTERNAL = "SPAN_KIND_INTERNAL"
+SPAN_KIND_CLIENT = "SPAN_KIND_CLIENT"
+
+
+class Span:
+    """Span of a trace, exported in the JSON form of the OpenTelemetry spans when it ends"""
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "kind", "start_time_ns", "end_time_ns", "attributes", "error")
+
+    trace_id: str
+    span_id: str
+    parent_span_id: str
+    name: str
+    kind: str
+    start_time_ns: int
+    end_time_ns: int
+    attributes: dict[str, Any]
+    error: str | None
+
+    def __init__(self, trace_id: str, parent_span_id: str, name: str, kind: str, attributes: dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = _new_span_id()
+        self.parent_span_id = parent_span_id
+        self.name = name
+        self.kind = kind
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns = 0
+        self.attributes = attributes
+        self.error = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def get_traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{SAMPLED_FLAG:02x}"
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_time_ns,
+            "end_time_unix_nano": self.end_time_ns,
+            "attributes": self.attributes,
+            "status": {"code": "STATUS_CODE_OK"} if self.error is None else {"code": "STATUS_CODE_ERROR", "message": self.error},
+            "resource": {"service.name": SERVICE_NAME, "process.pid": os.getpid()},
+        }
+
+
+# the current span of the request (of the asyncio task or the thread), None when the request is not traced
+g_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+g_export_queue: queue.Queue[Span | None] | None = None
+g_export_thread: threading.Thread | None = None
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128) or 1:032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64) or 1:016x}"
+
+
+def _write_spans(spans: list[Span]) -> None:
+    lines = b"".join(pydantic_core.to_json(span.to_dict(), serialize_unknown=True) + b"\n" for span in spans)
+
+    if config.tracing_exporter == "console":
+        sys.stderr.buffer.write(lines)
+        sys.stderr.buffer.flush()
+    else:
+        # a single write of the batch in append mode, so the lines of the workers of the serve command do not interleave
+        with open(config.tracing_file, "ab") as f:
+            f.write(lines)
+
+
+def _export_spans(export_queue: queue.Queue[Span | None]) -> None:
+    closed = False
+    while not closed:
+        span = export_queue.get()
+        spans: list[Span] = []
+        while span is not None and len(spans) < EXPORT_BATCH_SIZE:
+            spans.append(span)
+            try:
+                span = export_queue.get_nowait()
+            except queue.Empty:
+                break
+
+        closed = span is None
+
+        if spans:
+            try:
+                _write_spans(spans)
+            except OSError as e:
+                print(f"Export of {len(spans)} spans failed: {e}", file=sys.stderr)
+
+
+def init_tracing() -> None:
+    """Start the exporter of the spans when the tracing is enabled"""
+
+    global g_export_queue, g_export_thread
+
+    if config.tracing_exporter not in TRACING_EXPORTERS:
+        raise CriticalException(f"Environment variable TRACING_EXPORTER must be one of {', '.join(TRACING_EXPORTERS[1:])}")
+
+    if not config.tracing_exporter or g_export_thread is not None:
+        return
+
+    g_export_queue = queue.Queue(EXPORT_QUEUE_SIZE)
+    g_export_thread = threading.Thread(target=_export_spans, args=(g_export_queue,), name="export-spans", daemon=True)
+    g_export_thread.start()
+
+
+def close_tracing() -> None:
+    """Export the ended spans and stop the exporter"""
+
+    global g_export_queue, g_export_thread
+
+    if g_export_queue is None or g_export_thread is None:
+        return
+
+    g_export_queue.put(None)
+    g_export_thread.join()
+
+    g_export_queue = None
+    g_export_thread = None
+
+
+def _end_span(span: Span) -> None:
+    span.end_time_ns = time.time_ns()
+
+    if g_export_queue is not None:
+        try:
+            g_export_queue.put_nowait(span)
+        except queue.Full:
+            pass
+
+
+@contextmanager
+def start_span(name: str, kind: str = SPAN_KIND_INTERNAL, **attributes: Any) -> Generator[Span | None, None, None]:
+    """Span in the current trace, child of the current span. Yield None when the request is not traced"""
+
+    parent = g_current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    span = Span(parent.trace_id, parent.span_id, name, kind, attributes)
+    token = g_current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = repr(e)
+        raise
+    finally:
+        g_current_span.reset(token)
+        _end_span(span)
+
+
+def get_current_trace_id() -> str | None:
+    span = g_current_span.get()
+    return None if span is None else span.trace_id
+
+
+def _parse_traceparent(traceparent: str | None) -> tuple[str, str, bool] | None:
+    """Return the trace id, the parent span id and the sampled flag of the traceparent header, None if it is invalid"""
+
+    if traceparent is None:
+        return None
+
+    match = TRACEPARENT_PATTERN.match(traceparent.strip().lower())
+    if match is None or match.group(1) == INVALID_TRACE_ID or match.group(2) == INVALID_SPAN_ID:
+        return None
+
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & SAMPLED_FLAG)
+
+
+class TracingMiddleware:
+    """
+    Trace the requests, span for each request that continues the trace of the traceparent header.
+    The traceparent of the request span is returned in the response headers.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or g_export_queue is None:
+            await self.app(scope, receive, send)
+            return
+
+        incoming = _parse_traceparent(Headers(scope=scope).get("traceparent"))
+        if incoming is not None:
+            trace_id, parent_span_id, sampled = incoming
+        else:
+            trace_id, parent_span_id = _new_trace_id(), ""
+            sampled = random.random() * 100 < config.tracing_sample_percent
+
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        span = Span(
+            trace_id,
+            parent_span_id,
+            f"{scope['method']} {scope['path']}",
+            SPAN_KIND_SERVER,
+            {"http.method": scope["method"], "http.target": scope["path"]},
+        )
+
+        async def send_with_traceparent(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.error = f"HTTP {message['status']}"
+                MutableHeaders(scope=message).append("traceparent", span.get_traceparent())
+            await send(message)
+
+        token = g_current_span.set(span)
+        try:
+            await self.app(scope, receive, send_with_traceparent)
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            g_current_span.reset(token)
+            _end_span(span)